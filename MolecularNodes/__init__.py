@@ -77,11 +77,33 @@ def register():
         description = "Invert the values in the map. Low becomes high, high becomes low.",
         default = False
         )
+    bpy.types.Scene.mol_import_map_precision = bpy.props.EnumProperty(
+        name = "mol_import_map_precision", 
+        description = "Precision used to store the density values of the imported map.",
+        items = (
+            ('FLOAT', "Full", "Store the values as 32-bit floats, or 16-bit for narrow integer maps"), 
+            ('HALF', "Half", "Store the values as 16-bit floats"), 
+            ('QUANTIZED', "Quantized", "Quantize the values to 8-bit levels, storing the scale and offset to recover the original values")
+        ), 
+        default = 'FLOAT'
+        )
+    bpy.types.Scene.mol_import_map_bin = bpy.props.IntProperty(
+        name = "mol_import_map_bin", 
+        description = "Number of voxels along each axis to average into a single voxel on import.", 
+        subtype = 'NONE',
+        min = 1, 
+        default = 1
+    )
     bpy.types.Scene.mol_import_include_bonds = bpy.props.BoolProperty(
         name = "mol_import_include_bonds", 
         description = "Include bonds in the imported structure.",
         default = True
         )
+    bpy.types.Scene.mol_import_dedup_chains = bpy.props.BoolProperty(
+        name = "mol_import_dedup_chains", 
+        description = "Replace copies of identical chains with instances of a single template chain.",
+        default = False
+        )
     bpy.types.Scene.mol_import_panel_selection = bpy.props.IntProperty(
         name = "mol_import_panel_selection", 
         description = "Import Panel Selection", 
@@ -162,6 +184,88 @@ def register():
         subtype = 'NONE',
         default = 50
     )
+    bpy.types.Scene.mol_import_md_unwrap = bpy.props.BoolProperty(
+        name = "mol_import_md_unwrap", 
+        description = "Make molecules broken across the periodic boundaries whole on import (requires bonds in the topology)", 
+        default = False
+    )
+    bpy.types.Scene.mol_import_md_center = bpy.props.BoolProperty(
+        name = "mol_import_md_center", 
+        description = "Center the transformation selection in the box for every frame", 
+        default = False
+    )
+    bpy.types.Scene.mol_import_md_fit = bpy.props.BoolProperty(
+        name = "mol_import_md_fit", 
+        description = "Fit every frame onto the first imported frame, using the transformation selection", 
+        default = False
+    )
+    bpy.types.Scene.mol_import_md_transform_selection = bpy.props.StringProperty(
+        name = "mol_import_md_transform_selection", 
+        description = "Selection used for centering and fitting the trajectory", 
+        default = "protein"
+    )
+    bpy.types.Scene.mol_import_md_interpolation = bpy.props.EnumProperty(
+        name = "mol_import_md_interpolation", 
+        description = "Interpolate the positions between the imported frames on playback, \
+            taking the shortest path across the periodic box (orthorhombic or triclinic)", 
+        items = (
+            ('NONE', "None", "Show the imported frames through the animation nodes"), 
+            ('LINEAR', "Linear", "Linear interpolation between the frames"), 
+            ('CUBIC', "Cubic", "Smooth Catmull-Rom interpolation through the frames")
+        ), 
+        default = 'NONE'
+    )
+    bpy.types.Scene.mol_import_md_keyframes = bpy.props.IntProperty(
+        name = "mol_import_md_keyframes", 
+        description = "Import this many of the most structurally diverse frames of the range, instead of every step. 0 imports every step", 
+        default = 0, 
+        min = 0
+    )
+    bpy.types.Scene.mol_import_md_keyframe_selection = bpy.props.StringProperty(
+        name = "mol_import_md_keyframe_selection", 
+        description = "Selection the RMSD between frames is calculated on when choosing keyframes", 
+        default = "name CA"
+    )
+    bpy.types.Scene.mol_import_md_workers = bpy.props.IntProperty(
+        name = "mol_import_md_workers", 
+        description = "Number of processes reading the trajectory frames. 1 reads the frames in Blender", 
+        default = 1, 
+        min = 1, 
+        max = 64
+    )
+    bpy.types.Scene.mol_import_md_frame_storage = bpy.props.EnumProperty(
+        name = "mol_import_md_frame_storage", 
+        description = "How the imported frames are stored", 
+        items = (
+            ('OBJECTS', "Objects", "A mesh object for each frame, in the frames collection"), 
+            ('QUANTIZED', "Quantized", "16-bit coordinates quantized against the bounding box of each frame, saved next to the .blend file"), 
+            ('DELTA', "Delta", "8-bit coordinates of the difference to the previous frame, with a full 16-bit frame every 10 frames or when the frames are too far apart, saved next to the .blend file")
+        ), 
+        default = 'OBJECTS'
+    )
+    bpy.types.Scene.mol_import_md_frame_channels = bpy.props.EnumProperty(
+        name = "mol_import_md_frame_channels", 
+        description = "Per-frame values to import, exposed as attributes of the current frame", 
+        items = (
+            ('occupancy', "Occupancy", "Occupancy of each atom for each frame"), 
+            ('tempfactors', "B-Factor", "Temperature factor of each atom for each frame"), 
+            ('velocities', "Velocities", "Velocity vector of each atom for each frame"), 
+            ('forces', "Forces", "Force vector of each atom for each frame")
+        ), 
+        options = {'ENUM_FLAG'}, 
+        default = {'occupancy'}
+    )
+    bpy.types.Scene.mol_import_md_analyses = bpy.props.EnumProperty(
+        name = "mol_import_md_analyses", 
+        description = "Per-residue analyses over the imported frames, added as attributes. Results are cached for re-importing", 
+        items = (
+            ('rmsf', "RMSF", "Mean root mean square fluctuation of the atoms of each residue, as 'rmsf'"), 
+            ('sasa', "SASA", "Mean solvent accessible surface area of each residue, as 'sasa'"), 
+            ('contacts', "Contacts", "Fraction of frames each residue contacts another chain, as 'contact_freq'")
+        ), 
+        options = {'ENUM_FLAG'}, 
+        default = set()
+    )
     bpy.types.Scene.mol_import_default_style = bpy.props.IntProperty(
         name = "mol_import_default_style", 
         description = "Default style for importing molecules.", 
@@ -183,6 +287,11 @@ def register():
     )
     
     bpy.types.NODE_MT_add.append(mol_add_node_menu)
+    bpy.app.handlers.frame_change_post.append(update_dynamic_selections)
+    bpy.app.handlers.frame_change_post.append(update_frame_interpolation)
+    bpy.app.handlers.frame_change_post.append(update_frame_channels)
+    bpy.app.handlers.frame_change_post.append(update_periodic_images)
+    bpy.app.handlers.save_post.append(move_data_files)
 
     bpy.utils.register_class(MOL_PT_panel)
     bpy.utils.register_class(MOL_MT_Add_Node_Menu)
@@ -209,15 +318,21 @@ def register():
     bpy.utils.register_class(MOL_OT_Import_Map)
     bpy.utils.register_class(MOL_OT_Import_Star_File)
     bpy.utils.register_class(MOL_OT_Assembly_Bio)
+    bpy.utils.register_class(MOL_OT_Assembly_Lattice)
+    bpy.utils.register_class(MOL_OT_Periodic_Images)
     bpy.utils.register_class(MOL_OT_Default_Style)
     bpy.utils.register_class(MOL_OT_Color_Chain)
+    bpy.utils.register_class(MOL_OT_Edit_Chain_Color)
     bpy.utils.register_class(MOL_OT_Chain_Selection_Custom)
     bpy.utils.register_class(MOL_OT_Ligand_Selection_Custom)
+    bpy.utils.register_class(MOL_OT_Edit_Selection_Table)
     bpy.utils.register_class(MOL_OT_Install_Package)
 
     bpy.utils.register_class(MOL_OT_Add_Custom_Node_Group)
 
     bpy.utils.register_class(MOL_OT_Residues_Selection_Custom)
+    bpy.utils.register_class(MOL_OT_Query_Selection)
+    bpy.utils.register_class(MOL_OT_Proximity_Selection)
     bpy.utils.register_class(MolecularNodesPreferences)
     
 def unregister():
@@ -227,8 +342,11 @@ def unregister():
     del bpy.types.Scene.mol_import_center
     del bpy.types.Scene.mol_import_del_solvent
     del bpy.types.Scene.mol_import_include_bonds
+    del bpy.types.Scene.mol_import_dedup_chains
     del bpy.types.Scene.mol_import_map_nodes
     del bpy.types.Scene.mol_import_map_invert
+    del bpy.types.Scene.mol_import_map_precision
+    del bpy.types.Scene.mol_import_map_bin
     del bpy.types.Scene.mol_import_panel_selection
     del bpy.types.Scene.mol_import_local_path
     del bpy.types.Scene.mol_import_md_topology
@@ -240,12 +358,33 @@ def unregister():
     del bpy.types.Scene.mol_import_md_frame_start
     del bpy.types.Scene.mol_import_md_frame_step
     del bpy.types.Scene.mol_import_md_frame_end
+    del bpy.types.Scene.mol_import_md_unwrap
+    del bpy.types.Scene.mol_import_md_center
+    del bpy.types.Scene.mol_import_md_fit
+    del bpy.types.Scene.mol_import_md_transform_selection
+    del bpy.types.Scene.mol_import_md_interpolation
+    del bpy.types.Scene.mol_import_md_keyframes
+    del bpy.types.Scene.mol_import_md_keyframe_selection
+    del bpy.types.Scene.mol_import_md_workers
+    del bpy.types.Scene.mol_import_md_frame_storage
+    del bpy.types.Scene.mol_import_md_frame_channels
+    del bpy.types.Scene.mol_import_md_analyses
     del bpy.types.Scene.mol_import_default_style
     
     del bpy.types.Scene.trajectory_selection_list
     del bpy.types.Scene.list_index
     
     bpy.types.NODE_MT_add.remove(mol_add_node_menu)
+    if update_dynamic_selections in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(update_dynamic_selections)
+    if update_frame_interpolation in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(update_frame_interpolation)
+    if update_frame_channels in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(update_frame_channels)
+    if update_periodic_images in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(update_periodic_images)
+    if move_data_files in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.remove(move_data_files)
     
     bpy.utils.unregister_class(TrajectorySelectionList)
     bpy.utils.unregister_class(MOL_UL_TrajectorySelectionListUI)
@@ -268,6 +407,7 @@ def unregister():
     bpy.utils.unregister_class(MOL_MT_Default_Style)
     bpy.utils.unregister_class(MOL_OT_Style_Surface_Custom)
     bpy.utils.unregister_class(MOL_OT_Ligand_Selection_Custom)
+    bpy.utils.unregister_class(MOL_OT_Edit_Selection_Table)
     
     bpy.utils.unregister_class(MOL_OT_Import_Protein_RCSB)
     bpy.utils.unregister_class(MOL_OT_Import_Method_Selection)
@@ -276,14 +416,19 @@ def unregister():
     bpy.utils.unregister_class(MOL_OT_Import_Map)
     bpy.utils.unregister_class(MOL_OT_Import_Star_File)
     bpy.utils.unregister_class(MOL_OT_Assembly_Bio)
+    bpy.utils.unregister_class(MOL_OT_Assembly_Lattice)
+    bpy.utils.unregister_class(MOL_OT_Periodic_Images)
     bpy.utils.unregister_class(MOL_OT_Default_Style)
     bpy.utils.unregister_class(MOL_OT_Color_Chain)
+    bpy.utils.unregister_class(MOL_OT_Edit_Chain_Color)
     bpy.utils.unregister_class(MOL_OT_Chain_Selection_Custom)
     
     bpy.utils.unregister_class(MOL_OT_Add_Custom_Node_Group)
     bpy.utils.unregister_class(MOL_OT_Install_Package)
 
     bpy.utils.unregister_class(MOL_OT_Residues_Selection_Custom)
+    bpy.utils.unregister_class(MOL_OT_Query_Selection)
+    bpy.utils.unregister_class(MOL_OT_Proximity_Selection)
     bpy.utils.unregister_class(MolecularNodesPreferences)
 
 if __name__=="__main__":
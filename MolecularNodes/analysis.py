@@ -0,0 +1,137 @@
+import numpy as np
+import hashlib
+import os
+import warnings
+from .cache import cache_directory, file_key
+
+# attribute names of the results of each analysis
+analysis_attributes = {
+    'rmsf': 'rmsf',
+    'sasa': 'sasa',
+    'contacts': 'contact_freq'
+}
+
+def trajectory_analysis(atoms,
+                        frames,
+                        analyses = ('rmsf', 'sasa', 'contacts'),
+                        contact_cutoff = 4.5,
+                        chunk_size = 50,
+                        n_workers = 1
+                        ):
+    """
+    Computes per-residue analyses over the frames of a trajectory in one streaming pass,
+    with chunks of frames evaluated in worker processes by `md.map_frame_chunks()`.
+
+    - 'rmsf': mean root mean square fluctuation of the atoms of each residue. Fluctuations
+      include any rotation and translation of the whole structure, so the trajectory
+      should be fitted first.
+    - 'sasa': mean solvent accessible surface area of each residue (Shrake-Rupley with
+      biotite, using element radii). Elements missing from the topology are guessed from
+      the atom names, and SASA is skipped with a warning if they can't be.
+    - 'contacts': fraction of frames in which each residue has an atom within the cutoff
+      of an atom of another chain.
+
+    Args:
+        atoms (MDAnalysis.AtomGroup): The atoms to analyse.
+        frames (np.ndarray): Indices of the frames in the trajectory.
+        analyses (tuple, optional): Analyses to compute. Defaults to all.
+        contact_cutoff (float, optional): Contact distance in Angstroms. Defaults to 4.5.
+        chunk_size (int, optional): Number of frames in each chunk. Defaults to 50.
+        n_workers (int, optional): Number of worker processes. Defaults to 1, which 
+            evaluates the chunks in this process.
+
+    Returns:
+        dict: Per-atom values of each analysis, spread from the residues, by attribute name.
+    """
+    from . import md
+
+    residues = np.unique(atoms.resindices, return_inverse = True)[1]
+    try:
+        groups = np.unique(atoms.chainIDs, return_inverse = True)[1]
+    except Exception:
+        groups = np.unique(atoms.segindices, return_inverse = True)[1]
+
+    elements = None
+    if 'sasa' in analyses:
+        elements = atom_elements(atoms)
+        if elements is None:
+            warnings.warn("Unable to compute the SASA, the topology has no elements and they can't be guessed from the atom names.")
+            analyses = tuple(name for name in analyses if name != 'sasa')
+
+    results = md.map_frame_chunks(
+        md.frame_workers().analysis_chunk, atoms, frames, 
+        tuple(analyses), residues, groups, contact_cutoff, elements, 
+        chunk_size = chunk_size, 
+        n_workers = n_workers
+    )
+
+    totals = {key: sum(result[key] for result in results) for key in results[0]} if results else {}
+    n_frames = max(totals.get('n_frames', 0), 1)
+    n_residues = residues.max() + 1 if len(residues) else 0
+    per_atom = np.bincount(residues, minlength = n_residues)
+
+    values = {}
+    if 'rmsf' in analyses:
+        mean = totals['position'] / n_frames
+        variance = totals['position_squared'] / n_frames - mean ** 2
+        rmsf = np.sqrt(np.clip(variance.sum(axis = 1), 0, None))
+        residue_rmsf = np.bincount(residues, weights = rmsf, minlength = n_residues) / np.maximum(per_atom, 1)
+        values[analysis_attributes['rmsf']] = residue_rmsf[residues]
+    if 'sasa' in analyses:
+        values[analysis_attributes['sasa']] = (totals['sasa'] / n_frames)[residues]
+    if 'contacts' in analyses:
+        values[analysis_attributes['contacts']] = (totals['contacts'] / n_frames)[residues]
+
+    return values
+
+def atom_elements(atoms):
+    """
+    Returns the elements of the atoms from the topology, guessed from the atom names as 
+    `md.load_trajectory()` does if the topology has none, or None if they can't be guessed.
+    """
+    from . import md
+    try:
+        return np.asarray(atoms.elements)
+    except Exception:
+        pass
+    try:
+        import MDAnalysis as mda
+        return md.map_unique(atoms.names, mda.topology.guessers.guess_atom_element)
+    except Exception:
+        return None
+
+def cached_trajectory_analysis(file_top,
+                               file_traj,
+                               atoms,
+                               frames,
+                               analyses = ('rmsf', 'sasa', 'contacts'),
+                               contact_cutoff = 4.5,
+                               key = '',
+                               n_workers = 1
+                               ):
+    """
+    Returns the results of `trajectory_analysis()`, cached on disk keyed by the topology
+    and trajectory files, the atoms, the frames, the analyses and any extra `key` (such
+    as the selection and transformations), so re-importing the same trajectory reuses
+    the results.
+    """
+    analyses = tuple(sorted(analyses))
+    digest = hashlib.sha1()
+    for part in (file_key(file_top), file_key(file_traj), key, repr(analyses), repr(contact_cutoff)):
+        digest.update(part.encode())
+    digest.update(np.asarray(atoms.ix).tobytes())
+    digest.update(np.asarray(frames).tobytes())
+    path = os.path.join(cache_directory('analysis'), digest.hexdigest() + '.npz')
+
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.keys()}
+
+    values = trajectory_analysis(
+        atoms, frames,
+        analyses = analyses,
+        contact_cutoff = contact_cutoff,
+        n_workers = n_workers
+    )
+    np.savez_compressed(path, **values)
+    return values
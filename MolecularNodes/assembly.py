@@ -1,6 +1,16 @@
 import bpy
 import numpy as np
 from . import nodes
+# parsing and finding the transformations doesn't need Blender, so it is kept separate and can be tested
+from .transforms import (
+    parse_oper_expression, 
+    as_homogeneous, 
+    combine_transformations, 
+    get_assemblies_pdbx, 
+    parse_pdb_transformations, 
+    kabsch, 
+    find_chain_instances
+)
 
 def get_transformations_pdbx(file_pdbx):
     import biotite.structure.io.pdbx as pdbx
@@ -13,32 +23,18 @@ def get_transformations_pdbx(file_pdbx):
     return transform_dict
 
 def get_transformations_pdb(file_pdb):
-    from re import compile
-    # get the lines where 'SMTRY' appears, which specify the actual symmetry operations
-    sym_lines = np.array(file_pdb.lines)[np.char.rfind(np.array(file_pdb.lines), 'SMTRY') > 0]
-    
-    regex = compile('\d\.\d+') # find where there is a digit, a decimal, and then multiple more digits
-    
-    n_mat = int(len(sym_lines) / 4)
-    sym_array = np.zeros([len(sym_lines),4], dtype=np.float32)
-    
-    
-    for i in range(len(sym_lines)):
-        sym_array[i] = np.array(regex.findall(sym_lines[i]), dtype = np.float32)
-    
-    transform_dict = []
-    
-    for i in range(n_mat):
-        
-        mat_start = i * 3
-        mat_end = (i + 1) * 3
-        
-        transform_dict.append((
-            sym_array[mat_start:mat_end, :3], 
-            sym_array[mat_start:mat_end, 3:].reshape([1, 3])
-        ))
-    
-    return transform_dict
+    """
+    Returns a (N, 3, 4) array of the N crystallographic symmetry operators (SMTRY) of a 
+    PDB file.
+    """
+    return parse_pdb_transformations(file_pdb.lines)[1]
+
+def get_assemblies_pdb(file_pdb):
+    """
+    Returns a dictionary indexed by the assembly id as a string, containing a (N, 3, 4) array
+    of the N transformations (BIOMT) required to build that biological assembly.
+    """
+    return parse_pdb_transformations(file_pdb.lines)[0]
 
 def get_transformations_mmtf(all_assemblies, world_scale = 0.01):
     """
@@ -52,36 +48,241 @@ def get_transformations_mmtf(all_assemblies, world_scale = 0.01):
     matrices = np.array([item['matrix'] for item in assembly]).reshape((len(assembly), 4, 4))
     return matrices
 
-def create_assembly_node(name, trans_mat):
+def get_assemblies_mmtf(all_assemblies):
+    """
+    Returns a dictionary indexed by the assembly name, containing a (N, 3, 4) array of the
+    N transformations required to build each of the biological assemblies in a MMTF file.
+    """
+    assemblies = {}
+    for i, bio_assembly in enumerate(all_assemblies):
+        transform_list = bio_assembly['transformList']
+        matrices = np.array([item['matrix'] for item in transform_list]).reshape((len(transform_list), 4, 4))
+        assemblies[str(bio_assembly.get('name', i + 1))] = matrices[:, :3, :]
+    
+    return assemblies
+
+def store_assemblies(obj, assemblies, name = 'biological_assemblies'):
+    """
+    Stores the transformations of each biological assembly on the object as a custom 
+    property, so that they are only parsed once from the structure file.
+    """
+    obj[name] = {
+        key: np.asarray(value, dtype = float)[:, :3, :].ravel().tolist() 
+        for key, value in assemblies.items()
+    }
+
+def get_stored_assemblies(obj, name = 'biological_assemblies'):
+    """
+    Returns a dictionary of the (N, 3, 4) transformations for each biological assembly 
+    stored on the object. Falls back to the MMTF assembly list stored by previous versions.
+    """
+    stored = obj.get(name)
+    if stored is not None:
+        return {key: np.array(value).reshape((-1, 3, 4)) for key, value in stored.items()}
+    
+    return get_assemblies_mmtf(obj['bio_transform_dict'])
+
+def get_unit_cell_pdb(file_pdb):
+    """
+    Returns the unit cell parameters [a, b, c, alpha, beta, gamma] from the CRYST1 record 
+    of a PDB file, or None if there is no CRYST1 record.
+    """
+    for line in file_pdb.lines:
+        if line.startswith('CRYST1'):
+            return [float(line[start:end]) for start, end in 
+                    ((6, 15), (15, 24), (24, 33), (33, 40), (40, 47), (47, 54))]
+        if line.startswith(('ATOM', 'HETATM', 'MODEL')):
+            break
+    return None
+
+def get_unit_cell_pdbx(file_pdbx):
+    """
+    Returns the unit cell parameters [a, b, c, alpha, beta, gamma] from the cell category
+    of a PDBx file.
+    """
+    cell = file_pdbx.get_category('cell')
+    names = ('length_a', 'length_b', 'length_c', 'angle_alpha', 'angle_beta', 'angle_gamma')
+    return [float(cell[name]) for name in names]
+
+def parse_symmetry_operation(operation):
+    """
+    Parses a symmetry operation in the xyz notation of mmCIF, e.g. '-y,x-y,z+1/3', into a 
+    (3, 4) transformation in fractional coordinates.
+    """
+    from re import findall
+    mat = np.zeros((3, 4))
+    for row, component in enumerate(operation.lower().replace(' ', '').split(',')):
+        for sign, value in findall(r'([+-]?)([xyz]|\d+/\d+|\d*\.?\d+)', component):
+            factor = -1.0 if sign == '-' else 1.0
+            if value in 'xyz':
+                mat[row, 'xyz'.index(value)] += factor
+            elif '/' in value:
+                numerator, denominator = value.split('/')
+                mat[row, 3] += factor * float(numerator) / float(denominator)
+            else:
+                mat[row, 3] += factor * float(value)
+    return mat
+
+def get_symmetry_pdbx(file_pdbx):
+    """
+    Returns a (N, 3, 4) array of the N crystallographic symmetry operators of a PDBx file, 
+    in Cartesian coordinates.
+    """
+    category = file_pdbx.get_category('space_group_symop')
+    if category:
+        operations = category['operation_xyz']
+    else:
+        operations = file_pdbx.get_category('symmetry_equiv')['pos_as_xyz']
+    
+    fractional = np.array([parse_symmetry_operation(op) for op in np.atleast_1d(operations)])
+    cell = unit_cell_vectors(*get_unit_cell_pdbx(file_pdbx))
+    
+    # convert from fractional to Cartesian coordinates: R = M R_f M^-1, t = M t_f
+    to_cartesian = cell.T
+    to_fractional = np.linalg.inv(to_cartesian)
+    symmetry = np.zeros(fractional.shape)
+    symmetry[:, :, :3] = to_cartesian @ fractional[:, :, :3] @ to_fractional
+    symmetry[:, :, 3] = fractional[:, :, 3] @ to_cartesian.T
+    return symmetry
+
+def unit_cell_vectors(a, b, c, alpha, beta, gamma):
+    """
+    Returns a (3, 3) array with the a, b and c vectors of the unit cell as rows, using 
+    the PDB convention of a along the x axis and b in the xy plane. Angles are in degrees.
+    """
+    alpha, beta, gamma = np.deg2rad([alpha, beta, gamma])
+    cx = c * np.cos(beta)
+    cy = c * (np.cos(alpha) - np.cos(beta) * np.cos(gamma)) / np.sin(gamma)
+    cz = np.sqrt(max(c ** 2 - cx ** 2 - cy ** 2, 0))
+    return np.array([
+        [a, 0, 0], 
+        [b * np.cos(gamma), b * np.sin(gamma), 0], 
+        [cx, cy, cz]
+    ])
+
+def get_lattice_transformations(symmetry, unit_cell, size = (1, 1, 1), centroid = None):
+    """
+    Returns a (N, 3, 4) array of transformations that fill a block of `size` unit cells
+    with copies of the asymmetric unit.
+    
+    Args:
+        symmetry: (S, 3, 4) array of the symmetry operators in Cartesian coordinates.
+        unit_cell: The unit cell parameters [a, b, c, alpha, beta, gamma].
+        size (tuple, optional): The number of cells along the a, b & c axes. Defaults to (1, 1, 1).
+        centroid (optional): The centroid of the asymmetric unit. If given, each symmetry 
+        copy is shifted by whole cells so its centroid lies inside of the first unit cell. 
+        Defaults to None.
+    
+    Returns:
+        np.ndarray: The (N, 3, 4) transformations, where N = S * prod(size).
+    """
+    symmetry = np.array(symmetry, dtype = float)[:, :3, :]
+    cell = unit_cell_vectors(*unit_cell)
+    
+    if centroid is not None:
+        # pack the symmetry copies into the unit cell
+        centroids = symmetry[:, :, :3] @ np.asarray(centroid, dtype = float) + symmetry[:, :, 3]
+        shift = np.floor(centroids @ np.linalg.inv(cell))
+        symmetry[:, :, 3] -= shift @ cell
+    
+    # every combination of cell offsets, converted to Cartesian translations
+    offsets = np.stack(np.meshgrid(*[np.arange(n) for n in size], indexing = 'ij'), axis = -1)
+    translations = offsets.reshape((-1, 3)) @ cell
+    
+    lattice = np.repeat(symmetry[np.newaxis], len(translations), axis = 0)
+    lattice[:, :, :, 3] += translations[:, np.newaxis, :]
+    return lattice.reshape((-1, 3, 4))
+
+def store_lattice(obj, unit_cell, symmetry, centroid = None):
+    """
+    Stores the unit cell, symmetry operators and the centroid of the asymmetric unit on 
+    the object as custom properties, so that crystal lattices can be built without 
+    parsing the structure file again.
+    """
+    obj['unit_cell'] = list(unit_cell)
+    obj['symmetry_operations'] = np.asarray(symmetry, dtype = float)[:, :3, :].ravel().tolist()
+    if centroid is not None:
+        obj['asymmetric_unit_centroid'] = np.asarray(centroid, dtype = float).tolist()
+
+def get_stored_lattice(obj, size = (1, 1, 1)):
+    """
+    Returns the (N, 3, 4) transformations for a block of `size` unit cells from the unit 
+    cell and symmetry operators stored on the object. The symmetry copies are packed into
+    the unit cell using the stored centroid of the asymmetric unit.
+    """
+    symmetry = np.array(obj['symmetry_operations']).reshape((-1, 3, 4))
+    centroid = obj.get('asymmetric_unit_centroid')
+    if centroid is not None:
+        centroid = np.array(centroid)
+    return get_lattice_transformations(symmetry, obj['unit_cell'], size = size, centroid = centroid)
+
+def create_transforms_object(name, trans_mat, world_scale = 0.01, attributes = None):
+    """
+    Creates an object with a vertex for each of the transformations, positioned at the
+    translation and storing the euler rotation in the 'rotation' attribute. Instancing 
+    on these points applies all of the transformations, regardless of how many there are.
+    
+    Accepts a (N, 3, 4) or (N, 4, 4) array of transformation matrices, or a dictionary of 
+    these arrays for multiple assemblies. The points of all assemblies are stored together,
+    with the 1-based index of their assembly in the 'assembly_id' attribute and the 
+    original assembly ids stored in the 'assembly_ids' custom property.
+    
+    Extra integer values for each transformation, in the same order as the points, can be
+    stored as attributes with `attributes`, a dictionary indexed by the attribute name.
+    """
+    from scipy.spatial.transform import Rotation as R
+    from .load import create_object, add_attribute
+    from . import coll
+    
+    obj = bpy.data.objects.get(name)
+    if obj:
+        return obj
+    
+    if not isinstance(trans_mat, dict):
+        trans_mat = {'1': trans_mat}
+    
+    assembly_ids = list(trans_mat.keys())
+    matrices = [np.array(trans_mat[key], dtype = float)[:, :3, :] for key in assembly_ids]
+    assembly_index = np.repeat(np.arange(1, len(matrices) + 1), [len(mat) for mat in matrices])
+    matrices = np.concatenate(matrices)
+    
+    # compute all of the euler rotations at once from the stack of rotation matrices
+    rotations = R.from_matrix(matrices[:, :3, :3]).as_euler('xyz')
+    translations = matrices[:, :3, 3] * world_scale
+    
+    obj = create_object(name = name, collection = coll.data(), locations = translations)
+    add_attribute(obj, 'rotation', rotations, type = 'FLOAT_VECTOR', domain = 'POINT')
+    add_attribute(obj, 'assembly_id', assembly_index, type = 'INT', domain = 'POINT')
+    obj['assembly_ids'] = assembly_ids
+    
+    for attribute_name, values in (attributes or {}).items():
+        add_attribute(obj, attribute_name, np.asarray(values, dtype = int), type = 'INT', domain = 'POINT')
     
+    return obj
+
+def create_assembly_node(name, trans_mat, attributes = None):
+    """
+    Creates a node group that outputs a point for each of the transformations, with the 
+    rotation stored in the 'rotation' attribute and the assembly in the 'assembly_id' 
+    attribute. The number of nodes is independent of the number of transformations.
+    """
     node_mat = bpy.data.node_groups.get('MOL_RotTransMat_' + name)
     if node_mat:
         return node_mat
     
+    obj_transforms = create_transforms_object('MOL_RotTransMat_' + name, trans_mat, attributes = attributes)
+    
     node_mat = nodes.gn_new_group_empty('MOL_RotTransMat_' + name)
     node_mat.inputs.remove(node_mat.inputs['Geometry'])
     node_mat.nodes['Group Output'].location = [800, 0]
     node_mat.outputs['Geometry'].name = 'RotTransMat'
     
-    node_transform_list = []
-    for i, mat in enumerate(trans_mat):
-        node = nodes.rotation_matrix(
-            node_group=node_mat, 
-            mat=mat, 
-            location=[0, 0 - (300 * i)]
-        )
-        
-        node_transform_list.append(node)
+    node_object = node_mat.nodes.new('GeometryNodeObjectInfo')
+    node_object.location = [300, 0]
+    node_object.transform_space = 'ORIGINAL'
+    node_object.inputs['Object'].default_value = obj_transforms
     
-    node_transform_list.reverse()
-    
-    node_join = node_mat.nodes.new('GeometryNodeJoinGeometry')
-    node_join.location = [300, 0]
-    
-    for node_transform in node_transform_list:
-        node_mat.links.new(node_transform.outputs['Geometry'], node_join.inputs['Geometry'])
-    
-    node_mat.links.new(node_join.outputs['Geometry'], node_mat.nodes['Group Output'].inputs['RotTransMat'])
+    node_mat.links.new(node_object.outputs['Geometry'], node_mat.nodes['Group Output'].inputs['RotTransMat'])
     
     return node_mat
 
@@ -100,18 +301,8 @@ def create_biological_assembly_node(name, transform_dict):
     node_input = node_bio.nodes[bpy.app.translations.pgettext_data("Group Input",)]
     node_output = node_bio.nodes[bpy.app.translations.pgettext_data("Group Output",)]
     
-    
-    node_output.location = [400, 0]
-    
-    node_assembly = nodes.add_custom_node_group_to_node(node_bio, 'MOL_utils_bio_assembly', location=[0, 0])
-    
-    node_trans = nodes.add_custom_node_group_to_node(node_bio, data_trans.name, location = [-400, -200])
-    
-    link = node_bio.links.new
-    
-    link(node_input.outputs['Geometry'], node_assembly.inputs['Geometry'])
-    link(node_trans.outputs['RotTransMat'], node_assembly.inputs['RotTransMat'])
-    link(node_assembly.outputs['Instances'], node_output.inputs[0])
+    node_input.location = [-600, 0]
+    node_output.location = [600, 0]
     
     inputs = (
         {'name': 'Scale Rotation', 
@@ -119,6 +310,9 @@ def create_biological_assembly_node(name, transform_dict):
          'default': 1},
         {'name': 'Scale Translation', 
          'type': 'NodeSocketFloat', 
+         'default': 1}, 
+        {'name': 'Assembly ID', 
+         'type': 'NodeSocketInt', 
          'default': 1}
     )
     
@@ -129,7 +323,222 @@ def create_biological_assembly_node(name, transform_dict):
         
         node_bio.inputs.new(type, name)
         node_bio.inputs.get(name).default_value = default
-        
-        link(node_input.outputs[name], node_assembly.inputs[name])
+    
+    new_node = node_bio.nodes.new
+    link = node_bio.links.new
+    
+    # the input is the 1-based index of the assembly, as the ids in the file aren't always
+    # consecutive integers, so list which id each index refers to
+    assembly_ids = list(transform_dict.keys()) if isinstance(transform_dict, dict) else ['1']
+    node_bio.inputs['Assembly ID'].min_value = 1
+    node_bio.inputs['Assembly ID'].max_value = len(assembly_ids)
+    node_bio.inputs['Assembly ID'].description = "Index of the assembly to build: " + ", ".join(
+        f"{i} = '{assembly_id}'" for i, assembly_id in enumerate(assembly_ids, start = 1)
+    )
+    
+    node_trans = nodes.add_custom_node_group_to_node(node_bio, data_trans.name, location = [-600, -200])
+    
+    # only keep the transformations of the chosen assembly, so switching between assemblies
+    # only changes an input value instead of rebuilding the node tree
+    node_assembly_id = new_node('GeometryNodeInputNamedAttribute')
+    node_assembly_id.location = [-600, -400]
+    node_assembly_id.data_type = 'INT'
+    node_assembly_id.inputs['Name'].default_value = 'assembly_id'
+    
+    node_compare = new_node('FunctionNodeCompare')
+    node_compare.location = [-400, -200]
+    node_compare.data_type = 'INT'
+    node_compare.operation = 'NOT_EQUAL'
+    
+    node_delete = new_node('GeometryNodeDeleteGeometry')
+    node_delete.location = [-200, -200]
+    
+    # scale the translation of each transformation, by scaling the point positions
+    node_position = new_node('GeometryNodeInputPosition')
+    node_position.location = [-400, -400]
+    
+    node_scale_translation = new_node('ShaderNodeVectorMath')
+    node_scale_translation.location = [-200, -400]
+    node_scale_translation.operation = 'SCALE'
+    
+    node_set_position = new_node('GeometryNodeSetPosition')
+    node_set_position.location = [0, -200]
+    
+    # scale the rotation of each transformation
+    node_rotation = new_node('GeometryNodeInputNamedAttribute')
+    node_rotation.location = [-200, -600]
+    node_rotation.data_type = 'FLOAT_VECTOR'
+    node_rotation.inputs['Name'].default_value = 'rotation'
+    
+    node_scale_rotation = new_node('ShaderNodeVectorMath')
+    node_scale_rotation.location = [0, -600]
+    node_scale_rotation.operation = 'SCALE'
+    
+    # instance the entire input geometry on each of the transformation points
+    node_geom_instance = new_node('GeometryNodeGeometryToInstance')
+    node_geom_instance.location = [0, 0]
+    
+    node_instance = new_node('GeometryNodeInstanceOnPoints')
+    node_instance.location = [300, 0]
+    
+    link(node_assembly_id.outputs[4], node_compare.inputs[2])
+    link(node_input.outputs['Assembly ID'], node_compare.inputs[3])
+    link(node_trans.outputs['RotTransMat'], node_delete.inputs['Geometry'])
+    link(node_compare.outputs['Result'], node_delete.inputs['Selection'])
+    link(node_delete.outputs['Geometry'], node_set_position.inputs['Geometry'])
+    link(node_position.outputs['Position'], node_scale_translation.inputs[0])
+    link(node_input.outputs['Scale Translation'], node_scale_translation.inputs['Scale'])
+    link(node_scale_translation.outputs['Vector'], node_set_position.inputs['Position'])
+    
+    link(node_rotation.outputs[0], node_scale_rotation.inputs[0])
+    link(node_input.outputs['Scale Rotation'], node_scale_rotation.inputs['Scale'])
+    
+    link(node_input.outputs['Geometry'], node_geom_instance.inputs['Geometry'])
+    link(node_set_position.outputs['Geometry'], node_instance.inputs['Points'])
+    link(node_geom_instance.outputs['Instances'], node_instance.inputs['Instance'])
+    link(node_scale_rotation.outputs['Vector'], node_instance.inputs['Rotation'])
+    link(node_instance.outputs['Instances'], node_output.inputs[0])
     
     return node_bio
+
+def create_chain_instances_node(name, chain_transforms, chain_ids = None):
+    """
+    Creates a node group that instances each template chain on the transformations of its
+    copies. Atoms that aren't part of a template chain are passed through unchanged.
+    
+    The copies are left as instances, so their atoms are only stored once in memory and
+    drawn as instances in the viewport. The chain_id of the chain each copy replaced is 
+    stored on the instance domain, and reaches the atoms of the copy if the instances 
+    are realized further down the node tree.
+    
+    Args:
+        name (str): Name of the molecule.
+        chain_transforms (dict): Indexed by the chain_id (as a string) of each template chain, 
+        containing a (N, 3, 4) array of transformations.
+        chain_ids (dict, optional): With the same keys as `chain_transforms`, containing the 
+        N chain_id values of the copies. Defaults to None, keeping the template's chain_id.
+    """
+    node_instances = bpy.data.node_groups.get('MOL_chain_instances_' + name)
+    if node_instances:
+        return node_instances
+    
+    attributes = None
+    if chain_ids:
+        attributes = {'instance_chain_id': np.concatenate([chain_ids[key] for key in chain_transforms.keys()])}
+    data_trans = create_assembly_node('chain_instances_' + name, chain_transforms, attributes = attributes)
+    
+    node_instances = nodes.gn_new_group_empty('MOL_chain_instances_' + name)
+    
+    node_input = node_instances.nodes[bpy.app.translations.pgettext_data("Group Input",)]
+    node_output = node_instances.nodes[bpy.app.translations.pgettext_data("Group Output",)]
+    node_input.location = [-600, 0]
+    
+    new_node = node_instances.nodes.new
+    link = node_instances.links.new
+    
+    node_trans = nodes.add_custom_node_group_to_node(node_instances, data_trans.name, location = [-600, -300])
+    
+    node_chain_id = new_node('GeometryNodeInputNamedAttribute')
+    node_chain_id.location = [-600, 300]
+    node_chain_id.data_type = 'INT'
+    node_chain_id.inputs['Name'].default_value = 'chain_id'
+    
+    node_assembly_id = new_node('GeometryNodeInputNamedAttribute')
+    node_assembly_id.location = [-600, -500]
+    node_assembly_id.data_type = 'INT'
+    node_assembly_id.inputs['Name'].default_value = 'assembly_id'
+    
+    node_rotation = new_node('GeometryNodeInputNamedAttribute')
+    node_rotation.location = [-600, -700]
+    node_rotation.data_type = 'FLOAT_VECTOR'
+    node_rotation.inputs['Name'].default_value = 'rotation'
+    
+    # pass through all of the atoms that aren't instanced
+    node_instanced = new_node('GeometryNodeInputNamedAttribute')
+    node_instanced.location = [-400, 200]
+    node_instanced.data_type = 'BOOLEAN'
+    node_instanced.inputs['Name'].default_value = 'chain_instanced'
+    
+    node_delete_instanced = new_node('GeometryNodeDeleteGeometry')
+    node_delete_instanced.location = [-200, 200]
+    
+    node_join = new_node('GeometryNodeJoinGeometry')
+    node_join.location = [600, 0]
+    
+    # the attributes of the instance points are propagated to the instances, from where 
+    # the chain_id of each copy is stored on the instance domain
+    if chain_ids:
+        node_instance_chain_id = new_node('GeometryNodeInputNamedAttribute')
+        node_instance_chain_id.location = [600, -200]
+        node_instance_chain_id.data_type = 'INT'
+        node_instance_chain_id.inputs['Name'].default_value = 'instance_chain_id'
+        
+        node_store_chain_id = new_node('GeometryNodeStoreNamedAttribute')
+        node_store_chain_id.location = [800, 0]
+        node_store_chain_id.data_type = 'INT'
+        node_store_chain_id.domain = 'INSTANCE'
+        node_store_chain_id.inputs['Name'].default_value = 'chain_id'
+        input_value = [socket for socket in node_store_chain_id.inputs if socket.name == 'Value' and socket.type == 'INT'][0]
+    
+    node_output.location = [1000, 0]
+    
+    link(node_input.outputs['Geometry'], node_delete_instanced.inputs['Geometry'])
+    link(node_instanced.outputs[3], node_delete_instanced.inputs['Selection'])
+    
+    # for each template chain, separate the chain and instance it on its transformations
+    list_node_instance = []
+    height_offset = 300
+    for i, chain in enumerate(chain_transforms.keys()):
+        offset = 0 - i * height_offset
+        
+        node_compare_chain = new_node('FunctionNodeCompare')
+        node_compare_chain.location = [-200, offset]
+        node_compare_chain.data_type = 'INT'
+        node_compare_chain.operation = 'EQUAL'
+        node_compare_chain.inputs[3].default_value = int(chain)
+        
+        node_separate = new_node('GeometryNodeSeparateGeometry')
+        node_separate.location = [0, offset]
+        
+        node_geom_instance = new_node('GeometryNodeGeometryToInstance')
+        node_geom_instance.location = [200, offset]
+        
+        node_compare_assembly = new_node('FunctionNodeCompare')
+        node_compare_assembly.location = [-200, offset - 150]
+        node_compare_assembly.data_type = 'INT'
+        node_compare_assembly.operation = 'NOT_EQUAL'
+        node_compare_assembly.inputs[3].default_value = i + 1
+        
+        node_delete = new_node('GeometryNodeDeleteGeometry')
+        node_delete.location = [0, offset - 150]
+        
+        node_instance = new_node('GeometryNodeInstanceOnPoints')
+        node_instance.location = [400, offset]
+        
+        link(node_chain_id.outputs[4], node_compare_chain.inputs[2])
+        link(node_input.outputs['Geometry'], node_separate.inputs['Geometry'])
+        link(node_compare_chain.outputs['Result'], node_separate.inputs['Selection'])
+        link(node_separate.outputs['Selection'], node_geom_instance.inputs['Geometry'])
+        
+        link(node_assembly_id.outputs[4], node_compare_assembly.inputs[2])
+        link(node_trans.outputs['RotTransMat'], node_delete.inputs['Geometry'])
+        link(node_compare_assembly.outputs['Result'], node_delete.inputs['Selection'])
+        
+        link(node_delete.outputs['Geometry'], node_instance.inputs['Points'])
+        link(node_geom_instance.outputs['Instances'], node_instance.inputs['Instance'])
+        link(node_rotation.outputs[0], node_instance.inputs['Rotation'])
+        
+        list_node_instance.append(node_instance)
+    
+    list_node_instance.reverse()
+    for node_instance in list_node_instance:
+        link(node_instance.outputs['Instances'], node_join.inputs['Geometry'])
+    link(node_delete_instanced.outputs['Geometry'], node_join.inputs['Geometry'])
+    if chain_ids:
+        link(node_join.outputs['Geometry'], node_store_chain_id.inputs['Geometry'])
+        link(node_instance_chain_id.outputs[4], input_value)
+        link(node_store_chain_id.outputs['Geometry'], node_output.inputs[0])
+    else:
+        link(node_join.outputs['Geometry'], node_output.inputs[0])
+    
+    return node_instances
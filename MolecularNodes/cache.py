@@ -0,0 +1,40 @@
+import bpy
+import hashlib
+import os
+
+def cache_directory(name):
+    """
+    Returns the directory for the named cache in the Blender user data files, creating
+    it if it doesn't exist.
+    """
+    path = bpy.utils.user_resource('DATAFILES', path = os.path.join('MolecularNodes', name), create = True)
+    os.makedirs(path, exist_ok = True)
+    return path
+
+def file_key(file):
+    """
+    Returns a key which identifies the version of a file on disk, from its absolute path,
+    size and modification time, without reading the whole file.
+    """
+    if not file:
+        return ''
+    path = os.path.abspath(file)
+    stat = os.stat(path)
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+# content hashes of files, by their file_key(), so unchanged files are only hashed once
+_file_hashes = {}
+
+def file_hash(file, block_size = 2 ** 24):
+    """
+    Returns the SHA-1 hash of the contents of the file, so that copies of the same file 
+    share cached results. Hashes are remembered while the file is unchanged.
+    """
+    key = file_key(file)
+    if key not in _file_hashes:
+        digest = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
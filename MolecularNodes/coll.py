@@ -28,3 +28,19 @@ def frames(name="", parent=None, suffix="_frames"):
     
     return coll_frames
 
+
+def data(suffix=""):
+    """Return the Collection for MolecularNodes Data Objects
+    
+    Objects that only hold data used by the node trees, such as the transformations for 
+    biological assemblies, are stored in this collection. The collection is excluded from 
+    the view layer so the objects are not seen. If the collection does not exist first, 
+    it is created.
+    """
+    name = f"MN_data{suffix}"
+    coll = bpy.data.collections.get(name)
+    if not coll:
+        coll = bpy.data.collections.new(name)
+        mn().children.link(coll)
+        bpy.context.view_layer.layer_collection.children[mn().name].children[coll.name].exclude = True
+    return coll
@@ -2,8 +2,299 @@ import bpy
 import pyopenvdb as vdb
 import numpy as np
 import os
+import json
+import hashlib
 
-def map_to_grid(file: str, invert: bool = False) -> vdb.FloatGrid:
+def quantize_volume(volume: np.ndarray, levels: int = 255, minimum: float = None, maximum: float = None) -> tuple:
+    """Quantizes the values of a volume to a fixed number of evenly spaced levels.
+
+    The original values can be recovered (within half a level) as 
+    `quantized * scale + offset`.
+
+    Args:
+        volume (np.ndarray): The density values to quantize.
+        levels (int, optional): Number of steps between the minimum and maximum value. 
+        Defaults to 255, which fits inside 8 bits.
+        minimum, maximum (float, optional): The range of the values if already known, 
+        e.g. from `VolumeStatistics`. Defaults to computing them from the volume.
+
+    Returns:
+        tuple: The quantized volume as float32, the scale and the offset.
+    """
+    offset = float(np.min(volume) if minimum is None else minimum)
+    scale = (float(np.max(volume) if maximum is None else maximum) - offset) / levels
+    if scale == 0:
+        scale = 1.0
+    
+    quantized = np.subtract(volume, offset, dtype = np.float32)
+    quantized /= scale
+    np.rint(quantized, out = quantized)
+    return quantized, scale, offset
+
+def roi_from_world(roi_world, voxel_size: np.ndarray, origin = (0, 0, 0)) -> tuple:
+    """Converts a box in Angstroms into a box of voxel indices.
+
+    Args:
+        roi_world: ((x_min, y_min, z_min), (x_max, y_max, z_max)) in Angstroms, in the 
+        coordinates of the map.
+        voxel_size (np.ndarray): The (x, y, z) size of a voxel in Angstroms.
+        origin (optional): The (x, y, z) position in Angstroms of the first voxel of the map. 
+        See `map_origin()`. Defaults to (0, 0, 0).
+
+    Returns:
+        tuple: ((x_min, y_min, z_min), (x_max, y_max, z_max)) as voxel indices.
+    """
+    roi_world = np.array(roi_world, dtype = float) - np.asarray(origin, dtype = float)
+    start = np.floor(roi_world[0] / voxel_size).astype(int)
+    end = np.ceil(roi_world[1] / voxel_size).astype(int)
+    return tuple(start), tuple(end)
+
+def map_origin(mrc) -> np.ndarray:
+    """The (x, y, z) position in Angstroms of the first voxel of an open MRC file.
+
+    Follows the common convention of using the header's `origin` when it is set, and 
+    otherwise the start indices (`nxstart`, `nystart`, `nzstart`) multiplied by the 
+    voxel size.
+    """
+    header = mrc.header
+    voxel_size = np.array([mrc.voxel_size.x, mrc.voxel_size.y, mrc.voxel_size.z], dtype = float)
+    origin = np.array([header.origin.x, header.origin.y, header.origin.z], dtype = float)
+    if np.any(origin != 0):
+        return origin
+    start = np.array([header.nxstart, header.nystart, header.nzstart], dtype = float)
+    return start * voxel_size
+
+def map_maximum(mrc, maximum: float = None, chunk_size: int = 16) -> float:
+    """The maximum density value of a map, for inverting its values.
+
+    The header's `dmax` of the open MRC file is used when it is set (larger than `dmin`), 
+    so cropped and full imports of the same map agree. Otherwise it is the given `maximum`
+    of the region that was read (from its `VolumeStatistics`), so only the region of 
+    interest is considered, or the entire map is read in slabs of `chunk_size` planes if
+    no maximum is given.
+    """
+    header = mrc.header
+    if header.dmax > header.dmin:
+        return float(header.dmax)
+    if maximum is not None:
+        return float(maximum)
+    data = mrc.data
+    return float(max(np.max(data[z:z + chunk_size]) for z in range(0, data.shape[0], chunk_size)))
+
+class VolumeStatistics:
+    """Accumulates summary statistics of density values over slabs of a volume, so they 
+    are computed in the same pass that reads the volume.
+
+    The minimum, maximum, sum and sum of squares are accumulated exactly. The histogram 
+    is kept over `n_fine` bins, whose width doubles (merging pairs of bins exactly) when 
+    a slab falls outside of the current range, so the range doesn't need to be known in 
+    advance. Percentiles and the output histogram are interpolated from these bins.
+    """
+
+    def __init__(self, n_fine: int = 4096):
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.counts = np.zeros(n_fine, dtype = np.int64)
+        self.start = None
+        self.width = None
+
+    def update(self, slab: np.ndarray):
+        slab = np.asarray(slab, dtype = np.float64).ravel()
+        if not len(slab):
+            return
+        lo, hi = float(slab.min()), float(slab.max())
+        self.n += len(slab)
+        self.total += slab.sum()
+        self.total_sq += np.dot(slab, slab)
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+        
+        n_fine = len(self.counts)
+        if self.start is None:
+            self.start = lo
+            self.width = (hi - lo) / n_fine if hi > lo else max(abs(lo), 1.0) * 2.0 ** -20
+        while lo < self.start or hi > self.start + n_fine * self.width:
+            merged = self.counts.reshape((-1, 2)).sum(axis = 1)
+            empty = np.zeros(n_fine // 2, dtype = np.int64)
+            if lo < self.start:
+                self.start -= n_fine * self.width
+                self.counts = np.concatenate((empty, merged))
+            else:
+                self.counts = np.concatenate((merged, empty))
+            self.width *= 2
+        
+        index = np.clip(((slab - self.start) / self.width).astype(np.int64), 0, n_fine - 1)
+        self.counts += np.bincount(index, minlength = n_fine)
+
+    def inverted(self, maximum: float) -> 'VolumeStatistics':
+        """The statistics of the values inverted as `maximum - value`."""
+        inverted = VolumeStatistics(len(self.counts))
+        inverted.n = self.n
+        inverted.total = self.n * maximum - self.total
+        inverted.total_sq = self.n * maximum ** 2 - 2 * maximum * self.total + self.total_sq
+        inverted.min, inverted.max = maximum - self.max, maximum - self.min
+        if self.start is not None:
+            inverted.counts = self.counts[::-1].copy()
+            inverted.start = maximum - (self.start + len(self.counts) * self.width)
+            inverted.width = self.width
+        return inverted
+
+    def result(self, n_bins: int = 256, enclosed: float = 0.01) -> dict:
+        """
+        Returns the 'min', 'max', 'mean', 'rms', 'std', 'percentiles' (1, 5, 25, 50, 75, 
+        95, 99), the 'histogram' as the fraction of voxels in each of `n_bins` bins, the 
+        histogram 'bin_edges' and the recommended 'threshold' which encloses the 
+        `enclosed` fraction of the voxels.
+        """
+        n = max(self.n, 1)
+        v_min = float(self.min) if self.n else 0.0
+        v_max = float(self.max) if self.n else 0.0
+        mean = self.total / n
+        rms = np.sqrt(self.total_sq / n)
+        std = np.sqrt(max(self.total_sq / n - mean ** 2, 0.0))
+        
+        if self.start is None:
+            fine_edges, cumulative = np.array([v_min, v_min + 1.0]), np.array([0.0, 1.0])
+        else:
+            fine_edges = self.start + np.arange(len(self.counts) + 1) * self.width
+            cumulative = np.concatenate(([0], np.cumsum(self.counts))) / n
+        
+        def percentile(q):
+            return float(np.clip(np.interp(q / 100, cumulative, fine_edges), v_min, v_max))
+        
+        bin_edges = np.linspace(v_min, v_max if v_max > v_min else v_min + 1.0, n_bins + 1)
+        # every value lies within the range, while the bins at the ends only partly do
+        at_edges = np.interp(bin_edges, fine_edges, cumulative)
+        at_edges[0], at_edges[-1] = 0.0, 1.0 if self.n else 0.0
+        histogram = np.diff(at_edges)
+        
+        return {
+            'min': v_min, 
+            'max': v_max, 
+            'mean': float(mean), 
+            'rms': float(rms), 
+            'std': float(std), 
+            'percentiles': {str(q): percentile(q) for q in (1, 5, 25, 50, 75, 95, 99)}, 
+            'histogram': histogram.tolist(), 
+            'bin_edges': bin_edges.tolist(), 
+            'threshold': percentile(100 * (1 - enclosed))
+        }
+
+def bin_volume(data: np.ndarray, bin_size: int, chunk_size: int = 16, statistics: VolumeStatistics = None) -> np.ndarray:
+    """Averages blocks of `bin_size`^3 voxels into single voxels.
+
+    The volume is binned in slabs of `chunk_size` output planes, so when `data` is a 
+    memory-mapped array only one slab of the original data is read into memory at a time.
+    Voxels that don't fill a complete block at the far edges are dropped.
+
+    Args:
+        data (np.ndarray): The (z, y, x) volume to bin.
+        bin_size (int): The number of voxels along each axis to average.
+        chunk_size (int, optional): The number of output planes to bin at once. Defaults to 16.
+        statistics (VolumeStatistics, optional): Updated with each binned slab. Defaults to None.
+
+    Returns:
+        np.ndarray: The binned volume as float32.
+    """
+    nz, ny, nx = np.array(data.shape) // bin_size
+    binned = np.empty((nz, ny, nx), dtype = np.float32)
+    
+    for z in range(0, nz, chunk_size):
+        n = min(chunk_size, nz - z)
+        slab = np.asarray(
+            data[z * bin_size:(z + n) * bin_size, :ny * bin_size, :nx * bin_size], 
+            dtype = np.float32
+        )
+        binned[z:z + n] = slab.reshape(n, bin_size, ny, bin_size, nx, bin_size).mean(axis = (1, 3, 5))
+        if statistics is not None:
+            statistics.update(binned[z:z + n])
+    
+    return binned
+
+def read_volume(file: str, roi = None, roi_world = None, bin_size: int = 1, 
+                statistics: VolumeStatistics = None, chunk_size: int = 16) -> tuple:
+    """Reads the (optionally cropped and binned) density values from an MRC file.
+
+    The file is memory-mapped, so only the slabs that are inside of the region of 
+    interest are read from disk.
+
+    Args:
+        file (str): The path to the MRC file.
+        roi (optional): ((x_min, y_min, z_min), (x_max, y_max, z_max)) voxel indices of the 
+        box to crop to. The max is exclusive. Defaults to None, which reads the entire map.
+        roi_world (optional): As `roi` but in Angstroms, in the coordinates of the map 
+        (accounting for its origin). Ignored if `roi` is given. Defaults to None.
+        bin_size (int, optional): The number of voxels along each axis to average into a 
+        single voxel. Defaults to 1 (no binning).
+        statistics (VolumeStatistics, optional): Updated with the values of the volume as it
+        is read, slab by slab, so no separate pass is needed. Defaults to None.
+        chunk_size (int, optional): The number of planes read at once. Defaults to 16.
+
+    Returns:
+        tuple: The (z, y, x) volume, and the (z, y, x) index of its first voxel in the binned 
+        grid of the entire map.
+    """
+    import mrcfile
+    bin_size = max(int(bin_size), 1)
+    
+    with mrcfile.mmap(file, mode = 'r') as mrc:
+        data = mrc.data
+        
+        if roi is None and roi_world is not None:
+            voxel_size = np.array([mrc.voxel_size.x, mrc.voxel_size.y, mrc.voxel_size.z])
+            roi = roi_from_world(roi_world, voxel_size, origin = map_origin(mrc))
+        
+        if roi is None:
+            start = np.zeros(3, dtype = int)
+            end = np.array(data.shape)
+        else:
+            # voxel indices are given as (x, y, z) while the data is stored as (z, y, x)
+            start = np.clip(np.array(roi[0], dtype = int)[::-1], 0, data.shape)
+            end = np.clip(np.array(roi[1], dtype = int)[::-1], 0, data.shape)
+            # snap the start to the binning so the cropped voxels line up with the full map
+            start = start - start % bin_size
+        
+        if np.any(end - start < bin_size):
+            raise ValueError(f"Region of interest {roi} contains no voxels of the map '{file}'.")
+        
+        data = data[start[0]:end[0], start[1]:end[1], start[2]:end[2]]
+        
+        if bin_size > 1:
+            volume = bin_volume(data, bin_size, chunk_size = chunk_size, statistics = statistics)
+        else:
+            volume = np.empty(data.shape, dtype = data.dtype)
+            for z in range(0, data.shape[0], chunk_size):
+                volume[z:z + chunk_size] = data[z:z + chunk_size]
+                if statistics is not None:
+                    statistics.update(volume[z:z + chunk_size])
+    
+    return volume, tuple(int(x) for x in start // bin_size)
+
+def volume_statistics(volume: np.ndarray, n_bins: int = 256, chunk_size: int = 16, enclosed: float = 0.01) -> dict:
+    """Computes summary statistics of the density values, used to pick sensible thresholds.
+
+    The statistics are accumulated in a single pass over slabs of the volume with 
+    `VolumeStatistics`, to avoid creating full-size temporary arrays for large maps. When
+    reading a map, `read_volume()` accumulates them as the volume is read instead.
+
+    Args:
+        volume (np.ndarray): The (z, y, x) density values.
+        n_bins (int, optional): Number of bins in the histogram. Defaults to 256.
+        chunk_size (int, optional): Number of planes to process at once. Defaults to 16.
+        enclosed (float, optional): The fraction of voxels that the recommended threshold 
+        should enclose. Defaults to 0.01.
+
+    Returns:
+        dict: See `VolumeStatistics.result()`.
+    """
+    statistics = VolumeStatistics()
+    for z in range(0, volume.shape[0], chunk_size):
+        statistics.update(volume[z:z + chunk_size])
+    return statistics.result(n_bins = n_bins, enclosed = enclosed)
+
+def map_to_grid(file: str, invert: bool = False, precision: str = 'FLOAT', roi = None, roi_world = None, bin_size: int = 1) -> vdb.FloatGrid:
     """Reads an MRC file and converts it into a pyopenvdb FloatGrid object.
 
     This function reads a file in MRC format, and converts it into a pyopenvdb FloatGrid object,
@@ -12,48 +303,132 @@ def map_to_grid(file: str, invert: bool = False) -> vdb.FloatGrid:
     Args:
         file (str): The path to the MRC file.
         invert (bool): Whether to invert the data from the grid, defaulting to False. Some file types
-        such as EM tomograms have inverted values, where a high value == low density.
+        such as EM tomograms have inverted values, where a high value == low density. Values 
+        are inverted against the maximum in the header of the map, so cropped and full 
+        imports of the same map agree, or the maximum of the region read if the header has
+        none. See `map_maximum()`.
+        precision (str): How the values are stored when written to disk. One of 'FLOAT' (32-bit), 
+        'HALF' (16-bit floats) or 'QUANTIZED' (8-bit levels stored as 16-bit floats, which 
+        are exact, with the 'scale' and 'offset' to recover the original values stored as 
+        grid metadata). Integer maps that are exact as half floats are always stored as 
+        16-bit, as there are no narrower grid types. Defaults to 'FLOAT'.
+        roi (optional): Voxel box to crop the map to. See `read_volume()`. Defaults to None.
+        roi_world (optional): Box in Angstroms to crop the map to. See `read_volume()`. 
+        Defaults to None.
+        bin_size (int, optional): Number of voxels along each axis to average into a single
+        voxel. Defaults to 1.
 
     Returns:
         pyopenvdb.FloatGrid: A pyopenvdb FloatGrid object containing the density data.
     """
     import mrcfile
-    volume = mrcfile.read(file)
+    # the statistics of the values are accumulated while the volume is read, and reused 
+    # for the maximum to invert against
+    statistics = VolumeStatistics()
+    volume, ijk = read_volume(file, roi = roi, roi_world = roi_world, bin_size = bin_size, statistics = statistics)
+    
+    if invert:
+        with mrcfile.mmap(file, mode = 'r') as mrc:
+            maximum = map_maximum(mrc, statistics.max)
+        statistics = statistics.inverted(maximum)
+        # widen integer maps first, so the inverted values can't overflow
+        if np.issubdtype(volume.dtype, np.integer):
+            volume = volume.astype(np.int32 if volume.dtype.itemsize < 4 else np.int64)
+        volume = volume.dtype.type(maximum) - volume
     
     dataType = volume.dtype
     
+    scale, offset = 1.0, 0.0
+    
     # enables different grid types
     
-    if dataType == "float32" or dataType == "float64":
+    if precision == 'QUANTIZED':
+        # 8-bit levels are exactly representable as half floats
+        volume, scale, offset = quantize_volume(volume, levels = 255, minimum = statistics.min, maximum = statistics.max)
+        grid = vdb.FloatGrid()
+        grid.saveFloatAsHalf = True
+    elif dataType == "float32" or dataType == "float64":
         grid = vdb.FloatGrid()
-    elif dataType == "int8" or dataType == "int16" or dataType == "int32":
+        grid.saveFloatAsHalf = precision == 'HALF'
+    elif is_half_exact(volume, minimum = statistics.min, maximum = statistics.max):
+        # OpenVDB has no 8 or 16-bit integer grids, but narrow integer maps fit into half
+        # floats without any loss, so store them as 16-bit instead of widening them to 
+        # 32-bit integers, whatever the precision
+        volume = volume.astype('float32')
+        grid = vdb.FloatGrid()
+        grid.saveFloatAsHalf = True
+    elif dataType in ("int8", "uint8", "int16", "uint16", "int32"):
         volume = volume.astype('int32')
         grid = vdb.Int32Grid()
     elif dataType == "int64":
         grid = vdb.Int64Grid()
-
-    if invert:
-        volume = np.max(volume) - volume
     
     try:
-        grid.copyFromArray(volume)
+        grid.copyFromArray(volume, ijk = ijk)
     except ValueError:
         print(f"Grid data type '{volume.dtype}' is an unsupported type.")
     
     grid.gridClass = vdb.GridClass.FOG_VOLUME
     grid.name = 'density'
+    grid['scale'] = scale
+    grid['offset'] = offset
+    # statistics of the (original, not quantized) values, so thresholds can be set without
+    # evaluating the grid
+    grid['mn_statistics'] = json.dumps(statistics.result())
     return grid
 
-def path_to_vdb(file: str):
-    # Set up file paths
+def is_half_exact(volume: np.ndarray, minimum: float = None, maximum: float = None) -> bool:
+    """Whether every value of an integer volume can be stored exactly as a half float.
+    
+    Half floats have an 11-bit significand, so all integers in [-2048, 2048] are exact.
+    The range of the values can be given if already known, instead of computing it.
+    """
+    if not np.issubdtype(volume.dtype, np.integer):
+        return False
+    if volume.dtype.itemsize == 1:
+        return True
+    if volume.dtype.itemsize > 4:
+        return False
+    minimum = np.min(volume) if minimum is None else minimum
+    maximum = np.max(volume) if maximum is None else maximum
+    return minimum >= -2048 and maximum <= 2048
+
+def path_to_vdb(file: str, options: str = None):
+    # Set up file paths, with a short hash of any options other than the defaults in the
+    # name, so converting the same map with different options doesn't overwrite the .vdb 
+    # of another volume in the scene
     folder_path = os.path.dirname(file)
     name = os.path.basename(file).split(".")[0]
+    if options is not None and options != default_vdb_options():
+        name += '_' + hashlib.sha1(options.encode()).hexdigest()[:8]
     file_name = name + '.vdb'
     file_path = os.path.join(folder_path, file_name)
     return file_path
+
+def vdb_options(**kwargs) -> str:
+    """Creates a string that records the options a .vdb file was converted with."""
+    return ";".join(f"{key}={value}" for key, value in sorted(kwargs.items()))
+
+def default_vdb_options() -> str:
+    """The options of a .vdb file converted with the default options of `map_to_vdb()`."""
+    return vdb_options(invert = False, precision = 'FLOAT', roi = None, roi_world = None, bin_size = 1)
+
+def vdb_matches_options(file_path: str, options: str) -> bool:
+    """Checks whether an existing .vdb file was converted with the given options.
+
+    Only the grid metadata is read, so this is cheap even for large files.
+    """
+    try:
+        grids = vdb.readAllGridMetadata(file_path)
+    except (IOError, KeyError):
+        return False
     
+    # files written before the options were recorded used the default options
+    default = default_vdb_options()
+    return all(grid.metadata.get('mn_options', default) == options for grid in grids)
 
-def map_to_vdb(file: str, invert: bool = False, world_scale=0.01, overwrite=False) -> str:
+def map_to_vdb(file: str, invert: bool = False, world_scale=0.01, overwrite=False, precision: str = 'FLOAT', 
+               roi = None, roi_world = None, bin_size: int = 1) -> str:
     """
     Converts an MRC file to a .vdb file using pyopenvdb.
 
@@ -63,23 +438,38 @@ def map_to_vdb(file: str, invert: bool = False, world_scale=0.01, overwrite=Fals
         such as EM tomograms have inverted values, where a high value == low density.
         world_scale (float, optional): The scaling factor to apply to the voxel size of the input file. Defaults to 0.01.
         overwrite (bool, optional): If True, the .vdb file will be overwritten if it already exists. Defaults to False.
+        precision (str, optional): Storage precision of the values, one of 'FLOAT', 'HALF' or 
+        'QUANTIZED'. See `map_to_grid()`. Defaults to 'FLOAT'.
+        roi (optional): ((x_min, y_min, z_min), (x_max, y_max, z_max)) voxel box to crop the 
+        map to. Defaults to None.
+        roi_world (optional): As `roi` but in Angstroms. Defaults to None.
+        bin_size (int, optional): Number of voxels along each axis to average into a single
+        voxel. Defaults to 1.
 
     Returns:
         str: The path to the converted .vdb file.
     """
     import mrcfile
-    file_path = path_to_vdb(file)
+    options = vdb_options(
+        invert = invert, precision = precision, roi = roi, roi_world = roi_world, bin_size = bin_size
+        )
+    file_path = path_to_vdb(file, options)
     
-    # If the map has already been converted to a .vdb and overwrite is False, return that instead
-    if os.path.exists(file_path) and not overwrite:
+    # If the map has already been converted to a .vdb with the same options and overwrite 
+    # is False, return that instead
+    if os.path.exists(file_path) and not overwrite and vdb_matches_options(file_path, options):
         return file_path
 
     # Read in the MRC file and convert it to a pyopenvdb grid
-    grid = map_to_grid(file, invert = invert)
+    grid = map_to_grid(
+        file, invert = invert, precision = precision, roi = roi, roi_world = roi_world, bin_size = bin_size
+        )
+    grid['mn_options'] = options
     
     # Read the voxel size from the MRC file and convert it to a numpy array
     with mrcfile.open(file) as mrc:
         voxel_size = np.array([mrc.voxel_size.x, mrc.voxel_size.y, mrc.voxel_size.z])
+    voxel_size = voxel_size * max(int(bin_size), 1)
     
     # Rotate and scale the grid for import into Blender
     grid.transform.rotate(np.pi / 2, vdb.Axis(1))
@@ -116,7 +506,8 @@ def vdb_to_volume(file: str) -> bpy.types.Object:
     return vol
 
 
-def load(file: str, name: str = None, invert: bool = False, world_scale: float = 0.01) -> bpy.types.Object:
+def load(file: str, name: str = None, invert: bool = False, world_scale: float = 0.01, precision: str = 'FLOAT', 
+         roi = None, roi_world = None, bin_size: int = 1) -> bpy.types.Object:
     """
     Loads an MRC file into Blender as a volumetric object.
 
@@ -126,16 +517,46 @@ def load(file: str, name: str = None, invert: bool = False, world_scale: float =
         invert (bool): Whether to invert the data from the grid, defaulting to False. Some file types
         such as EM tomograms have inverted values, where a high value == low density.
         world_scale (float, optional): Scale of the object in the world. Defaults to 0.01.
+        precision (str, optional): Storage precision of the values, one of 'FLOAT', 'HALF' or 
+        'QUANTIZED'. Reduced precisions are also used for the render memory. Defaults to 'FLOAT'.
+        roi (optional): ((x_min, y_min, z_min), (x_max, y_max, z_max)) voxel box to crop the 
+        map to. Only this region is read from the file. Defaults to None.
+        roi_world (optional): As `roi` but in Angstroms. Defaults to None.
+        bin_size (int, optional): Number of voxels along each axis to average into a single
+        voxel. Defaults to 1.
 
     Returns:
         bpy.types.Object: The loaded volumetric object.
     """
     # Convert MRC file to VDB format
-    vdb_file = map_to_vdb(file, invert = invert, world_scale = world_scale)
+    vdb_file = map_to_vdb(
+        file, 
+        invert = invert, 
+        world_scale = world_scale, 
+        precision = precision, 
+        roi = roi, 
+        roi_world = roi_world, 
+        bin_size = bin_size
+        )
     
     # Import VDB file into Blender
     vol_object = vdb_to_volume(vdb_file)
     
+    if precision != 'FLOAT':
+        vol_object.data.render.precision = 'HALF'
+    
+    # record how to recover the original values from quantized ones, as the statistics 
+    # are of the original values
+    grid = vdb.readAllGridMetadata(vdb_file)[0]
+    scale = grid.metadata.get('scale', 1.0)
+    offset = grid.metadata.get('offset', 0.0)
+    vol_object['density_scale'] = scale
+    vol_object['density_offset'] = offset
+    
+    statistics = grid.metadata.get('mn_statistics')
+    if statistics:
+        vol_object['density_statistics'] = json.loads(statistics)
+    
     if name:
         # Rename object to specified name
         vol_object.name = name
@@ -0,0 +1,364 @@
+import numpy as np
+from bisect import bisect_right
+
+def quantize(values, dtype = np.int16):
+    """
+    Quantizes the (N, 3) values to the integer dtype (int16 or int8) against their 
+    bounding box.
+
+    Returns the codes, and the (3,) offset and scale to decode them with `dequantize()`.
+    The absolute error of each decoded value is at most half of the scale of its axis,
+    i.e. the extent of the bounding box along that axis / 131070 for int16 (/ 510 for 
+    int8).
+    """
+    info = np.iinfo(dtype)
+    values = np.asarray(values, dtype = np.float64)
+    offset = values.min(axis = 0) if len(values) else np.zeros(3)
+    extent = values.max(axis = 0) - offset if len(values) else np.zeros(3)
+    scale = extent / (int(info.max) - int(info.min))
+    scale[scale == 0] = 1
+    codes = np.round((values - offset) / scale) + info.min
+    return codes.astype(dtype), offset, scale
+
+def dequantize(codes, offset, scale):
+    """
+    Decodes the integer codes from `quantize()` to float32 values.
+    """
+    return _dequantize(codes, offset, scale).astype(np.float32)
+
+def _dequantize(codes, offset, scale):
+    return (codes.astype(np.float64) - np.iinfo(codes.dtype).min) * scale + offset
+
+class FrameStore:
+    """
+    Compact store of the atom positions of trajectory frames, as int16 coordinates
+    quantized against the bounding box of each frame (6 bytes per atom per frame instead
+    of 12 for float32).
+
+    With `delta` the frames between keyframes store the difference to the previous
+    decoded frame instead, as int8 codes quantized against the (much smaller) bounding 
+    box of the differences (3 bytes per atom per frame). A frame whose differences can't
+    be stored within the `tolerance` in int8 becomes a keyframe instead, as does every 
+    `keyframe_interval`-th frame, so delta frames only save memory when the frames are 
+    close together and are never less precise than the tolerance. Differences are taken
+    to the decoded previous frame, so quantization errors don't accumulate along the 
+    chain and decoding a frame adds at most `keyframe_interval - 1` differences to the 
+    last keyframe.
+
+    The error of each decoded coordinate is bounded by half the quantization step of its
+    frame plus the float32 rounding of the decoded value, given by `error_bound()`. For a 
+    frame 100 Angstroms across, that is below 0.001 Angstroms for keyframes.
+    """
+
+    def __init__(self, n_atoms, delta = False, keyframe_interval = 10, tolerance = None):
+        self.n_atoms = n_atoms
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        # the largest error of the delta frames, defaults to the error of the last keyframe
+        self.tolerance = tolerance
+        self.codes = []
+        self.offsets = []
+        self.scales = []
+        # the largest absolute coordinate of each frame along each axis, for the float32
+        # rounding of the decoded values
+        self.magnitudes = []
+        # indices of the frames stored as positions rather than differences, in order
+        self.keyframes = []
+        self._previous = None
+        # the positions of the frames decoded last, by index
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def is_keyframe(self, index):
+        i = bisect_right(self.keyframes, index) - 1
+        return i >= 0 and self.keyframes[i] == index
+
+    def _keyframe(self, index):
+        # the last keyframe at or before the frame
+        return self.keyframes[bisect_right(self.keyframes, index) - 1]
+
+    def append(self, positions):
+        """
+        Encodes and adds the (n_atoms, 3) positions of the next frame.
+        """
+        positions = np.asarray(positions, dtype = np.float64).reshape((self.n_atoms, 3))
+        index = len(self)
+        key = not self.delta or not self.keyframes or index - self.keyframes[-1] >= self.keyframe_interval
+        
+        if not key:
+            values = positions - self._previous
+            tolerance = self.tolerance
+            if tolerance is None:
+                tolerance = self.scales[self.keyframes[-1]] / 2
+            extent = np.ptp(values, axis = 0) if len(values) else np.zeros(3)
+            # the differences are too large to store in int8 within the tolerance
+            key = np.any(extent / 255 / 2 > tolerance)
+        
+        if key:
+            codes, offset, scale = quantize(positions)
+            self.keyframes.append(index)
+        else:
+            codes, offset, scale = quantize(values, dtype = np.int8)
+        
+        self.codes.append(codes)
+        self.offsets.append(offset)
+        self.scales.append(scale)
+        # the decoded values are within a quantization step of the original positions
+        self.magnitudes.append(np.abs(positions).max(axis = 0) + scale if len(positions) else np.zeros(3))
+
+        if self.delta:
+            decoded = _dequantize(codes, offset, scale)
+            self._previous = decoded if key else self._previous + decoded
+
+    def _values(self, index):
+        return _dequantize(self.codes[index], self.offsets[index], self.scales[index])
+
+    def decode(self, index):
+        """
+        Decodes the positions of the frame as an (n_atoms, 3) float32 array.
+        """
+        return self.decode_range(index, index + 1)[0]
+
+    def decode_range(self, start, stop):
+        """
+        Decodes the positions of the consecutive frames from start up to stop as an 
+        (n_frames, n_atoms, 3) float32 array.
+
+        Delta frames are accumulated once across the range rather than from the keyframe
+        for each frame, and the frames of the last call are kept, so that decoding the 
+        frames around the current one during playback only accumulates the new frames.
+        """
+        decoded = {}
+        previous = None
+        for index in range(start, stop):
+            positions = self._decoded.get(index)
+            if positions is None:
+                if not self.delta:
+                    positions = self._values(index)
+                else:
+                    keyframe = self._keyframe(index)
+                    if previous is None or previous[0] < keyframe:
+                        # continue from the closest frame decoded before, if any
+                        cached = [i for i in self._decoded if keyframe <= i < index]
+                        previous = (max(cached), self._decoded[max(cached)]) if cached else (keyframe - 1, None)
+                    current, positions = previous
+                    positions = np.zeros((self.n_atoms, 3)) if positions is None else positions.copy()
+                    for i in range(current + 1, index + 1):
+                        positions += self._values(i)
+            decoded[index] = positions
+            previous = (index, positions)
+        
+        self._decoded = decoded
+        frames = [decoded[index] for index in range(start, stop)]
+        return np.array(frames, dtype = np.float32).reshape((len(frames), self.n_atoms, 3))
+
+    def error_bound(self, index = None):
+        """
+        Returns the maximum absolute error of the decoded coordinates along each axis, for
+        the frame or for all frames.
+
+        This is half of the quantization step, plus the spacing of float32 values at the 
+        largest coordinate of the frame, which covers rounding the decoded values to 
+        float32 (and the much smaller float64 rounding while decoding).
+        """
+        if index is None:
+            scales, magnitudes = np.array(self.scales), np.array(self.magnitudes)
+        else:
+            scales, magnitudes = np.array([self.scales[index]]), np.array([self.magnitudes[index]])
+        if not len(scales):
+            return np.zeros(3)
+        bounds = scales / 2 + np.spacing(magnitudes.astype(np.float32)).astype(np.float64)
+        return bounds.max(axis = 0)
+
+    @property
+    def nbytes(self):
+        return sum(codes.nbytes for codes in self.codes) + len(self) * 9 * 8
+
+    def save(self, path):
+        """
+        Saves the store as an .npz file, compressed so the small delta codes shrink.
+        """
+        # keyframes and delta frames are saved as separate arrays of their own dtype
+        keyframes = np.array([self.is_keyframe(i) for i in range(len(self))], dtype = bool)
+        keyframe_codes = [codes for codes, key in zip(self.codes, keyframes) if key]
+        delta_codes = [codes for codes, key in zip(self.codes, keyframes) if not key]
+        np.savez_compressed(
+            path, 
+            keyframe_codes = np.array(keyframe_codes, dtype = np.int16).reshape((-1, self.n_atoms, 3)), 
+            delta_codes = np.array(delta_codes, dtype = np.int8).reshape((-1, self.n_atoms, 3)), 
+            keyframes = keyframes, 
+            offsets = np.array(self.offsets).reshape((len(self), 3)), 
+            scales = np.array(self.scales).reshape((len(self), 3)), 
+            magnitudes = np.array(self.magnitudes).reshape((len(self), 3)), 
+            delta = self.delta, 
+            keyframe_interval = self.keyframe_interval, 
+            tolerance = np.nan if self.tolerance is None else self.tolerance
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a store saved with `save()`.
+        """
+        with np.load(path) as data:
+            delta = bool(data['delta'])
+            keyframe_interval = int(data['keyframe_interval'])
+            if 'keyframes' in data:
+                keyframes = data['keyframes']
+                keyframe_codes, delta_codes = iter(data['keyframe_codes']), iter(data['delta_codes'])
+                codes = [next(keyframe_codes) if key else next(delta_codes) for key in keyframes]
+                n_atoms = data['keyframe_codes'].shape[1]
+                tolerance = float(data['tolerance'])
+            else:
+                # stores saved before the delta frames were int8 have int16 delta codes
+                # at a fixed interval
+                codes = list(data['codes'])
+                keyframes = [not delta or i % keyframe_interval == 0 for i in range(len(codes))]
+                n_atoms = data['codes'].shape[1]
+                tolerance = np.nan
+            
+            store = cls(
+                n_atoms = n_atoms, 
+                delta = delta, 
+                keyframe_interval = keyframe_interval, 
+                tolerance = None if np.isnan(tolerance) else tolerance
+            )
+            store.codes = codes
+            store.keyframes = [i for i, key in enumerate(keyframes) if key]
+            store.offsets = list(data['offsets'])
+            store.scales = list(data['scales'])
+            if 'magnitudes' in data:
+                store.magnitudes = list(data['magnitudes'])
+            else:
+                store.magnitudes = [
+                    np.abs(store.decode(i)).max(axis = 0).astype(np.float64) + store.scales[i]
+                    for i in range(len(store))
+                ]
+        return store
+
+class FrameChannels:
+    """
+    Per-frame values of the atoms for a trajectory, such as occupancy, B-factors, 
+    velocities or forces. Each channel is stored columnar as a single float32 array of 
+    shape (n_frames, n_atoms) for scalars or (n_frames, n_atoms, 3) for vectors, so the 
+    values of a frame are a view into the array.
+    """
+
+    def __init__(self, n_frames, n_atoms):
+        self.n_frames = n_frames
+        self.n_atoms = n_atoms
+        self.channels = {}
+
+    def __contains__(self, name):
+        return name in self.channels
+
+    def __len__(self):
+        return len(self.channels)
+
+    def names(self):
+        return list(self.channels.keys())
+
+    def is_vector(self, name):
+        return self.channels[name].ndim == 3
+
+    def add(self, name, values):
+        """
+        Adds a channel from the values of all frames, of shape (n_frames, n_atoms) or 
+        (n_frames, n_atoms, 3).
+        """
+        values = np.asarray(values, dtype = np.float32)
+        if values.shape[:2] != (self.n_frames, self.n_atoms):
+            raise ValueError(
+                f"Channel '{name}' has shape {values.shape}, expected "
+                f"({self.n_frames}, {self.n_atoms}) or ({self.n_frames}, {self.n_atoms}, 3)."
+            )
+        self.channels[name] = values
+
+    def set_frame(self, name, index, values):
+        """
+        Sets the values of a single frame of the channel, creating the channel on first 
+        use with the shape of the values.
+        """
+        values = np.asarray(values, dtype = np.float32)
+        if name not in self.channels:
+            shape = (self.n_frames, self.n_atoms) + values.shape[1:]
+            self.channels[name] = np.zeros(shape, dtype = np.float32)
+        self.channels[name][index] = values
+
+    def remove(self, name):
+        self.channels.pop(name, None)
+
+    def frame(self, name, index):
+        """
+        Returns the values of the channel for the frame.
+        """
+        return self.channels[name][index]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.channels.values())
+
+    def save(self, path):
+        np.savez_compressed(path, **self.channels)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            names = list(data.keys())
+            first = data[names[0]] if names else np.zeros((0, 0))
+            channels = cls(n_frames = first.shape[0], n_atoms = first.shape[1])
+            for name in names:
+                channels.channels[name] = data[name]
+        return channels
+
+class FrameMasks:
+    """
+    Per-frame boolean masks of the atoms for a trajectory, such as the dynamic selections.
+    Each mask is stored as a single (n_frames, n_bytes) array packed with `np.packbits()`,
+    so it is saved alongside the frame store rather than on frame objects.
+    """
+
+    def __init__(self, n_atoms):
+        self.n_atoms = n_atoms
+        self.masks = {}
+
+    def __contains__(self, name):
+        return name in self.masks
+
+    def __len__(self):
+        return len(self.masks)
+
+    def names(self):
+        return list(self.masks.keys())
+
+    def add(self, name, masks):
+        """
+        Adds a mask from the packed masks of all frames, of shape (n_frames, n_bytes).
+        """
+        masks = np.asarray(masks, dtype = np.uint8)
+        if masks.ndim != 2 or masks.shape[1] != (self.n_atoms + 7) // 8:
+            raise ValueError(
+                f"Mask '{name}' has shape {masks.shape}, expected (n_frames, {(self.n_atoms + 7) // 8})."
+            )
+        self.masks[name] = masks
+
+    def frame(self, name, index):
+        """
+        Returns the unpacked boolean mask of the frame.
+        """
+        return np.unpackbits(self.masks[name][index], count = self.n_atoms).astype(bool)
+
+    def save(self, path):
+        masks = {f"mask_{name}": values for name, values in self.masks.items()}
+        np.savez_compressed(path, n_atoms = self.n_atoms, **masks)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            masks = cls(n_atoms = int(data['n_atoms']))
+            for key in data.keys():
+                if key.startswith('mask_'):
+                    masks.masks[key[len('mask_'):]] = data[key]
+        return masks
@@ -11,7 +11,8 @@ def molecule_rcsb(pdb_code,
                   del_solvent=True, 
                   include_bonds=True, 
                   starting_style=0, 
-                  setup_nodes=True
+                  setup_nodes=True, 
+                  dedup_chains=False
                   ):
     
     mol, file = open_structure_rcsb(pdb_code = pdb_code, include_bonds=include_bonds)
@@ -20,7 +21,8 @@ def molecule_rcsb(pdb_code,
         mol_name = pdb_code,
         center_molecule = center_molecule,
         del_solvent = del_solvent, 
-        include_bonds = include_bonds
+        include_bonds = include_bonds, 
+        dedup_chains = dedup_chains
         )
     
     if setup_nodes:
@@ -30,7 +32,7 @@ def molecule_rcsb(pdb_code,
             starting_style = starting_style
             )
     
-    mol_object['bio_transform_dict'] = file['bioAssemblyList']
+    assembly.store_assemblies(mol_object, assembly.get_assemblies_mmtf(file['bioAssemblyList']))
     
     return mol_object
 
@@ -40,7 +42,8 @@ def molecule_local(file_path,
                    center_molecule=False, 
                    del_solvent=True, 
                    default_style=0, 
-                   setup_nodes=True
+                   setup_nodes=True, 
+                   dedup_chains=False
                    ): 
     import biotite.structure as struc
     
@@ -49,16 +52,25 @@ def molecule_local(file_path,
     file_path = os.path.abspath(file_path)
     file_ext = os.path.splitext(file_path)[1]
     
+    unit_cell, symmetry = None, None
+    
     if file_ext == '.pdb':
         mol, file = open_structure_local_pdb(file_path, include_bonds)
-        transforms = assembly.get_transformations_pdb(file)
+        assemblies = assembly.get_assemblies_pdb(file)
+        unit_cell = assembly.get_unit_cell_pdb(file)
+        symmetry = assembly.get_transformations_pdb(file)
     elif file_ext == '.pdbx' or file_ext == '.cif':
         mol, file = open_structure_local_pdbx(file_path, include_bonds)
         try:
-            transforms = assembly.get_transformations_pdbx(file)
+            assemblies = assembly.get_assemblies_pdbx(file)
         except:
-            transforms = None
+            assemblies = None
             # self.report({"WARNING"}, message='Unable to parse biological assembly information.')
+        try:
+            unit_cell = assembly.get_unit_cell_pdbx(file)
+            symmetry = assembly.get_symmetry_pdbx(file)
+        except:
+            unit_cell = None
     else:
         warnings.warn("Unable to open local file. Format not supported.")
     # if include_bonds chosen but no bonds currently exist (mol.bonds is None)
@@ -76,7 +88,8 @@ def molecule_local(file_path,
         file = file,
         center_molecule = center_molecule,
         del_solvent = del_solvent, 
-        include_bonds = include_bonds
+        include_bonds = include_bonds, 
+        dedup_chains = dedup_chains
         )
     
         
@@ -89,9 +102,17 @@ def molecule_local(file_path,
             starting_style = default_style
             )
     
-    # if transforms:
-        # mol_object['bio_transform_dict'] = (transforms)
-        # mol_object['bio_transnform_dict'] = 'testing'
+    # store the transformations for all of the assemblies, so they are only parsed once
+    if assemblies:
+        assembly.store_assemblies(mol_object, assemblies)
+    
+    # store the unit cell and symmetry operators for building crystal lattices
+    if unit_cell and len(symmetry) > 0:
+        # the centroid of the asymmetric unit (of the first model), used to pack the
+        # symmetry copies into the unit cell
+        coord = mol.coord[0] if mol.coord.ndim == 3 else mol.coord
+        centroid = np.mean(coord, axis = 0)
+        assembly.store_lattice(mol_object, unit_cell, symmetry, centroid = centroid)
         
     return mol_object
 
@@ -149,7 +170,13 @@ def add_attribute(object, name, data, type = "FLOAT", domain = "POINT", add = Tr
     if not add:
         return None
     attribute = object.data.attributes.new(name, type, domain)
-    attribute.data.foreach_set('value', data)
+    if type == "FLOAT_VECTOR":
+        # vectors have to be added as a 1D array
+        attribute.data.foreach_set('vector', np.ravel(data))
+    elif type == "FLOAT_COLOR":
+        attribute.data.foreach_set('color', np.ravel(data))
+    else:
+        attribute.data.foreach_set('value', data)
 
 def pdb_get_b_factors(file):
     """
@@ -187,7 +214,8 @@ def comp_secondary_structure(mol_array):
 
 def create_molecule(mol_array, mol_name, center_molecule = False, 
                     file = None,
-                    del_solvent = False, include_bonds = False, collection = None):
+                    del_solvent = False, include_bonds = False, collection = None, 
+                    dedup_chains = False, dedup_tolerance = 1.0):
     import biotite.structure as struc
     
     if np.shape(mol_array)[0] > 1:
@@ -202,12 +230,24 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
         mol_array = mol_array[np.invert(struc.filter_solvent(mol_array))]
 
     world_scale = 0.01
-    locations = mol_array.coord * world_scale
     
     centroid = np.array([0, 0, 0])
     if center_molecule:
         centroid = struc.centroid(mol_array) * world_scale
     
+    # only keep a single template for chains that are copies of each other, with the 
+    # copies being instanced on the transformations from the template
+    # the chain ids are taken from all chains, so the copies keep their own chain_id
+    chain_names = np.unique(mol_array.chain_id)
+    chain_instances = None
+    n_atoms_saved = 0
+    if dedup_chains and mol_frames is None:
+        keep, chain_instances, chain_copies = assembly.find_chain_instances(mol_array, tolerance = dedup_tolerance)
+        n_atoms_saved = int(np.sum(np.invert(keep)))
+        mol_array = mol_array[keep]
+    
+    locations = mol_array.coord * world_scale
+    
 
     # subtract the centroid from all of the positions to localise the molecule on the world origin
     if center_molecule:
@@ -270,7 +310,7 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
 
     
     def att_chain_id():
-        chain_id = np.searchsorted(np.unique(mol_array.chain_id), mol_array.chain_id)
+        chain_id = np.searchsorted(chain_names, mol_array.chain_id)
         return chain_id
     
     def att_b_factor():
@@ -321,6 +361,9 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
     def att_sec_struct():
         return comp_secondary_structure(mol_array)
     
+    def att_chain_instanced():
+        return np.isin(mol_array.chain_id, list(chain_instances.keys()))
+    
 
     # Add information about the bond types to the model on the edge domain
     # Bond types: 'ANY' = 0, 'SINGLE' = 1, 'DOUBLE' = 2, 'TRIPLE' = 3, 'QUADRUPLE' = 4
@@ -360,6 +403,11 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
         {'name': 'sec_struct',      'value': att_sec_struct,          'type': 'INT',     'domain': 'POINT'}
     )
     
+    if chain_instances:
+        attributes += (
+            {'name': 'chain_instanced', 'value': att_chain_instanced,     'type': 'BOOLEAN', 'domain': 'POINT'}, 
+        )
+    
     # assign the attributes to the object
     for att in attributes:
         # try:
@@ -368,10 +416,16 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
             # warnings.warn(f"Unable to add attribute: {att['name']}")
 
     if mol_frames:
+        from . import md
+        from .frames import FrameChannels
+        
+        # per-frame b_factors are stored as a channel, which updates the b_factor 
+        # attribute of the molecule on frame change
+        channels = FrameChannels(len(mol_frames), len(mol_array))
         try:
-            b_factors = pdb_get_b_factors(file)
+            channels.add('b_factor', np.array(pdb_get_b_factors(file)))
         except:
-            b_factors = None
+            pass
         
         coll_frames = coll.frames(mol_object.name)
         
@@ -381,11 +435,12 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
                 collection=coll_frames, 
                 locations= frame.coord * world_scale - centroid
             )
-            if b_factors:
-                try:
-                    add_attribute(obj_frame, 'b_factor', b_factors[i])
-                except:
-                    b_factors = False
+            if 'b_factor' in channels:
+                add_attribute(obj_frame, 'b_factor', channels.frame('b_factor', i))
+        
+        md.store_frame_channels(mol_object, channels)
+        mol_object['frame_start'] = bpy.context.scene.frame_start
+        mol_object['frame_end'] = bpy.context.scene.frame_end
         
         # disable the frames collection so it is not seen
         bpy.context.view_layer.layer_collection.children[collection.name].children[coll_frames.name].exclude = True
@@ -395,10 +450,28 @@ def create_molecule(mol_array, mol_name, center_molecule = False,
     # add custom properties to the actual blender object, such as number of chains, biological assemblies etc
     # currently biological assemblies can be problematic to holding off on doing that
     try:
-        mol_object['chain_id_unique'] = list(np.unique(mol_array.chain_id))
+        mol_object['chain_id_unique'] = list(chain_names)
     except:
         warnings.warn('No chain information detected.')
     
+    if chain_instances:
+        # index the transformations by the chain_id attribute of the template chains, with 
+        # the translations corrected for the centering of the template
+        centroid_angstrom = centroid / world_scale
+        instances = {}
+        instance_chain_ids = {}
+        for name, transforms in chain_instances.items():
+            transforms = transforms.copy()
+            transforms[:, :, 3] += transforms[:, :, :3] @ centroid_angstrom - centroid_angstrom
+            key = str(np.searchsorted(chain_names, name))
+            instances[key] = transforms
+            # the chain_id of each copy, applied to the atoms of the copy when instanced
+            instance_chain_ids[key] = np.searchsorted(chain_names, chain_copies[name]).tolist()
+        
+        assembly.store_assemblies(mol_object, instances, name = 'chain_instances')
+        mol_object['chain_instances_chain_ids'] = instance_chain_ids
+        mol_object['chain_instances_atoms_saved'] = n_atoms_saved
+    
     return mol_object, coll_frames
 
 
@@ -2,8 +2,12 @@ import bpy
 import numpy as np
 from . import data
 from . import coll
+from .frames import FrameStore, FrameChannels, FrameMasks
 from .load import create_object, add_attribute
 import warnings
+import contextlib
+import os
+import sys
 
 class TrajectorySelectionList(bpy.types.PropertyGroup):
     """Group of properties for custom selections for MDAnalysis import."""
@@ -19,6 +23,13 @@ class TrajectorySelectionList(bpy.types.PropertyGroup):
         description="String that provides a selection through MDAnalysis", 
         default = "name CA"
     )
+    
+    updating: bpy.props.BoolProperty(
+        name = "Dynamic", 
+        description = "Re-evaluate the selection for every frame, e.g. for waters within a \
+            cutoff of a binding pocket ('around 5 resname LIG')", 
+        default = False
+    )
 
 class MOL_UL_TrajectorySelectionListUI(bpy.types.UIList):
     """UI List"""
@@ -62,6 +73,913 @@ class TrajectorySelection_OT_DeleteIem(bpy.types.Operator):
         
         return {'FINISHED'}
 
+# packed per-frame masks of the dynamic selections, by object name, as a dictionary of 
+# selection names to (n_frames, n_bytes) arrays from np.packbits()
+_dynamic_selections = {}
+
+def dynamic_selection_masks(atoms, frames, selection, chunk_size = 50, n_workers = 1):
+    """
+    Evaluates a selection with MDAnalysis `updating=True` semantics for each of the 
+    frames, e.g. 'around 5 resname LIG', so that the selected atoms change with each frame.
+    
+    The frames are split into chunks which are evaluated in worker processes with 
+    `map_frame_chunks()`. The distance based selections of MDAnalysis use its grid 
+    neighbour search for each frame.
+
+    Args:
+        atoms (MDAnalysis.AtomGroup): The atoms the masks are over.
+        frames (np.ndarray): Indices of the frames in the trajectory.
+        selection (str): MDAnalysis selection string.
+        chunk_size (int, optional): Number of frames in each chunk. Defaults to 50.
+        n_workers (int, optional): Number of worker processes. Defaults to 1, which 
+            evaluates the chunks in this process.
+
+    Returns:
+        np.ndarray: (n_frames, n_bytes) packed boolean masks, unpack with 
+            `np.unpackbits(masks[i], count = n_atoms).astype(bool)`.
+    """
+    masks = map_frame_chunks(
+        frame_workers().dynamic_selection_chunk, atoms, frames, selection, 
+        chunk_size = chunk_size, 
+        n_workers = n_workers
+    )
+    if not masks:
+        return np.zeros((0, (atoms.n_atoms + 7) // 8), dtype = np.uint8)
+    return np.concatenate(masks)
+
+def _frame_number(frame):
+    # frames are named '<name>_frame_<number>', possibly with a '.001' suffix
+    return int(frame.name.rsplit('_frame_', 1)[-1].split('.')[0])
+
+def dynamic_selection_cache(obj):
+    """
+    Returns the packed per-frame masks of the dynamic selections of the object. If they
+    aren't cached (e.g. after reopening the file) they are loaded from the masks saved 
+    next to the .blend file, or for older files rebuilt from the attributes stored on the
+    frames of the trajectory.
+    """
+    cached = _dynamic_selections.get(obj.name)
+    if cached is not None:
+        return cached
+    
+    cached = {}
+    coll_frames = bpy.data.collections.get(obj.get('frames_collection', ''))
+    if obj.get('frame_selections'):
+        masks = _load_data_file(FrameMasks, obj['frame_selections'])
+        if masks is not None:
+            cached = masks.masks
+    elif coll_frames:
+        frames = sorted(coll_frames.objects, key = _frame_number)
+        for name in obj.get('dynamic_selections', []):
+            masks = []
+            for frame in frames:
+                values = np.zeros(len(frame.data.vertices), dtype = bool)
+                frame.data.attributes[name].data.foreach_get('value', values)
+                masks.append(np.packbits(values))
+            cached[name] = np.array(masks)
+    
+    _dynamic_selections[obj.name] = cached
+    return cached
+
+def trajectory_frame_position(obj, n_frames, frame_current):
+    """
+    Returns the (fractional) position in the trajectory frames for the scene frame. The
+    frames are played over the scene frame range stored on the object on import as 
+    'frame_start' and 'frame_end', falling back to the current scene frame range.
+    """
+    scene = bpy.context.scene
+    start = obj.get('frame_start', scene.frame_start)
+    end = obj.get('frame_end', scene.frame_end)
+    
+    fraction = np.clip((frame_current - start) / max(end - start, 1), 0, 1)
+    return fraction * (n_frames - 1)
+
+def trajectory_frame_index(obj, n_frames, frame_current):
+    """
+    Returns the index of the trajectory frame closest to the scene frame.
+    """
+    return int(round(trajectory_frame_position(obj, n_frames, frame_current)))
+
+# the names of the frame objects of each trajectory and the positions of the frames read
+# last, by the session uid of the object and its frames collection, so a new object or
+# a re-import never plays the frames of another trajectory
+_frame_positions = {}
+
+def _frame_positions_key(obj):
+    return (obj.session_uid, obj.get('frames_collection', ''))
+
+def clear_frame_positions(obj = None):
+    """
+    Clears the cached frames of the object, and those of any objects that have been
+    removed.
+    """
+    if obj is not None:
+        _frame_positions.pop(_frame_positions_key(obj), None)
+    uids = {ob.session_uid for ob in bpy.data.objects}
+    for key in [key for key in _frame_positions if key[0] not in uids]:
+        del _frame_positions[key]
+
+def _frame_objects(obj):
+    # the cached frame object names of the trajectory, in order
+    key = _frame_positions_key(obj)
+    cached = _frame_positions.get(key)
+    if cached is None:
+        coll_frames = bpy.data.collections.get(obj.get('frames_collection', ''))
+        frames = sorted(coll_frames.objects, key = _frame_number) if coll_frames else []
+        cached = {'names': [frame.name for frame in frames], 'positions': {}}
+        _frame_positions[key] = cached
+    return cached
+
+def frame_count(obj):
+    """
+    Returns the number of frame objects of the object's trajectory.
+    """
+    return len(_frame_objects(obj)['names'])
+
+def frame_positions(obj, start = 0, stop = None):
+    """
+    Returns the positions of the frames from start up to stop of the object's trajectory
+    as a single (n_frames, n_atoms, 3) array, read from the frame objects. 
+    
+    Only the requested frames are read, and the frames of the last call are kept, so 
+    that reading the frames around the current one during playback only reads the new
+    frames. Returns an empty array if a frame doesn't match the atoms of the object.
+    """
+    cached = _frame_objects(obj)
+    names = cached['names']
+    stop = len(names) if stop is None else min(stop, len(names))
+    n_atoms = len(obj.data.vertices)
+    
+    positions = {}
+    for i in range(start, stop):
+        values = cached['positions'].get(i)
+        if values is None:
+            frame = bpy.data.objects.get(names[i])
+            if frame is None or len(frame.data.vertices) != n_atoms:
+                return np.zeros((0, n_atoms, 3), dtype = np.float32)
+            values = np.zeros(n_atoms * 3, dtype = np.float32)
+            frame.data.vertices.foreach_get('co', values)
+            values = values.reshape((n_atoms, 3))
+        positions[i] = values
+    
+    cached['positions'] = positions
+    return np.array([positions[i] for i in range(start, stop)], dtype = np.float32).reshape((-1, n_atoms, 3))
+
+def minimum_image(vectors, box = None):
+    """
+    Wraps the displacement vectors into the nearest periodic image of the box, so that 
+    atoms crossing the boundary take the short path.
+
+    The box is either the (3,) lengths of an orthorhombic box, or the (3, 3) box vectors
+    as rows for triclinic boxes. Triclinic displacements are wrapped in fractional 
+    coordinates, which gives the nearest image for the reduced boxes written by MD 
+    engines, though not always for strongly skewed boxes.
+    """
+    if box is None:
+        return vectors
+    box = np.asarray(box, dtype = np.float64)
+    if box.size == 3:
+        box = box.astype(vectors.dtype)
+        return vectors - box * np.round(vectors / box)
+    
+    box = box.reshape((3, 3))
+    fractional = vectors @ np.linalg.inv(box)
+    return (vectors - np.round(fractional) @ box).astype(vectors.dtype)
+
+def interpolate_frames(positions, t, method = 'LINEAR', box = None):
+    """
+    Interpolates the atom positions between the stored frames.
+
+    Args:
+        positions (np.ndarray): (n_frames, n_atoms, 3) positions of the frames.
+        t (float): Position between the frames, from 0 to n_frames - 1.
+        method (str, optional): 'LINEAR' or 'CUBIC' (Catmull-Rom). Defaults to 'LINEAR'.
+        box (np.ndarray, optional): (3,) lengths of an orthorhombic periodic box or (3, 3)
+            box vectors of a triclinic box, for displacements to be taken to the nearest 
+            periodic image, see `minimum_image()`. Defaults to None.
+
+    Returns:
+        np.ndarray: (n_atoms, 3) interpolated positions.
+    """
+    n_frames = len(positions)
+    t = float(np.clip(t, 0, n_frames - 1))
+    i = min(int(np.floor(t)), max(n_frames - 2, 0))
+    f = np.float32(t - i)
+    
+    p1 = positions[i]
+    if n_frames == 1 or f == 0:
+        return p1.copy()
+    
+    # positions of the neighbouring frames, unwrapped to be continuous with p1
+    d12 = minimum_image(positions[i + 1] - p1, box)
+    if method == 'LINEAR':
+        return p1 + f * d12
+    
+    d01 = minimum_image(p1 - positions[max(i - 1, 0)], box)
+    d23 = minimum_image(positions[min(i + 2, n_frames - 1)] - positions[i + 1], box)
+    
+    # Catmull-Rom spline through p0, p1, p2, p3 with p1 at the origin:
+    # p(f) = p1 + f * m1 + f^2 * (3 d12 - 2 m1 - m2) + f^3 * (m1 + m2 - 2 d12)
+    # where m1 = (p2 - p0) / 2 and m2 = (p3 - p1) / 2 are the tangents
+    m1 = (d01 + d12) / 2
+    m2 = (d12 + d23) / 2
+    return p1 + f * m1 + f ** 2 * (3 * d12 - 2 * m1 - m2) + f ** 3 * (m1 + m2 - 2 * d12)
+
+# quantized frame stores of the trajectories, by object name
+_frame_stores = {}
+
+def _save_data_file(obj, data, suffix):
+    # saves the data next to the .blend file (or in the temporary directory if the file
+    # isn't saved yet, from where it is moved when the file is saved), returning the path
+    # relative to the .blend file where possible. The name is unique so files of objects
+    # with the same name in different sessions or .blend files don't overwrite each other
+    import tempfile
+    import uuid
+    
+    directory = os.path.dirname(bpy.data.filepath) if bpy.data.filepath else tempfile.gettempdir()
+    name = f"{bpy.path.clean_name(obj.name)}_{suffix}_{uuid.uuid4().hex[:8]}.npz"
+    path = os.path.join(directory, name)
+    data.save(path)
+    return bpy.path.relpath(path) if bpy.data.filepath else path
+
+def _data_file_path(path):
+    # the absolute path of a data file, falling back to a file of the same name next to 
+    # the .blend file, for files moved there when the file was saved
+    path = bpy.path.abspath(path)
+    if not os.path.exists(path) and bpy.data.filepath:
+        moved = os.path.join(os.path.dirname(bpy.data.filepath), os.path.basename(path))
+        if os.path.exists(moved):
+            return moved
+    return path
+
+# data files which couldn't be loaded, so the frame change handlers warn only once
+_failed_data_files = set()
+
+def _load_data_file(cls, path):
+    # loads the frame store or channels from the file, or returns None with a warning
+    # the first time the file can't be loaded
+    path = _data_file_path(path)
+    if path in _failed_data_files:
+        return None
+    try:
+        return cls.load(path)
+    except Exception as error:
+        _failed_data_files.add(path)
+        warnings.warn(f"Unable to load trajectory data from '{path}': {error}")
+        return None
+
+@bpy.app.handlers.persistent
+def move_data_files(*args):
+    """
+    Save handler which moves the frame stores, channels and dynamic selection masks of
+    the trajectories next to the saved .blend file, from the temporary directory for 
+    files which weren't saved before, or copies them when the file is saved into a 
+    different directory.
+    """
+    import shutil
+    import tempfile
+    
+    if not bpy.data.filepath:
+        return
+    directory = os.path.dirname(bpy.data.filepath)
+    temporary = os.path.realpath(tempfile.gettempdir())
+    
+    for obj in bpy.data.objects:
+        for key in ('frame_store', 'frame_channels', 'frame_selections'):
+            path = obj.get(key)
+            if not path:
+                continue
+            source = _data_file_path(path)
+            target = os.path.join(directory, os.path.basename(source))
+            if os.path.realpath(os.path.dirname(source)) == os.path.realpath(directory):
+                obj[key] = bpy.path.relpath(source)
+                continue
+            if not os.path.exists(source):
+                continue
+            try:
+                if os.path.realpath(os.path.dirname(source)) == temporary:
+                    shutil.move(source, target)
+                else:
+                    shutil.copy2(source, target)
+            except OSError as error:
+                warnings.warn(f"Unable to move trajectory data next to the .blend file: {error}")
+                continue
+            obj[key] = bpy.path.relpath(target)
+
+def save_frame_store(obj, store):
+    """
+    Saves the frame store of the object next to the .blend file (or in the temporary
+    directory if the file isn't saved yet) and caches it. Returns the path to store on
+    the object, relative to the .blend file where possible.
+    """
+    _frame_stores[obj.name] = store
+    return _save_data_file(obj, store, 'frames')
+
+def frame_store(obj):
+    """
+    Returns the frame store of the object, loading it from disk if it isn't cached, or
+    None if the trajectory's frames are stored as objects or the store can't be loaded.
+    """
+    path = obj.get('frame_store')
+    if not path:
+        return None
+    
+    store = _frame_stores.get(obj.name)
+    if store is None:
+        store = _load_data_file(FrameStore, path)
+        if store is not None:
+            _frame_stores[obj.name] = store
+    return store
+
+# per-frame channels of the trajectories, by object name
+_frame_channels = {}
+
+def frame_channel_readers(channels):
+    """
+    Returns the functions that read the per-frame channels for each frame, as a dictionary
+    of the channel names to functions of the timestep and atom group.
+
+    Channels are given either as names of the built-in channels ('occupancy', 
+    'tempfactors', 'velocities' and 'forces'), or as a dictionary of names to functions 
+    of the atom group, for values computed from the universe, e.g. 
+    `{'charge_density': lambda atoms: ...}`.
+    """
+    # the built-in channels are read the same way here and in the worker processes
+    reader = frame_workers()
+    built_in = {
+        name: (lambda ts, atoms, name = name: reader.read_channel(name, ts, atoms)) 
+        for name in reader.built_in_channels
+    }
+    
+    if not channels:
+        return {}
+    if isinstance(channels, dict):
+        return {name: (lambda ts, atoms, func = func: func(atoms)) for name, func in channels.items()}
+    
+    readers = {}
+    for name in channels:
+        if name in built_in:
+            readers[name] = built_in[name]
+        else:
+            warnings.warn(f"Unknown per-frame channel: {name}.")
+    return readers
+
+def read_frame_channels(readers, channels, index, ts, atoms):
+    """
+    Reads each of the per-frame channels for the current timestep into the channels.
+    Channels which can't be read for the first frame are dropped, later failures leave
+    the values of that frame as zeros.
+    """
+    for name, read in list(readers.items()):
+        try:
+            channels.set_frame(name, index, read(ts, atoms))
+        except Exception:
+            if name not in channels:
+                del readers[name]
+            warnings.warn(f"Unable to read per-frame channel '{name}' for frame {ts.frame}.")
+
+def add_frame_channel_values(channels, name, values, frames):
+    """
+    Adds the values of a built-in channel read by the worker processes, one array per
+    frame or None where it couldn't be read, with the same handling of failures as 
+    `read_frame_channels()`.
+    """
+    for index, (frame, frame_values) in enumerate(zip(frames, values)):
+        if frame_values is None:
+            warnings.warn(f"Unable to read per-frame channel '{name}' for frame {frame}.")
+            if name not in channels:
+                return
+            continue
+        channels.set_frame(name, index, frame_values)
+
+def store_frame_channels(obj, channels):
+    """
+    Stores the per-frame channels of the object, caching them and saving them next to 
+    the .blend file, and adds the values of the first frame as attributes of the object.
+    """
+    if len(channels) == 0:
+        return
+    
+    _frame_channels[obj.name] = channels
+    obj['frame_channels'] = _save_data_file(obj, channels, 'channels')
+    for name in channels.names():
+        type = 'FLOAT_VECTOR' if channels.is_vector(name) else 'FLOAT'
+        attribute = obj.data.attributes.get(name)
+        if attribute:
+            obj.data.attributes.remove(attribute)
+        add_attribute(obj, name, channels.frame(name, 0), type = type, domain = 'POINT')
+
+def frame_channels(obj):
+    """
+    Returns the per-frame channels of the object, loading them from disk if they aren't
+    cached, or None if the object has none or they can't be loaded.
+    """
+    path = obj.get('frame_channels')
+    if not path:
+        return None
+    
+    channels = _frame_channels.get(obj.name)
+    if channels is None:
+        channels = _load_data_file(FrameChannels, path)
+        if channels is not None:
+            _frame_channels[obj.name] = channels
+    return channels
+
+@bpy.app.handlers.persistent
+def update_frame_channels(scene, depsgraph = None):
+    """
+    Frame change handler which writes the values of the current frame of each per-frame
+    channel into the attributes of the object.
+    """
+    for obj in scene.objects:
+        if not obj.get('frame_channels'):
+            continue
+        
+        channels = frame_channels(obj)
+        if channels is None or channels.n_frames == 0 or channels.n_atoms != len(obj.data.vertices):
+            continue
+        
+        index = trajectory_frame_index(obj, channels.n_frames, scene.frame_current)
+        for name in channels.names():
+            attribute = obj.data.attributes.get(name)
+            if not attribute:
+                continue
+            key = 'vector' if channels.is_vector(name) else 'value'
+            attribute.data.foreach_set(key, channels.frame(name, index).ravel())
+        obj.data.update()
+
+@bpy.app.handlers.persistent
+def update_frame_interpolation(scene, depsgraph = None):
+    """
+    Frame change handler which writes the interpolated positions between the trajectory
+    frames into the mesh of each trajectory with 'frame_interpolation' enabled, or the 
+    decoded frame for trajectories with a frame store.
+    """
+    # frames read for objects which have since been removed are released
+    if _frame_positions:
+        clear_frame_positions()
+    
+    for obj in scene.objects:
+        method = obj.get('frame_interpolation', 'NONE')
+        store = frame_store(obj) if obj.get('frame_store') else None
+        if method == 'NONE' and store is None:
+            continue
+        
+        # only the frames around the current position are decoded or read
+        if store is not None:
+            n_frames = len(store)
+            if n_frames == 0 or store.n_atoms != len(obj.data.vertices):
+                continue
+        else:
+            n_frames = frame_count(obj)
+            if n_frames == 0:
+                continue
+        t = trajectory_frame_position(obj, n_frames, scene.frame_current_final)
+        if method == 'NONE':
+            t, method = round(t), 'LINEAR'
+        start = max(int(np.floor(t)) - 1, 0)
+        if store is not None:
+            positions = store.decode_range(start, min(start + 4, n_frames))
+        else:
+            positions = frame_positions(obj, start, start + 4)
+            if len(positions) == 0:
+                continue
+        
+        # the box of the frame the interpolation starts from, for triclinic boxes, or the
+        # box lengths of the topology for orthorhombic boxes
+        if obj.get('periodic_boxes'):
+            boxes = get_periodic_boxes(obj)
+            box = boxes[min(int(np.floor(t)), len(boxes) - 1)] * obj.get('world_scale', 0.01)
+        else:
+            box = obj.get('periodic_box')
+        t -= start
+        interpolated = interpolate_frames(positions, t, method = method, box = box)
+        obj.data.vertices.foreach_set('co', interpolated.ravel())
+        obj.data.update()
+
+@bpy.app.handlers.persistent
+def update_dynamic_selections(scene, depsgraph = None):
+    """
+    Frame change handler which writes the precomputed mask of the current frame into 
+    the dynamic selection attributes of each trajectory.
+    """
+    for obj in scene.objects:
+        names = obj.get('dynamic_selections')
+        if not names:
+            continue
+        
+        n_atoms = len(obj.data.vertices)
+        for name, masks in dynamic_selection_cache(obj).items():
+            attribute = obj.data.attributes.get(name)
+            if not attribute or len(masks) == 0:
+                continue
+            index = trajectory_frame_index(obj, len(masks), scene.frame_current)
+            mask = np.unpackbits(masks[index], count = n_atoms).astype(bool)
+            attribute.data.foreach_set('value', mask)
+        obj.data.update()
+
+def trajectory_transformations(univ, 
+                               file_top, 
+                               file_traj, 
+                               unwrap = False, 
+                               center = False, 
+                               fit = False, 
+                               selection = "protein", 
+                               reference_frame = 0
+                               ):
+    """
+    Builds a list of MDAnalysis on-the-fly transformations for the trajectory, to be added
+    with `univ.trajectory.add_transformations()`.
+
+    Args:
+        univ (MDAnalysis.Universe): The universe the transformations are for.
+        file_top (str): Topology file, used to load the reference for fitting.
+        file_traj (str): Trajectory file, used to load the reference for fitting.
+        unwrap (bool, optional): Make molecules broken across the periodic boundaries 
+            whole. Requires bonds. Defaults to False.
+        center (bool, optional): Center the selection in the box. Defaults to False.
+        fit (bool, optional): Fit the selection onto the reference frame, removing its
+            rotation and translation. Defaults to False.
+        selection (str, optional): Selection to center and fit. Defaults to "protein".
+        reference_frame (int, optional): Frame to fit onto. Defaults to 0.
+
+    Returns:
+        list: The transformations, in the order they are applied.
+    """
+    import MDAnalysis.transformations as trans
+    
+    def transformation_atoms(atoms):
+        group = atoms.select_atoms(selection)
+        if group.n_atoms == 0:
+            warnings.warn(f"Transformation selection '{selection}' is empty, using all atoms.")
+            group = atoms.atoms
+        return group
+    
+    def workflow_for(atoms, fitting = False):
+        workflow = []
+        if unwrap:
+            if hasattr(atoms, 'bonds'):
+                workflow.append(trans.unwrap(atoms.atoms))
+            else:
+                warnings.warn("Unable to unwrap the trajectory, the topology contains no bonds.")
+        if center:
+            if atoms.dimensions is not None:
+                workflow.append(trans.center_in_box(transformation_atoms(atoms), wrap = False))
+            else:
+                warnings.warn("Unable to center the trajectory, it contains no box.")
+        return workflow
+    
+    workflow = workflow_for(univ)
+    
+    if fit:
+        # the reference is a separate universe with the same transformations, positioned
+        # at the first imported frame
+        reference = load_universe(file_top, file_traj)
+        reference_workflow = workflow_for(reference)
+        if reference_workflow:
+            reference.trajectory.add_transformations(*reference_workflow)
+        reference.trajectory[reference_frame]
+        workflow.append(trans.fit_rot_trans(
+            transformation_atoms(univ), 
+            transformation_atoms(reference)
+        ))
+    
+    return workflow
+
+def trajectory_coordinates(univ, selection, frames, chunk_size = 100, n_workers = 1):
+    """
+    Streams the trajectory once, reading the centered positions of the selection for each
+    of the frames. The chunks of frames are read with `map_frame_chunks()`, in worker 
+    processes when there are multiple workers.
+
+    Args:
+        univ (MDAnalysis.Universe): The universe.
+        selection (str): Selection the structural comparison is made on, e.g. 'name CA'.
+        frames (np.ndarray): Indices of the frames to read.
+        chunk_size (int, optional): Number of frames read by each task. Defaults to 100.
+        n_workers (int, optional): Number of worker processes. Defaults to 1, which 
+            reads the chunks in this process.
+
+    Returns:
+        np.ndarray: (n_frames, n_atoms, 3) centered positions of the selection.
+    """
+    atoms = univ.select_atoms(selection)
+    if atoms.n_atoms == 0:
+        warnings.warn(f"Keyframe selection '{selection}' is empty, using all atoms.")
+        atoms = univ.atoms
+    
+    chunks = map_frame_chunks(
+        frame_workers().coordinates_chunk, atoms, frames, 
+        chunk_size = chunk_size, 
+        n_workers = n_workers
+    )
+    if not chunks:
+        return np.zeros((0, atoms.n_atoms, 3), dtype = np.float32)
+    return np.concatenate(chunks)
+
+def rmsd_to_reference(coordinates, reference):
+    """
+    Returns the RMSD of each of the centered frames to the centered reference, after 
+    optimal superposition. The Kabsch rotations are only needed through the singular 
+    values of the (n_frames, 3, 3) covariance matrices, so all frames are compared at once.
+    """
+    covariance = np.einsum('fij,ik->fjk', coordinates, reference)
+    u, singular, vt = np.linalg.svd(covariance)
+    
+    # correct for reflections, which are not proper rotations
+    sign = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+    singular[:, -1] *= sign
+    
+    squared = (coordinates ** 2).sum(axis = (1, 2)) + (reference ** 2).sum()
+    msd = (squared - 2 * singular.sum(axis = 1)) / reference.shape[0]
+    return np.sqrt(np.clip(msd, 0, None))
+
+def select_keyframes(coordinates, n_keyframes):
+    """
+    Selects maximally diverse frames by farthest point sampling on the RMSD: starting
+    with the first frame, the frame with the largest RMSD to all of the frames already 
+    chosen is added until there are `n_keyframes`.
+
+    Returns:
+        np.ndarray: Sorted indices of the chosen frames.
+    """
+    n_frames = len(coordinates)
+    if n_keyframes >= n_frames:
+        return np.arange(n_frames)
+    
+    chosen = [0]
+    distance = rmsd_to_reference(coordinates, coordinates[0])
+    for _ in range(n_keyframes - 1):
+        frame = int(np.argmax(distance))
+        chosen.append(frame)
+        distance = np.minimum(distance, rmsd_to_reference(coordinates, coordinates[frame]))
+    
+    return np.sort(chosen)
+
+def frame_workers():
+    """
+    Returns the module of functions that are evaluated in worker processes.
+
+    It is imported as a top-level module, so that worker processes can import it without 
+    importing bpy through the MolecularNodes package.
+    """
+    path = os.path.join(os.path.dirname(__file__), 'workers')
+    if path not in sys.path:
+        sys.path.append(path)
+    import mn_frame_reader
+    return mn_frame_reader
+
+def map_frame_chunks(func, atoms, frames, *args, chunk_size = 50, n_workers = 1):
+    """
+    Evaluates `func(atoms, chunk, *args)` for chunks of the frames, returning the results
+    of the chunks in order. `func` must be a function of the worker module,
+    see `frame_workers()`.
+
+    With more than one worker the chunks are evaluated in worker processes, which avoids
+    the GIL, with each task unpickling the atom group into its own universe. Otherwise 
+    the chunks are evaluated in this process, on a pickled copy of the atom group so that
+    the trajectory position of the original universe isn't changed. In both cases every 
+    chunk has its own reader and on-the-fly transformations.
+
+    Args:
+        func (callable): Function of the worker module to evaluate for each chunk.
+        atoms (MDAnalysis.AtomGroup): The atoms to evaluate.
+        frames (np.ndarray): Indices of the frames in the trajectory.
+        *args: Extra arguments passed to `func`, which must be picklable.
+        chunk_size (int, optional): Number of frames in each chunk. Defaults to 50.
+        n_workers (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        list: The result of each chunk.
+    """
+    import pickle
+    
+    frames = np.asarray(frames)
+    chunks = [frames[i:i + chunk_size] for i in range(0, len(frames), chunk_size)]
+    
+    if n_workers > 1 and len(chunks) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        context = multiprocessing.get_context('spawn')
+        n_workers = min(n_workers, len(chunks))
+        with ProcessPoolExecutor(max_workers = n_workers, mp_context = context) as executor:
+            tasks = [executor.submit(func, atoms, chunk, *args) for chunk in chunks]
+            return [task.result() for task in tasks]
+    
+    copy = pickle.loads(pickle.dumps(atoms))
+    return [func(copy, chunk, *args) for chunk in chunks]
+
+@contextlib.contextmanager
+def parallel_frame_positions(atoms, frames, n_workers = 4, chunk_size = None, channels = ()):
+    """
+    Reads the positions of the atoms for each of the frames, splitting the frames across
+    worker processes which each open their own universe on the same files.
+
+    The workers write float32 coordinates directly into a shared memory block, which is
+    exposed as an (n_frames, n_atoms, 3) array for the duration of the context.
+    The (n_frames, 6) box dimensions of the frames and the values of the built-in 
+    per-frame channels are returned alongside.
+
+    Args:
+        atoms (MDAnalysis.AtomGroup): The atoms to read, with the selection applied.
+        frames (np.ndarray): Indices of the frames in the trajectory.
+        n_workers (int, optional): Number of worker processes. Defaults to 4.
+        chunk_size (int, optional): Number of consecutive frames read by each task. 
+            Defaults to splitting the frames evenly, four tasks per worker.
+        channels (tuple, optional): Names of the built-in per-frame channels to read, 
+            see `frame_channel_readers()`. Defaults to none.
+
+    Yields:
+        tuple: (n_frames, n_atoms, 3) positions, (n_frames, 6) box dimensions (NaN 
+            where there is no box) and a dictionary of each channel's values for each 
+            frame (None where the channel couldn't be read).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    
+    reader = frame_workers()
+    frames = np.asarray(frames)
+    shape = (len(frames), atoms.n_atoms, 3)
+    if chunk_size is None:
+        chunk_size = max(1, int(np.ceil(len(frames) / (n_workers * 4))))
+    
+    shm = shared_memory.SharedMemory(create = True, size = max(1, int(np.prod(shape)) * 4))
+    try:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers = n_workers, mp_context = context) as executor:
+            tasks = [
+                executor.submit(
+                    reader.read_frames, atoms, frames[start:start + chunk_size], 
+                    shm.name, shape, start, tuple(channels)
+                    )
+                for start in range(0, len(frames), chunk_size)
+            ]
+            results = [task.result() for task in tasks]
+        
+        dimensions = np.concatenate([result[0] for result in results])
+        values = {name: [value for result in results for value in result[1][name]] for name in channels}
+        positions = np.ndarray(shape, dtype = np.float32, buffer = shm.buf)
+        yield positions, dimensions, values
+        del positions
+    finally:
+        shm.close()
+        shm.unlink()
+
+def load_universe(file_top, file_traj = "", use_cache = True):
+    """
+    Creates the MDAnalysis Universe for the topology and trajectory.
+
+    Parsing large topologies can take minutes, so the parsed topology (names, types, 
+    residues, chains, bonds and any other topology attributes) is pickled into a cache 
+    keyed by the hash and extension of the topology file and the MDAnalysis version. 
+    Later imports of any trajectory with the same topology build the universe from the 
+    cached topology without parsing the file.
+    """
+    import MDAnalysis as mda
+    import pickle
+    from . import cache
+    
+    if file_traj == "":
+        # topology files without a trajectory are also read for their coordinates
+        return mda.Universe(file_top)
+    if not use_cache:
+        return mda.Universe(file_top, file_traj)
+    
+    # MDAnalysis picks the topology parser from the file extension, so the same contents
+    # with a different extension can parse differently
+    extension = os.path.splitext(file_top)[1].lstrip('.').lower()
+    key = f"{cache.file_hash(file_top)}_{extension}_{mda.__version__}"
+    path = os.path.join(cache.cache_directory('topology'), key + '.pkl')
+    
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                topology = pickle.load(f)
+            return mda.Universe(topology, file_traj)
+        except Exception as error:
+            warnings.warn(f"Unable to use cached topology for '{file_top}', parsing it again: {error}")
+    
+    univ = mda.Universe(file_top, file_traj)
+    try:
+        # written to a temporary file first, so a cache file is never left half written
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(univ._topology, f, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+    except Exception as error:
+        warnings.warn(f"Unable to cache topology for '{file_top}': {error}")
+    
+    return univ
+
+def map_unique(values, func):
+    """
+    Applies the function to each distinct value only once and broadcasts the results back
+    with the inverse indices, so mapping names over millions of atoms costs one call per 
+    distinct name plus a single numpy gather.
+    """
+    unique, inverse = np.unique(np.asarray(values), return_inverse = True)
+    mapped = np.array([func(value) for value in unique])
+    return mapped[inverse.reshape(-1)] if len(mapped) else mapped
+
+def periodic_image_offsets(images = (1, 1, 0)):
+    """
+    Returns the (M, 3) integer offsets of the periodic images from -n to n along each of
+    the box vectors, including the central image.
+    """
+    ranges = [np.arange(-n, n + 1) for n in images]
+    return np.stack(np.meshgrid(*ranges, indexing = 'ij'), axis = -1).reshape((-1, 3))
+
+# box vectors of the trajectories as arrays, by object name, so the frame change handler
+# doesn't convert the ID property of every frame's box on each frame
+_periodic_boxes = {}
+
+def store_periodic_boxes(obj, dimensions, world_scale = 0.01):
+    """
+    Stores the (n_frames, 3, 3) box vectors of each frame on the object, from the 
+    (n_frames, 6) MDAnalysis box dimensions (lengths and angles, triclinic supported).
+
+    Raises a ValueError if any of the boxes has no volume, such as the zero dimensions
+    some formats write for systems without a box.
+    """
+    from .assembly import unit_cell_vectors
+    boxes = np.array([unit_cell_vectors(*box) for box in np.asarray(dimensions)]).reshape((-1, 3, 3))
+    volumes = np.abs(np.linalg.det(boxes)) if len(boxes) else np.zeros(0)
+    if not np.all(np.isfinite(volumes) & (volumes > 1e-6)):
+        raise ValueError("Periodic boxes must have a non-zero volume for every frame.")
+    
+    obj['periodic_boxes'] = boxes.ravel().tolist()
+    obj['world_scale'] = world_scale
+    _periodic_boxes[obj.name] = boxes
+
+def get_periodic_boxes(obj):
+    """
+    Returns the (n_frames, 3, 3) box vectors stored on the object, in Angstroms.
+    """
+    boxes = _periodic_boxes.get(obj.name)
+    # the size is checked in case another object of the same name was cached
+    if boxes is None or boxes.size != len(obj['periodic_boxes']):
+        boxes = np.array(obj['periodic_boxes'], dtype = float).reshape((-1, 3, 3))
+        _periodic_boxes[obj.name] = boxes
+    return boxes
+
+def periodic_image_translations(box, images = (1, 1, 0)):
+    """
+    Returns the (M, 3) translations of the periodic images for the (3, 3) box vectors.
+    """
+    return periodic_image_offsets(images) @ np.asarray(box)
+
+def create_periodic_images_node(obj, images = (1, 1, 0)):
+    """
+    Creates a node which instances the molecule on each of the periodic images from -n
+    to n along each box vector. The images are points of a data object, so the molecule 
+    is instanced rather than copied and the memory doesn't grow with the number of 
+    images. The translations are updated on frame change for the box of that frame.
+    """
+    from . import assembly
+    
+    boxes = get_periodic_boxes(obj)
+    index = trajectory_frame_index(obj, len(boxes), bpy.context.scene.frame_current)
+    translations = periodic_image_translations(boxes[index], images)
+    
+    transforms = np.zeros((len(translations), 3, 4))
+    transforms[:, :, :3] = np.eye(3)
+    transforms[:, :, 3] = translations
+    
+    name = obj.name + '_periodic_{}x{}x{}'.format(*images)
+    obj_images = assembly.create_transforms_object(
+        'MOL_RotTransMat_' + name, transforms, 
+        world_scale = obj.get('world_scale', 0.01)
+    )
+    obj_images['periodic_images'] = list(images)
+    names = list(obj.get('periodic_images_objects', []))
+    if obj_images.name not in names:
+        obj['periodic_images_objects'] = names + [obj_images.name]
+    
+    return assembly.create_biological_assembly_node(name = name, transform_dict = transforms)
+
+@bpy.app.handlers.persistent
+def update_periodic_images(scene, depsgraph = None):
+    """
+    Frame change handler which moves the periodic image points of each trajectory to the
+    translations for the box of the current frame.
+    """
+    for obj in scene.objects:
+        names = obj.get('periodic_images_objects')
+        if not names or not obj.get('periodic_boxes'):
+            continue
+        
+        boxes = get_periodic_boxes(obj)
+        index = trajectory_frame_index(obj, len(boxes), scene.frame_current)
+        for name in names:
+            obj_images = bpy.data.objects.get(name)
+            if not obj_images:
+                continue
+            translations = periodic_image_translations(boxes[index], obj_images['periodic_images'])
+            if len(translations) != len(obj_images.data.vertices):
+                continue
+            obj_images.data.vertices.foreach_set('co', (translations * obj.get('world_scale', 0.01)).ravel())
+            obj_images.data.update()
+
 def load_trajectory(file_top, 
                     file_traj,
                     md_start = 1, 
@@ -73,19 +991,50 @@ def load_trajectory(file_top,
                     selection = "not (name H* or name OW)",
                     name = "default",
                     custom_selections = None,
+                    unwrap = False, 
+                    center = False, 
+                    fit = False, 
+                    transform_selection = "protein", 
+                    interpolation = 'NONE', 
+                    n_keyframes = 0, 
+                    keyframe_selection = "name CA", 
+                    n_workers = 1, 
+                    frame_storage = 'OBJECTS', 
+                    frame_channels = ('occupancy', ), 
+                    analyses = (), 
+                    contact_cutoff = 4.5
                     ):
     
     import MDAnalysis as mda
-    import MDAnalysis.transformations as trans
     
     # initially load in the trajectory
-    if file_traj == "":
-        univ = mda.Universe(file_top)
-    else:
-        univ = mda.Universe(file_top, file_traj)
+    univ = load_universe(file_top, file_traj)
+    
+    # the transformations are applied by MDAnalysis as each frame is read, so the frames
+    # created below (and the frames read for dynamic selections) are already transformed
+    if file_traj != "" and (unwrap or center or fit):
+        workflow = trajectory_transformations(
+            univ, file_top, file_traj, 
+            unwrap = unwrap, 
+            center = center, 
+            fit = fit, 
+            selection = transform_selection, 
+            reference_frame = md_start
+        )
+        if workflow:
+            univ.trajectory.add_transformations(*workflow)
         
     # separate the trajectory, separate to the topology or the subsequence selections
-    traj = univ.trajectory[md_start:md_end:md_step]
+    frames = np.arange(univ.trajectory.n_frames)[md_start:md_end:md_step]
+    
+    # instead of striding through the trajectory, import the most structurally diverse
+    # frames of the range
+    if n_keyframes > 0 and len(frames) > n_keyframes:
+        coordinates = trajectory_coordinates(univ, keyframe_selection, frames, n_workers = n_workers)
+        frames = frames[select_keyframes(coordinates, n_keyframes)]
+        del coordinates
+    
+    traj = univ.trajectory[frames]
     
     # if there is a non-blank selection, apply the selection text to the universe for 
     # later use. This also affects the trajectory, even though it has been separated earlier
@@ -98,10 +1047,10 @@ def load_trajectory(file_top,
     # Try and extract the elements from the topology. If the universe doesn't contain
     # the element information, then guess based on the atom names in the toplogy
     try:
-        elements = univ.atoms.elements.tolist()
+        elements = np.asarray(univ.atoms.elements)
     except:
         try:
-            elements = [mda.topology.guessers.guess_atom_element(x) for x in univ.atoms.names]
+            elements = map_unique(univ.atoms.names, mda.topology.guessers.guess_atom_element)
         except:
             pass
         
@@ -149,19 +1098,19 @@ def load_trajectory(file_top,
     # some really messy code.
     
     def att_atomic_number():
-        atomic_number = np.array(list(map(
+        atomic_number = map_unique(
+            elements, 
             # if getting the element fails for some reason, return an atomic number of -1
-            lambda x: data.elements.get(x, {"atomic_number": -1}).get("atomic_number"), 
-            np.char.title(elements) 
-        )))
+            lambda x: data.elements.get(x.title(), {"atomic_number": -1}).get("atomic_number")
+        )
         return atomic_number
 
     def att_vdw_radii():
         try:
-            vdw_radii = np.array(list(map(
-                lambda x: mda.topology.tables.vdwradii.get(x, 1), 
-                np.char.upper(elements)
-            )))
+            vdw_radii = map_unique(
+                elements, 
+                lambda x: mda.topology.tables.vdwradii.get(x.upper(), 1)
+            )
         except:
             # if fail to get radii, just return radii of 1 for everything as a backup
             vdw_radii = np.ones(len(univ.atoms.names))
@@ -173,11 +1122,10 @@ def load_trajectory(file_top,
         return univ.atoms.resnums
     
     def att_res_name():
-        res_names =  np.array(list(map(lambda x: x[0: 3], univ.atoms.resnames)))
-        res_numbers = np.array(list(map(
-            lambda x: data.residues.get(x, {'res_name_num': 0}).get('res_name_num'), 
-            res_names
-            )))
+        res_numbers = map_unique(
+            univ.atoms.resnames, 
+            lambda x: data.residues.get(x[0: 3], {'res_name_num': 0}).get('res_name_num')
+            )
         return res_numbers
     
     def att_b_factor():
@@ -185,8 +1133,7 @@ def load_trajectory(file_top,
     
     def att_chain_id():
         chain_id = univ.atoms.chainIDs
-        chain_id_unique = np.unique(chain_id)
-        chain_id_num = np.array(list(map(lambda x: np.where(x == chain_id_unique)[0][0], chain_id)))
+        chain_id_unique, chain_id_num = np.unique(chain_id, return_inverse = True)
         mol_object['chain_id_unique'] = chain_id_unique
         return chain_id_num
     
@@ -235,14 +1182,42 @@ def load_trajectory(file_top,
         except:
             warnings.warn(f"Unable to add attribute: {att['name']}.")
 
+    # per-residue analyses over the imported frames, cached on disk so re-importing the
+    # same trajectory doesn't recompute them
+    if analyses and file_traj != "":
+        from . import analysis
+        try:
+            values = analysis.cached_trajectory_analysis(
+                file_top, file_traj, univ.atoms, frames, 
+                analyses = analyses, 
+                contact_cutoff = contact_cutoff, 
+                key = repr((selection, unwrap, center, fit, transform_selection)), 
+                n_workers = n_workers
+            )
+            for att_name, value in values.items():
+                add_attribute(mol_object, att_name, value, 'FLOAT', 'POINT')
+        except Exception as error:
+            warnings.warn(f"Unable to analyse the trajectory: {error}")
+    
     # add the custom selections if they exist
+    dynamic_selections = {}
     if custom_selections:
         for sel in custom_selections:
             try:
+                if getattr(sel, 'updating', False):
+                    # dynamic selections are evaluated for every imported frame, with the
+                    # mask of the first frame stored on the model
+                    masks = dynamic_selection_masks(
+                        univ.atoms, frames, sel.selection, n_workers = n_workers
+                        )
+                    dynamic_selections[sel.name] = masks
+                    data = np.unpackbits(masks[0], count = univ.atoms.n_atoms).astype(bool)
+                else:
+                    data = bool_selection(sel.selection)
                 add_attribute(
                     object=mol_object, 
                     name=sel.name, 
-                    data=bool_selection(sel.selection), 
+                    data=data, 
                     type = "BOOLEAN", 
                     domain = "POINT"
                     )
@@ -251,24 +1226,111 @@ def load_trajectory(file_top,
 
     coll_frames = coll.frames(name)
     
-    add_occupancy = True
-    for ts in traj:
-        frame = create_object(
-            name = name + "_frame_" + str(ts.frame),
+    # frames are either created as objects in the frames collection, or encoded into a
+    # quantized frame store which is decoded on frame change
+    store = None
+    if frame_storage != 'OBJECTS':
+        # delta frames are kept within 0.005 Angstroms, half the precision of XTC files
+        store = FrameStore(
+            univ.atoms.n_atoms, 
+            delta = frame_storage == 'DELTA', 
+            tolerance = 0.005 * world_scale
+        )
+    
+    def add_frame(frame_index, positions):
+        if store is not None:
+            store.append(positions * world_scale)
+            return None
+        return create_object(
+            name = name + "_frame_" + str(frame_index),
             collection = coll_frames, 
-            locations = univ.atoms.positions * world_scale
+            locations = positions * world_scale
         )
-        # adds occupancy data to each frame if it exists
-        # This is mostly for people who want to store frame-specific information in the 
-        # b_factor but currently neither biotite nor MDAnalysis give access to frame-specific
-        # b_factor information. MDAnalysis gives frame-specific access to the `occupancy` 
-        # so currently this is the only method to get frame-specific data into MN
-        # for more details: https://github.com/BradyAJohnston/MolecularNodes/issues/128
-        if add_occupancy:
-            try:
-                add_attribute(frame, 'occupancy', ts.data['occupancy'])
-            except:
-                add_occupancy = False
+    
+    # per-frame values such as the occupancy are read into columnar channels.
+    # This is mostly for people who want to store frame-specific information in the 
+    # b_factor but currently neither biotite nor MDAnalysis give access to frame-specific
+    # b_factor information. MDAnalysis gives frame-specific access to the `occupancy` 
+    # for more details: https://github.com/BradyAJohnston/MolecularNodes/issues/128
+    readers = frame_channel_readers(frame_channels)
+    channels = FrameChannels(len(frames), univ.atoms.n_atoms)
+    
+    # with multiple workers the frames and the built-in channels are read in separate 
+    # processes, and only the objects for the frames are created here. Channels computed
+    # by functions are read in this process, requiring a separate pass over the trajectory
+    parallel = n_workers > 1 and len(frames) > 1
+    if parallel:
+        worker_channels = () if isinstance(frame_channels, dict) else tuple(readers)
+        readers = {name: read for name, read in readers.items() if name not in worker_channels}
+        with parallel_frame_positions(
+            univ.atoms, frames, n_workers = n_workers, channels = worker_channels
+            ) as (positions, boxes, values):
+            for frame_index, coordinates in zip(frames, positions):
+                add_frame(frame_index, coordinates)
+        for channel_name in worker_channels:
+            add_frame_channel_values(channels, channel_name, values[channel_name], frames)
+    else:
+        boxes = np.full((len(frames), 6), np.nan)
+    
+    if readers or not parallel:
+        for i, ts in enumerate(traj):
+            if not parallel:
+                add_frame(ts.frame, univ.atoms.positions)
+                if ts.dimensions is not None:
+                    boxes[i] = ts.dimensions
+            read_frame_channels(readers, channels, i, ts, univ.atoms)
+    
+    # the box of each frame is kept for tiling the periodic images of the system
+    if len(boxes) and np.isfinite(boxes).all():
+        try:
+            store_periodic_boxes(mol_object, boxes, world_scale = world_scale)
+        except ValueError as error:
+            warnings.warn(f"Periodic images unavailable: {error}")
+    
+    # the channels are also kept on the objects of the frames
+    if store is None:
+        frame_objects = sorted(coll_frames.objects, key = _frame_number)
+        for channel_name in channels.names():
+            type = 'FLOAT_VECTOR' if channels.is_vector(channel_name) else 'FLOAT'
+            for i, frame in enumerate(frame_objects):
+                add_attribute(frame, channel_name, channels.frame(channel_name, i), type = type)
+    store_frame_channels(mol_object, channels)
+    
+    # store the per-frame masks of the dynamic selections on each frame, and cache them
+    # so that playback only has to unpack the mask of the current frame
+    if dynamic_selections:
+        frame_objects = sorted(coll_frames.objects, key = _frame_number)
+        for sel_name, masks in dynamic_selections.items():
+            for frame, mask in zip(frame_objects, masks):
+                add_attribute(
+                    frame, sel_name, 
+                    np.unpackbits(mask, count = univ.atoms.n_atoms).astype(bool), 
+                    type = 'BOOLEAN', domain = 'POINT'
+                    )
+        mol_object['dynamic_selections'] = list(dynamic_selections.keys())
+        _dynamic_selections[mol_object.name] = dynamic_selections
+        
+        # the masks are also saved next to the .blend file, as trajectories with a frame
+        # store have no frame objects to store them on
+        masks = FrameMasks(univ.atoms.n_atoms)
+        for sel_name, values in dynamic_selections.items():
+            masks.add(sel_name, values)
+        mol_object['frame_selections'] = _save_data_file(mol_object, masks, 'selections')
+    
+    # positions between the frames are interpolated on frame change, taking the shortest
+    # path across the periodic boundaries of an orthorhombic box
+    mol_object['frames_collection'] = coll_frames.name
+    mol_object['frame_interpolation'] = interpolation
+    # the scene frames the trajectory is played over, used by the animation node and to 
+    # find the trajectory frame for the dynamic selections, interpolation and channels
+    mol_object['frame_start'] = bpy.context.scene.frame_start
+    mol_object['frame_end'] = bpy.context.scene.frame_end
+    if store is not None:
+        mol_object['frame_store'] = save_frame_store(mol_object, store)
+    dimensions = univ.atoms.universe.dimensions
+    if dimensions is not None and np.allclose(dimensions[3:], 90) and np.all(dimensions[:3] > 0):
+        mol_object['periodic_box'] = dimensions[:3] * world_scale
+    clear_frame_positions(mol_object)
     
     # disable the frames collection from the viewer
     bpy.context.view_layer.layer_collection.children[coll.mn().name].children[coll_frames.name].exclude = True
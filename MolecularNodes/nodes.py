@@ -1,5 +1,7 @@
 import bpy
 import os
+import numpy as np
+from . import tables
 
 # check if a particular property already exists or not
 def property_exists(prop_path, glob, loc):
@@ -23,35 +25,36 @@ socket_types = {
         'IMAGE'    : 'NodeSocketImage'
     }
 
+def node_append_file():
+    return os.path.join(os.path.dirname(__file__), 'assets', 'node_append_file.blend')
+
+def mol_append_nodes(node_names, materials = []):
+    """
+    Append all of the requested node groups and materials that aren't already in the .blend
+    file from the MolecularNodes asset file, in a single pass of loading the library.
+    
+    Returns a list of the requested node groups.
+    """
+    # index the data that is already present once, rather than searching for each name
+    present_groups = set(bpy.data.node_groups.keys())
+    present_materials = set(bpy.data.materials.keys())
+    missing_groups = [name for name in dict.fromkeys(node_names) if name not in present_groups]
+    missing_materials = [name for name in dict.fromkeys(materials) if name not in present_materials]
+    
+    if missing_groups or missing_materials:
+        with bpy.data.libraries.load(node_append_file(), link = False) as (data_from, data_to):
+            data_to.node_groups = [name for name in missing_groups if name in data_from.node_groups]
+            data_to.materials = [name for name in missing_materials if name in data_from.materials]
+    
+    return [bpy.data.node_groups[name] for name in node_names]
+
 def mol_append_node(node_name):
-    if bpy.data.node_groups.get(node_name):
-        pass
-    else:
-        before_data = list(bpy.data.node_groups)
-        bpy.ops.wm.append(
-            directory = os.path.join(
-                    os.path.dirname(__file__), 'assets', 'node_append_file.blend' + r'/NodeTree'), 
-                    filename = node_name, 
-                    link = False
-                )   
-        new_data = list(filter(lambda d: not d in before_data, list(bpy.data.node_groups)))
-    
-    return bpy.data.node_groups[node_name]
+    return mol_append_nodes([node_name])[0]
 
 def mol_base_material():
     """Append MOL_atomic_material to the .blend file it it doesn't already exist, and return that material."""
-    mat = bpy.data.materials.get('MOL_atomic_material')
-    
-    if not mat:
-        mat = bpy.ops.wm.append(
-            directory=os.path.join(
-                mn_folder, 'assets', 'node_append_file.blend' + r'/Material'
-            ), 
-            filename='MOL_atomic_material', 
-            link=False
-        )
-    
-    return mat
+    mol_append_nodes([], materials = ['MOL_atomic_material'])
+    return bpy.data.materials['MOL_atomic_material']
 
 def gn_new_group_empty(name = "Geometry Nodes"):
     group = bpy.data.node_groups.get(name)
@@ -213,6 +216,15 @@ def create_starting_nodes_density(obj):
     node_density = add_custom_node_group(node_mod, 'MOL_style_density_surface', [400, 0])
     node_density.inputs['Material'].default_value = mol_base_material()
     
+    # start from the recommended contour level computed when the map was converted, in 
+    # the stored values, which are levels for quantized maps
+    statistics = obj.get('density_statistics')
+    node_threshold = node_density.inputs.get('Threshold')
+    if statistics and node_threshold:
+        scale = obj.get('density_scale', 1.0)
+        offset = obj.get('density_offset', 0.0)
+        node_threshold.default_value = (statistics['threshold'] - offset) / scale
+    
     
     link = node_group.links.new
     link(
@@ -238,13 +250,13 @@ def create_starting_node_tree(obj, coll_frames, starting_style = "atoms"):
     node_group = gn_new_group_empty("MOL_" + str(obj.name))
     node_mod.node_group = node_group
     
-    # TODO check if can delete this loop
-    # ensure the required setup nodes either already exist or append them
-    # required_setup_nodes = ['MOL_prop_setup', 'MOL_style_color']
-    # if n_frames > 1:
-    #     required_setup_nodes = ['MOL_prop_setup', 'MOL_style_color', 'MOL_animate', 'MOL_animate_frames']
-    # for node_group in required_setup_nodes:
-    #     mol_append_node(node_group)
+    styles = ['MOL_style_atoms_cycles', 'MOL_style_ribbon_protein', 'MOL_style_ball_and_stick']
+    
+    # ensure the required setup nodes either already exist or append them, all in one go
+    required_setup_nodes = ['MOL_style_color', styles[starting_style]]
+    if coll_frames:
+        required_setup_nodes += ['MOL_animate_frames', 'MOL_animate_value']
+    mol_append_nodes(required_setup_nodes, materials = ['MOL_atomic_material'])
     
     # move the input and output nodes for the group
     node_input = node_mod.node_group.nodes[bpy.app.translations.pgettext_data("Group Input",)]
@@ -273,8 +285,6 @@ def create_starting_node_tree(obj, coll_frames, starting_style = "atoms"):
     link(node_random_colour.outputs['Value'], node_colour.inputs['Carbon'])
     link(node_chain_id.outputs[4], node_random_colour.inputs['ID'])
     
-    styles = ['MOL_style_atoms_cycles', 'MOL_style_ribbon_protein', 'MOL_style_ball_and_stick']
-    
     # if starting_style == "atoms":
     
     node_style = add_custom_node_group(node_mod, styles[starting_style], location = [500, 0])
@@ -294,9 +304,29 @@ def create_starting_node_tree(obj, coll_frames, starting_style = "atoms"):
         # node_animate_frames.inputs['Absolute Frame Position'].default_value = True
         
         node_animate = add_custom_node_group_to_node(node_group, 'MOL_animate_value', [500, -300])
+        # play the frames over the range stored on import, which the frame change 
+        # handlers also use to find the current trajectory frame
+        for input_name, key in (('Frame Start', 'frame_start'), ('Frame End', 'frame_end')):
+            if input_name in node_animate.inputs and key in obj:
+                node_animate.inputs[input_name].default_value = obj[key]
         link(node_colour.outputs['Atoms'], node_animate_frames.inputs['Atoms'])
         link(node_animate_frames.outputs['Atoms'], node_style.inputs['Atoms'])
         link(node_animate.outputs['Animate 0..1'], node_animate_frames.inputs['Animate 0..1'])
+    
+    # if copies of chains were replaced on import, instance the template chains before 
+    # colouring, so the copies are coloured and selected by their own chain_id
+    if obj.get('chain_instances'):
+        from . import assembly
+        chain_ids = obj.get('chain_instances_chain_ids')
+        node_chain_instances = assembly.create_chain_instances_node(
+            name = obj.name, 
+            chain_transforms = assembly.get_stored_assemblies(obj, name = 'chain_instances'), 
+            chain_ids = chain_ids.to_dict() if chain_ids else None
+        )
+        node_input.location = [-300, 0]
+        node_instances = add_custom_node_group_to_node(node_group, node_chain_instances.name, [0, 150])
+        link(node_input.outputs['Geometry'], node_instances.inputs['Geometry'])
+        link(node_instances.outputs['Geometry'], node_colour.inputs['Atoms'])
 
 
 def create_custom_surface(name, n_chains):
@@ -486,9 +516,10 @@ def chain_selection(node_name, input_list, attribute, starting_value = 0, label_
     # distance horizontally to space all of the created nodes
     node_sep_dis = 180
     counter = 0
+    node_bool_chain = mol_append_node('MOL_utils_bool_chain')
     for chain_name in input_list:
         current_node = chain_group.nodes.new("GeometryNodeGroup")
-        current_node.node_tree = mol_append_node('MOL_utils_bool_chain')
+        current_node.node_tree = node_bool_chain
         current_node.location = [counter * node_sep_dis, 200]
         current_node.inputs["number_matched"].default_value = counter + starting_value
         group_link = chain_group.links.new
@@ -529,24 +560,139 @@ def chain_selection(node_name, input_list, attribute, starting_value = 0, label_
     # these are custom properties that are associated with the object when it is initial created
     return chain_group
 
-def chain_color(node_name, input_list, label_prefix = "Chain "):
+def chain_selection_table(node_name, input_list, attribute, starting_value = 0, label_prefix = ""):
     """
-    Given the input list of chain names, will create a node group which uses
-    the chain_id named attribute to manually set the colours for each of the chains.
+    Given an input_list, will create a node which selects the atoms whose integer 
+    `attribute` matches the selected items of the list. Which items are selected is stored 
+    as the boolean 'selected' attribute of a table data object, with a point for each 
+    item, and is looked up once for each atom. The node tree is the same size regardless 
+    of the length of the list, so this is used for structures with many chains or ligands.
+    The outputs are the resulting selection and the inversion of the selection.
+    
+    The selected items can be changed with the Edit Selection Table operator or 
+    `set_selection_table()`.
     """
+    from .load import create_object, add_attribute
+    from . import coll
     
-    import random
+    group = bpy.data.node_groups.get(node_name)
+    if group:
+        return group
     
-    # get the active object, might need to change to taking an object as an input
-    # and making it active isntead, to be more readily applied to multiple objects
-    obj = bpy.context.active_object
-    # try to get the Molecular Nodes modifier and select it, if not create one and select it
-    node_mod = obj.modifiers.get('MolecularNodes')
-    if not node_mod:
-        node_mod = obj.modifiers.new("MolecularNodes", "NODES")
+    table = bpy.data.objects.get(tables.table_name(node_name))
+    if not table:
+        table = create_object(
+            name = tables.table_name(node_name), 
+            collection = coll.data(), 
+            locations = np.zeros((len(input_list), 3))
+            )
+        add_attribute(table, 'selected', np.ones(len(input_list), dtype = bool), type = 'BOOLEAN')
+        table['item_names'] = [str(label_prefix) + str(name) for name in input_list]
     
-    obj.modifiers.active = node_mod
+    chain_group = bpy.data.node_groups.new(node_name, "GeometryNodeTree")
+    new_node = chain_group.nodes.new
+    link = chain_group.links.new
+    
+    chain_number_node = new_node("GeometryNodeInputNamedAttribute")
+    chain_number_node.data_type = 'INT'
+    chain_number_node.location = [-400, 0]
+    chain_number_node.inputs[0].default_value = attribute
     
+    # offset the attribute value so that it indexes into the table
+    node_index = new_node("ShaderNodeMath")
+    node_index.location = [-200, 0]
+    node_index.operation = 'SUBTRACT'
+    node_index.inputs[1].default_value = starting_value
+    
+    node_table = new_node("GeometryNodeObjectInfo")
+    node_table.location = [-200, 300]
+    node_table.transform_space = 'ORIGINAL'
+    node_table.inputs['Object'].default_value = table
+    
+    node_selected = new_node("GeometryNodeInputNamedAttribute")
+    node_selected.data_type = 'BOOLEAN'
+    node_selected.location = [-200, -200]
+    node_selected.inputs[0].default_value = 'selected'
+    
+    # values outside of the table return False, so they are never selected
+    node_sample = new_node("GeometryNodeSampleIndex")
+    node_sample.data_type = 'BOOLEAN'
+    node_sample.domain = 'POINT'
+    node_sample.clamp = False
+    node_sample.location = [0, 0]
+    
+    bool_math = new_node("FunctionNodeBooleanMath")
+    bool_math.location = [200, -150]
+    bool_math.operation = "NOT"
+    
+    chain_group_out = new_node("NodeGroupOutput")
+    chain_group_out.location = [400, 0]
+    chain_group.outputs.new("NodeSocketBool", "Selection")
+    chain_group.outputs.new("NodeSocketBool", "Inverted")
+    
+    # the sockets for each data type share a name, so link to the ones that are enabled
+    def enabled(sockets, name):
+        return [socket for socket in sockets if socket.name == name and socket.enabled][0]
+    
+    link(chain_number_node.outputs[4], node_index.inputs[0])
+    link(node_index.outputs[0], node_sample.inputs['Index'])
+    link(node_table.outputs['Geometry'], node_sample.inputs['Geometry'])
+    link(enabled(node_selected.outputs, 'Attribute'), enabled(node_sample.inputs, 'Value'))
+    link(enabled(node_sample.outputs, 'Value'), chain_group_out.inputs['Selection'])
+    link(enabled(node_sample.outputs, 'Value'), bool_math.inputs[0])
+    link(bool_math.outputs[0], chain_group_out.inputs['Inverted'])
+    
+    return chain_group
+
+def get_selection_table(table):
+    """Returns whether each item of a table created by `chain_selection_table()` is selected."""
+    attribute = table.data.attributes['selected']
+    values = np.zeros(len(attribute.data), dtype = bool)
+    attribute.data.foreach_get('value', values)
+    return values
+
+def set_selection_table(table, item_names, selected = True):
+    """
+    Sets whether the given items of a table created by `chain_selection_table()` are selected.
+    
+    Args:
+        table (bpy.types.Object): The table object.
+        item_names (list): The labels of the items to change, e.g. ['Chain A', 'Chain B'].
+        selected (bool, optional): Whether the items are selected. Defaults to True.
+    """
+    values = tables.set_selected(get_selection_table(table), table['item_names'], item_names, selected)
+    table.data.attributes['selected'].data.foreach_set('value', values)
+    table.data.update()
+
+def chain_color(node_name, input_list, label_prefix = "Chain "):
+    """
+    Given the input list of chain names, will create a node group which uses
+    the chain_id named attribute to look up the colour for each of the chains from 
+    a palette. The palette is a data object with a point for each chain, storing the
+    colour in the 'Color' attribute, so the node tree is the same size and each atom 
+    does a single lookup regardless of the number of chains. 
+    
+    The colours can be changed with the Edit Chain Colors operator or `set_chain_color()`.
+    """
+    from .load import create_object, add_attribute
+    from . import coll
+    
+    chain_group = bpy.data.node_groups.get(node_name)
+    if chain_group:
+        return chain_group
+    
+    # create the palette, with a random colour for each of the chains
+    palette = bpy.data.objects.get(tables.palette_name(node_name))
+    if not palette:
+        palette = create_object(
+            name = tables.palette_name(node_name), 
+            collection = coll.data(), 
+            locations = np.zeros((len(input_list), 3))
+            )
+        colors = np.random.random((len(input_list), 4))
+        colors[:, 3] = 1
+        add_attribute(palette, 'Color', colors, type = 'FLOAT_COLOR', domain = 'POINT')
+        palette['chain_names'] = [str(label_prefix) + str(name) for name in input_list]
     
     # create the custom node group data block, where everything will go
     # also create the required group node input and position it
@@ -554,63 +700,68 @@ def chain_color(node_name, input_list, label_prefix = "Chain "):
     node_input = chain_group.nodes.new("NodeGroupInput")
     node_input.location = [-200, 0]
     
-    
     # link shortcut for creating links between nodes
     link = chain_group.links.new
-    
+    # shortcut for creating new nodes
+    new_node = chain_group.nodes.new
     
     # create a named attribute node that gets the chain_number attribute
-    # and use this for the selection algebra that happens later on
-    chain_number_node = chain_group.nodes.new("GeometryNodeInputNamedAttribute")
+    # and use this as the index into the palette
+    chain_number_node = new_node("GeometryNodeInputNamedAttribute")
     chain_number_node.data_type = 'INT'
     chain_number_node.location = [-200, 400]
     chain_number_node.inputs[0].default_value = 'chain_id'
-    chain_number_node.outputs.get('Attribute')
     
-    # shortcut for creating new nodes
-    new_node = chain_group.nodes.new
-    # distance horizontally to space all of the created nodes
-    node_sep_dis = 180
-    counter = 0
+    node_palette = new_node("GeometryNodeObjectInfo")
+    node_palette.location = [-200, 200]
+    node_palette.transform_space = 'ORIGINAL'
+    node_palette.inputs['Object'].default_value = palette
+    
+    node_palette_color = new_node("GeometryNodeInputNamedAttribute")
+    node_palette_color.data_type = 'FLOAT_COLOR'
+    node_palette_color.location = [-200, -200]
+    node_palette_color.inputs[0].default_value = 'Color'
+    
+    node_sample = new_node("GeometryNodeSampleIndex")
+    node_sample.data_type = 'FLOAT_COLOR'
+    node_sample.domain = 'POINT'
+    node_sample.clamp = True
+    node_sample.location = [100, 200]
+    
+    # the sockets for each data type share a name, so link to the ones that are enabled
+    def enabled(sockets, name):
+        return [socket for socket in sockets if socket.name == name and socket.enabled][0]
+    
+    link(node_palette.outputs['Geometry'], node_sample.inputs['Geometry'])
+    link(enabled(node_palette_color.outputs, 'Attribute'), enabled(node_sample.inputs, 'Value'))
+    link(chain_number_node.outputs[4], node_sample.inputs['Index'])
     
-    for chain_name in input_list:
-        offset = counter * node_sep_dis
-        current_chain = str(label_prefix) + str(chain_name)
-         # node compare inputs 2 & 3
-        node_compare = new_node('FunctionNodeCompare')
-        node_compare.data_type = 'INT'
-        node_compare.location = [offset, 100]
-        node_compare.operation = 'EQUAL'
-        
-        node_compare.inputs[3].default_value = counter
-        
-        # link the named attribute to the compare
-        link(chain_number_node.outputs[4], node_compare.inputs[2])
-        
-        node_color = new_node('GeometryNodeSwitch')
-        node_color.input_type = 'RGBA'
-        node_color.location = [offset, -100]
-        
-        # create an input for this chain
-        chain_group.inputs.new("NodeSocketColor", current_chain)
-        chain_group.inputs[current_chain].default_value = [random.random(), random.random(), random.random(), 1]
-        # switch input colours 10 and 11
-        link(node_input.outputs[current_chain], node_color.inputs[11])
-        link(node_compare.outputs['Result'], node_color.inputs['Switch'])
-        
-        
-        if counter > 0:
-            link(node_color_previous.outputs[4], node_color.inputs[10])
-        
-        node_color_previous = node_color
-        counter += 1
     chain_group.outputs.new("NodeSocketColor", "Color")
     node_output = chain_group.nodes.new("NodeGroupOutput")
-    node_output.location = [offset, 200]
-    link(node_color.outputs[4], node_output.inputs['Color'])
+    node_output.location = [400, 200]
+    link(enabled(node_sample.outputs, 'Value'), node_output.inputs['Color'])
     
     return chain_group
 
+def set_chain_color(palette, chain_name, color):
+    """
+    Sets the colour of a chain in a palette created by `chain_color()`.
+    
+    Args:
+        palette (bpy.types.Object): The palette object.
+        chain_name (str): The label of the chain, e.g. 'Chain A'.
+        color: The RGBA colour for the chain.
+    """
+    index = list(palette['chain_names']).index(chain_name)
+    palette.data.attributes['Color'].data[index].color = color
+    # the node trees that sample the palette are only updated when the mesh is
+    palette.data.update()
+
+def get_chain_color(palette, chain_name):
+    """Returns the RGBA colour of a chain in a palette created by `chain_color()`."""
+    index = list(palette['chain_names']).index(chain_name)
+    return tuple(palette.data.attributes['Color'].data[index].color)
+
 def resid_multiple_selection(node_name, input_resid_string):
     """
     Returns a node group that takes an integer input and creates a boolean 
@@ -619,20 +770,11 @@ def resid_multiple_selection(node_name, input_resid_string):
     selections in specific proteins.
     """
         
-    #print(f'recieved input: {input_resid_string}')
-    # do a cleanning of input string to allow fuzzy input from users
-    for c in ";/+ .":
-        if c in input_resid_string:
-            input_resid_string=input_resid_string.replace(c, ',')
-
-    for c in "_=:":
-        if c in input_resid_string:
-            input_resid_string=input_resid_string.replace(c, '-')
-
-    #print(f'fixed input:{input_resid_string}')
-
+    from .selection import clean_resid_string
+    
+    # do a cleanning of input string to allow fuzzy input from users, and 
     # parse input_resid_string into sub selecting string list
-    sub_list=[item for item in input_resid_string.split(',') if item]
+    sub_list = clean_resid_string(input_resid_string)
     
     # distance vertical to space all of the created nodes
     node_sep_dis = -100
@@ -667,6 +809,8 @@ def resid_multiple_selection(node_name, input_resid_string):
             # set a new input and set the resid
             residue_id_group.inputs.new("NodeSocketInt",'res_id').default_value = int(residue_id)
         
+    node_res_id, node_res_id_range = mol_append_nodes(['MOL_sel_res_id', 'MOL_sel_res_id_range'])
+    
     # set a counter for MOL_sel_res_id* nodes
     counter=0
     for residue_id_index,residue_id in enumerate(sub_list):
@@ -681,7 +825,7 @@ def resid_multiple_selection(node_name, input_resid_string):
 
         if '-' in residue_id:
             # a residue range
-            current_node.node_tree = mol_append_node('MOL_sel_res_id_range')
+            current_node.node_tree = node_res_id_range
             
             group_link(residue_id_group_in.outputs[counter], current_node.inputs[0])
             counter+=1
@@ -690,7 +834,7 @@ def resid_multiple_selection(node_name, input_resid_string):
             
         else:
             # create a node
-            current_node.node_tree = mol_append_node('MOL_sel_res_id')
+            current_node.node_tree = node_res_id
             # link the input of MOL_sel_res_id
             #print(f'counter={counter} of {residue_id}')
             group_link(residue_id_group_in.outputs[counter], current_node.inputs[0])
@@ -0,0 +1,118 @@
+import numpy as np
+
+def expand_to_residues(residues, selection):
+    """
+    Expands the selection to every atom of each residue that has any atom selected,
+    given the index of the residue of each atom.
+    """
+    residues = np.asarray(residues)
+    if len(residues) == 0:
+        return np.zeros(0, dtype = bool)
+    selected = np.zeros(residues.max() + 1, dtype = bool)
+    selected[residues[selection]] = True
+    return selected[residues]
+
+def within_radius(tree, positions, target, radius, residues = None, include_target = False):
+    """
+    Selects the atoms within a radius of the target atoms, with one query of a tree of the
+    target atoms against the tree of every atom.
+
+    Args:
+        tree (scipy.spatial.cKDTree): Tree over the positions of every atom.
+        positions (np.ndarray): (N, 3) positions of the atoms.
+        target (np.ndarray): Boolean array of the target atoms.
+        radius (float): Radius, in the units of the positions.
+        residues (np.ndarray, optional): Index of the residue of each atom, to expand the
+            selection to whole residues. Defaults to None.
+        include_target (bool, optional): Keep the target atoms in the selection. Defaults to False.
+
+    Returns:
+        np.ndarray: The boolean selection.
+    """
+    from scipy.spatial import cKDTree
+
+    # a single dual tree query between a tree of the target atoms and the molecule, which
+    # returns the pairs within the radius as arrays
+    selection = np.zeros(len(positions), dtype = bool)
+    if target.any():
+        pairs = cKDTree(positions[target]).sparse_distance_matrix(
+            tree, max_distance = radius, output_type = 'ndarray'
+            )
+        selection[pairs['j']] = True
+
+    if residues is not None:
+        selection = expand_to_residues(residues, selection)
+    if not include_target:
+        selection &= ~target
+    return selection
+
+def distance_to_target(tree, positions, target, enough):
+    """
+    Returns the distance of each atom to its closest target atom, for at least the atoms
+    that are closer than any atom whose distance is infinite.
+
+    Instead of querying every atom, the radius around the target atoms is doubled until
+    `enough(found)` is true for the boolean array of the non-target atoms found within it,
+    or every atom is found. The tree is the one over every atom, so the cached spatial
+    index of the molecule is reused and only a tree of the target atoms is built.
+    """
+    from scipy.spatial import cKDTree
+
+    candidates = ~target
+    distance = np.full(len(positions), np.inf)
+    target_tree = cKDTree(positions[target])
+
+    # the nearest atoms of a target atom include a non-target atom once one more than the
+    # number of target atoms are queried, which gives the starting radius
+    k = min(len(positions), int(target.sum()) + 1)
+    nearest, _ = tree.query(positions[np.flatnonzero(target)[0]], k = k)
+    radius = max(float(np.max(nearest)), np.finfo(np.float32).tiny)
+
+    while True:
+        pairs = target_tree.sparse_distance_matrix(tree, max_distance = radius, output_type = 'ndarray')
+        np.minimum.at(distance, pairs['j'], pairs['v'])
+        found = candidates & np.isfinite(distance)
+        if enough(found) or found.sum() == candidates.sum():
+            return distance
+        radius *= 2
+
+def nearest_to_target(tree, positions, target, n, residues = None):
+    """
+    Selects the `n` atoms closest to the target atoms, or with the residue of each atom
+    the `n` closest residues. The target atoms are never selected.
+
+    Args:
+        tree (scipy.spatial.cKDTree): Tree over the positions of every atom.
+        positions (np.ndarray): (N, 3) positions of the atoms.
+        target (np.ndarray): Boolean array of the target atoms.
+        n (int): Number of atoms or residues to select.
+        residues (np.ndarray, optional): Index of the residue of each atom, which must be
+            sorted. Defaults to None.
+
+    Returns:
+        np.ndarray: The boolean selection.
+    """
+    selection = np.zeros(len(positions), dtype = bool)
+    if not target.any() or target.all() or n < 1:
+        return selection
+
+    if residues is None:
+        enough = lambda found: found.sum() >= n
+    else:
+        residues = np.asarray(residues)
+        enough = lambda found: len(np.unique(residues[found])) >= n
+    distance = distance_to_target(tree, positions, target, enough)
+    candidates = np.flatnonzero(~target)
+    distance = distance[candidates]
+
+    if residues is not None:
+        # residue indices are sorted, so the closest atom of each residue is a reduction
+        # over the contiguous runs of each residue
+        residues = residues[candidates]
+        starts = np.flatnonzero(np.diff(residues, prepend = -1))
+        closest = np.minimum.reduceat(distance, starts)
+        chosen = residues[starts[np.argsort(closest, kind = 'stable')[:n]]]
+        selection[candidates[np.isin(residues, chosen)]] = True
+    else:
+        selection[candidates[np.argsort(distance, kind = 'stable')[:n]]] = True
+    return selection
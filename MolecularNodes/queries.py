@@ -0,0 +1,158 @@
+import numpy as np
+
+def clean_resid_string(input_resid_string):
+    """
+    Cleans a residue selection string such as '1-50,80,120-300' to allow fuzzy input from
+    users, and returns a list of the individual terms, e.g. ['1-50', '80', '120-300'].
+    """
+    for c in ";/+ .":
+        if c in input_resid_string:
+            input_resid_string=input_resid_string.replace(c, ',')
+
+    for c in "_=:":
+        if c in input_resid_string:
+            input_resid_string=input_resid_string.replace(c, '-')
+
+    return [item for item in input_resid_string.split(',') if item]
+
+def parse_resid_ranges(input_resid_string):
+    """
+    Compiles a residue selection string such as '1-50,80,120-300' into a sorted set of
+    non-overlapping intervals.
+
+    Returns a (N, 2) array of the inclusive start and end of each interval.
+    """
+    intervals = []
+    for term in clean_resid_string(input_resid_string):
+        if '-' in term:
+            start, end = term.split('-')[:2]
+            start, end = sorted((int(start), int(end)))
+        else:
+            start = end = int(term)
+        intervals.append((start, end))
+
+    if not intervals:
+        return np.zeros((0, 2), dtype = int)
+
+    intervals = np.array(sorted(intervals))
+
+    # merge overlapping and adjacent intervals, so that the starts and ends are both sorted
+    merged = [intervals[0]]
+    for start, end in intervals[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return np.array(merged, dtype = int)
+
+def resid_in_ranges(res_id, intervals):
+    """
+    Returns a boolean array of whether each residue id falls inside any of the intervals
+    returned by `parse_resid_ranges()`.
+    """
+    res_id = np.asarray(res_id)
+    if len(intervals) == 0:
+        return np.zeros(res_id.shape, dtype = bool)
+
+    # the last interval starting at or before each residue is the only one it can be in
+    index = np.searchsorted(intervals[:, 0], res_id, side = 'right') - 1
+    return (index >= 0) & (res_id <= intervals[np.clip(index, 0, None), 1])
+
+def compile_query(query):
+    """
+    Compiles a selection query over the attributes of a molecule into a function.
+
+    Queries use python syntax, with the attribute names as variables, e.g.
+    `chain_id in (0, 3) and b_factor > 40 and not is_solvent`. Supported are comparisons
+    (including chained comparisons and `in` / `not in` a tuple of values), `and`, `or`,
+    `not` and arithmetic. Anything else raises a ValueError when compiled.
+
+    Returns:
+        A function which takes a function that returns the numpy array of an attribute
+        for its name, and returns the boolean selection. Each attribute is only requested
+        once, and only if it is used by the query.
+    """
+    import ast
+    import operator
+
+    comparisons = {
+        ast.Eq: operator.eq, ast.NotEq: operator.ne,
+        ast.Lt: operator.lt, ast.LtE: operator.le,
+        ast.Gt: operator.gt, ast.GtE: operator.ge,
+        ast.In: lambda a, b: np.isin(a, b),
+        ast.NotIn: lambda a, b: np.isin(a, b, invert = True)
+    }
+    arithmetic = {
+        ast.Add: operator.add, ast.Sub: operator.sub,
+        ast.Mult: operator.mul, ast.Div: operator.truediv,
+        ast.Mod: operator.mod
+    }
+
+    try:
+        tree = ast.parse(query.strip(), mode = 'eval').body
+    except SyntaxError as error:
+        raise ValueError(f"Unable to parse selection query '{query}': {error.msg}")
+
+    def build(node):
+        # every node is converted into a function of the attribute getter
+        if isinstance(node, ast.BoolOp):
+            values = [build(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            def bool_op(get):
+                result = values[0](get)
+                for value in values[1:]:
+                    result = combine(result, value(get))
+                return result
+            return bool_op
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = build(node.operand)
+            return lambda get: np.logical_not(operand(get))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = build(node.operand)
+            return lambda get: np.negative(operand(get))
+        if isinstance(node, ast.Compare):
+            left = build(node.left)
+            steps = [(comparisons[type(op)], build(right)) for op, right in zip(node.ops, node.comparators)
+                     if type(op) in comparisons]
+            if len(steps) != len(node.ops):
+                raise ValueError(f"Unsupported comparison in selection query '{query}'.")
+            def compare(get):
+                result = None
+                a = left(get)
+                for op, right in steps:
+                    b = right(get)
+                    step = op(a, b)
+                    result = step if result is None else np.logical_and(result, step)
+                    a = b
+                return result
+            return compare
+        if isinstance(node, ast.BinOp) and type(node.op) in arithmetic:
+            op = arithmetic[type(node.op)]
+            left, right = build(node.left), build(node.right)
+            return lambda get: op(left(get), right(get))
+        if isinstance(node, ast.Name):
+            if node.id.startswith('__'):
+                raise ValueError(f"Unsupported name '{node.id}' in selection query '{query}'.")
+            if node.id in ('True', 'False'):
+                value = node.id == 'True'
+                return lambda get: value
+            return lambda get: get(node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+            return lambda get: node.value
+        if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+            values = [build(value) for value in node.elts]
+            return lambda get: np.array([value(get) for value in values])
+        raise ValueError(f"Unsupported expression '{ast.dump(node)}' in selection query '{query}'.")
+
+    evaluate = build(tree)
+
+    def selection(get_values):
+        cache = {}
+        def get(name):
+            if name not in cache:
+                cache[name] = get_values(name)
+            return cache[name]
+        return np.asarray(evaluate(get), dtype = bool)
+
+    return selection
@@ -0,0 +1,239 @@
+import bpy
+import numpy as np
+from . import load
+# parsing the selection strings doesn't need Blender, so it is kept separate and can be tested
+from .queries import (
+    clean_resid_string, 
+    parse_resid_ranges, 
+    resid_in_ranges, 
+    compile_query
+)
+from . import proximity
+
+def get_attribute(obj, name):
+    """
+    Returns the values of a point attribute of an object's mesh as a numpy array.
+
+    The values are read in a single call with `foreach_get()`. 'position' returns the
+    (N, 3) vertex positions.
+    """
+    mesh = obj.data
+    n = len(mesh.vertices)
+
+    if name == 'position':
+        values = np.zeros(n * 3, dtype = np.float32)
+        mesh.vertices.foreach_get('co', values)
+        return values.reshape((n, 3))
+
+    attribute = mesh.attributes[name]
+    if attribute.data_type == 'FLOAT_VECTOR':
+        values = np.zeros(n * 3, dtype = np.float32)
+        attribute.data.foreach_get('vector', values)
+        return values.reshape((n, 3))
+
+    dtype = {'INT': np.int32, 'BOOLEAN': bool}.get(attribute.data_type, np.float32)
+    values = np.zeros(n, dtype = dtype)
+    attribute.data.foreach_get('value', values)
+    return values
+
+def set_attribute(obj, name, data, type = 'BOOLEAN'):
+    """
+    Writes the values to a point attribute of an object's mesh, replacing the attribute
+    if it already exists.
+    """
+    attribute = obj.data.attributes.get(name)
+    if attribute:
+        obj.data.attributes.remove(attribute)
+    load.add_attribute(obj, name, data, type = type, domain = 'POINT')
+    obj.data.update()
+
+def resid_selection_attribute(obj, input_resid_string, name = 'sel_res_id'):
+    """
+    Compiles the residue selection string and writes the selection of the atoms as a
+    boolean point attribute, so that the selection is a single attribute read for the
+    node tree.
+
+    Args:
+        obj (bpy.types.Object): The molecule, with a 'res_id' attribute.
+        input_resid_string (str): Residue ids and ranges, e.g. '1-50,80,120-300'.
+        name (str, optional): Name of the attribute. Defaults to 'sel_res_id'.
+
+    Returns:
+        np.ndarray: The boolean selection.
+    """
+    selection = resid_in_ranges(get_attribute(obj, 'res_id'), parse_resid_ranges(input_resid_string))
+    set_attribute(obj, name, selection, type = 'BOOLEAN')
+    return selection
+
+def query_selection_values(obj, query):
+    """
+    Evaluates a selection query over the attributes of the molecule, without storing the
+    result as an attribute. See `compile_query()` for the query syntax.
+    """
+    def get_values(attribute):
+        if attribute != 'position' and attribute not in obj.data.attributes:
+            raise ValueError(f"Molecule '{obj.name}' has no attribute '{attribute}'.")
+        return get_attribute(obj, attribute)
+
+    selection = compile_query(query)(get_values)
+    return np.broadcast_to(selection, len(obj.data.vertices))
+
+def query_selection(obj, query, name = 'sel_query'):
+    """
+    Evaluates a selection query over the attributes of the molecule and writes the
+    result as a boolean point attribute. See `compile_query()` for the query syntax.
+
+    Args:
+        obj (bpy.types.Object): The molecule.
+        query (str): The query, e.g. 'chain_id in (0, 3) and b_factor > 40 and not is_solvent'.
+        name (str, optional): Name of the attribute. Defaults to 'sel_query'.
+
+    Returns:
+        np.ndarray: The boolean selection.
+    """
+    selection = query_selection_values(obj, query)
+    set_attribute(obj, name, selection, type = 'BOOLEAN')
+    return selection
+
+# spatial indices of the molecules, by object name, with the key of the positions they
+# were built from
+_spatial_index = {}
+
+def spatial_index_token(obj, positions, n_samples = 4096):
+    """
+    Returns a cheap token that changes when the positions of the object change, from the
+    mesh, the number of points and a strided sample of the positions, instead of hashing
+    every position. Trajectory frames and transformations move every atom so are always 
+    detected, after editing only a few vertices use `clear_spatial_index()`.
+    """
+    step = max(len(positions) // n_samples, 1)
+    return (obj.data.name, len(positions), positions[::step].tobytes(), positions[-1:].tobytes())
+
+def spatial_index(obj, positions = None):
+    """
+    Returns a `scipy.spatial.cKDTree` over the vertex positions of the object.
+
+    The tree is cached per object and rebuilt only when the positions change, so
+    repeated proximity selections on the same molecule only pay for the queries.
+    """
+    from scipy.spatial import cKDTree
+
+    if positions is None:
+        positions = get_attribute(obj, 'position')
+    key = spatial_index_token(obj, positions)
+
+    cached = _spatial_index.get(obj.name)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    tree = cKDTree(positions, balanced_tree = False, compact_nodes = False)
+    _spatial_index[obj.name] = (key, tree)
+    return tree
+
+def clear_spatial_index(obj = None):
+    """
+    Clears the cached spatial index of the object, or of all objects if none is given.
+    """
+    if obj is None:
+        _spatial_index.clear()
+    else:
+        _spatial_index.pop(obj.name, None)
+
+def residue_index(obj):
+    """
+    Returns an index for each atom of the residue it belongs to, incrementing each time
+    the 'res_id' (or 'chain_id' if present) changes between consecutive atoms.
+    """
+    res_id = get_attribute(obj, 'res_id')
+    change = np.zeros(len(res_id), dtype = bool)
+    change[1:] = res_id[1:] != res_id[:-1]
+    if 'chain_id' in obj.data.attributes:
+        chain_id = get_attribute(obj, 'chain_id')
+        change[1:] |= chain_id[1:] != chain_id[:-1]
+    return np.cumsum(change)
+
+def expand_to_residues(obj, selection):
+    """
+    Expands the selection to every atom of each residue that has any atom selected.
+    """
+    return proximity.expand_to_residues(residue_index(obj), selection)
+
+def _target_selection(obj, target):
+    # the target can be a query string or a boolean array
+    if isinstance(target, str):
+        return query_selection_values(obj, target)
+    return np.asarray(target, dtype = bool)
+
+def proximity_selection(obj, 
+                        target, 
+                        radius = 5, 
+                        whole_residues = True, 
+                        include_target = False, 
+                        world_scale = 0.01, 
+                        name = 'sel_proximity'
+                        ):
+    """
+    Selects the atoms within a radius of the target atoms, with one query of a tree of the
+    target atoms against the cached spatial index of the molecule, and writes the 
+    selection as a boolean point attribute.
+
+    Args:
+        obj (bpy.types.Object): The molecule.
+        target (str | np.ndarray): Query (e.g. 'res_name == 61') or boolean array of the
+            target atoms.
+        radius (float, optional): Radius in Angstroms. Defaults to 5.
+        whole_residues (bool, optional): Expand the selection to whole residues. Defaults to True.
+        include_target (bool, optional): Keep the target atoms in the selection. Defaults to False.
+        world_scale (float, optional): Scale the molecule was imported at. Defaults to 0.01.
+        name (str, optional): Name of the attribute. Defaults to 'sel_proximity'.
+
+    Returns:
+        np.ndarray: The boolean selection.
+    """
+    target = _target_selection(obj, target)
+    positions = get_attribute(obj, 'position')
+    selection = proximity.within_radius(
+        tree = spatial_index(obj, positions), 
+        positions = positions, 
+        target = target, 
+        radius = radius * world_scale, 
+        residues = residue_index(obj) if whole_residues else None, 
+        include_target = include_target
+    )
+
+    set_attribute(obj, name, selection, type = 'BOOLEAN')
+    return selection
+
+def nearest_selection(obj, 
+                      target, 
+                      n = 1, 
+                      whole_residues = True, 
+                      name = 'sel_nearest'
+                      ):
+    """
+    Selects the atoms closest to the target atoms and writes the selection as a boolean
+    point attribute. With `whole_residues` the `n` closest residues are selected,
+    otherwise the `n` closest atoms. The target atoms are never selected.
+
+    Args:
+        obj (bpy.types.Object): The molecule.
+        target (str | np.ndarray): Query or boolean array of the target atoms.
+        n (int, optional): Number of residues or atoms to select. Defaults to 1.
+        whole_residues (bool, optional): Select whole residues. Defaults to True.
+        name (str, optional): Name of the attribute. Defaults to 'sel_nearest'.
+
+    Returns:
+        np.ndarray: The boolean selection.
+    """
+    target = _target_selection(obj, target)
+    positions = get_attribute(obj, 'position')
+    selection = proximity.nearest_to_target(
+        tree = spatial_index(obj, positions), 
+        positions = positions, 
+        target = target, 
+        n = n, 
+        residues = residue_index(obj) if whole_residues else None
+    )
+
+    set_attribute(obj, name, selection, type = 'BOOLEAN')
+    return selection
@@ -0,0 +1,50 @@
+import hashlib
+import numpy as np
+
+# Blender truncates the names of its data blocks to 63 bytes
+MAX_NAME_LENGTH = 63
+
+def data_name(prefix, name, suffix = "", reserve = 0):
+    """
+    Joins the prefix, name and suffix into the name of a Blender data block.
+
+    If the result would be longer than Blender allows, the name is shortened and a short
+    hash of the full name is appended, so that the result stays the same for the same
+    name and distinct for names that only differ past the cut. `reserve` bytes are left
+    for suffixes that are added to the result later, e.g. '_table'.
+    """
+    full = f"{prefix}{name}{suffix}"
+    limit = MAX_NAME_LENGTH - reserve
+    if len(full.encode('utf-8')) <= limit:
+        return full
+
+    digest = "_" + hashlib.sha1(str(name).encode('utf-8')).hexdigest()[:8]
+    room = limit - len(f"{prefix}{digest}{suffix}".encode('utf-8'))
+    # cut on bytes, dropping a character that is split by the cut
+    short = str(name).encode('utf-8')[:max(room, 0)].decode('utf-8', errors = 'ignore')
+    return f"{prefix}{short}{digest}{suffix}"
+
+def selection_node_name(obj_name, kind):
+    """Name of the chain or ligand selection node group of a molecule, e.g. kind 'chains'."""
+    return data_name('MOL_sel_', obj_name, f"_{kind}", reserve = len('_table'))
+
+def table_name(node_name):
+    """Name of the table object of a selection node group from `selection_node_name()`."""
+    return node_name + '_table'
+
+def chain_color_node_name(obj_name):
+    """Name of the colour by chain node group of a molecule."""
+    return data_name('MOL_color_chains_', obj_name, reserve = len('_palette'))
+
+def palette_name(node_name):
+    """Name of the palette object of a node group from `chain_color_node_name()`."""
+    return node_name + '_palette'
+
+def set_selected(values, item_names, names, selected = True):
+    """
+    Returns a copy of the boolean values of the items of a selection table, with the
+    items whose label is one of `names` set to `selected`.
+    """
+    values = np.array(values, dtype = bool)
+    values[np.isin(np.asarray(item_names, dtype = str), list(names))] = selected
+    return values
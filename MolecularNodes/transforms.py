@@ -0,0 +1,206 @@
+import numpy as np
+
+def parse_oper_expression(expression):
+    """
+    Parses a pdbx_struct_assembly_gen operator expression into groups of operator ids.
+    
+    Each parenthesised group becomes a list of ids, e.g. '(1-3)(X0)' returns 
+    [['1', '2', '3'], ['X0']]. An expression without parentheses such as '1,2,5-6' is 
+    a single group.
+    """
+    from re import findall
+    groups = findall(r'\(([^)]*)\)', expression) or [expression]
+    
+    oper_ids = []
+    for group in groups:
+        ids = []
+        for part in group.split(','):
+            part = part.strip()
+            if '-' in part:
+                start, end = part.split('-')
+                ids.extend(str(x) for x in range(int(start), int(end) + 1))
+            elif part:
+                ids.append(part)
+        oper_ids.append(ids)
+    
+    return oper_ids
+
+def as_homogeneous(matrices):
+    """Converts a (N, 3, 4) array of transformations into a (N, 4, 4) array."""
+    bottom = np.zeros((len(matrices), 1, 4))
+    bottom[:, 0, 3] = 1
+    return np.concatenate((matrices[:, :3, :], bottom), axis = 1)
+
+def combine_transformations(groups):
+    """
+    Computes the Cartesian product of groups of (N, 3, 4) transformations. The 
+    transformations of the last group are applied first, as for mmCIF operator 
+    expressions like '(1-60)(61-88)'.
+    
+    Returns a (N, 3, 4) array, where N is the product of the lengths of the groups.
+    """
+    combined = as_homogeneous(groups[0])
+    for group in groups[1:]:
+        combined = np.einsum('aij,bjk->abik', combined, as_homogeneous(group)).reshape((-1, 4, 4))
+    
+    return combined[:, :3, :]
+
+def get_assemblies_pdbx(file_pdbx):
+    """
+    Returns a dictionary indexed by the assembly id as a string, containing a (N, 3, 4) array
+    of the N transformations required to build each biological assembly, as described by 
+    the pdbx_struct_assembly_gen and pdbx_struct_oper_list categories.
+    """
+    oper_list = file_pdbx.get_category('pdbx_struct_oper_list')
+    assembly_gen = file_pdbx.get_category('pdbx_struct_assembly_gen')
+    
+    # categories with a single row contain strings instead of arrays
+    def column(category, name):
+        return np.atleast_1d(category[name])
+    
+    oper_ids = column(oper_list, 'id')
+    matrices = np.zeros((len(oper_ids), 3, 4))
+    for i in range(3):
+        for j in range(3):
+            matrices[:, i, j] = column(oper_list, f'matrix[{i + 1}][{j + 1}]').astype(float)
+        matrices[:, i, 3] = column(oper_list, f'vector[{i + 1}]').astype(float)
+    oper_lookup = dict(zip(oper_ids, matrices))
+    
+    assemblies = {}
+    for assembly_id, expression in zip(column(assembly_gen, 'assembly_id'), 
+                                       column(assembly_gen, 'oper_expression')):
+        groups = [
+            np.array([oper_lookup[oper_id] for oper_id in ids]) 
+            for ids in parse_oper_expression(expression)
+        ]
+        assemblies.setdefault(str(assembly_id), []).append(combine_transformations(groups))
+    
+    return {key: np.concatenate(value) for key, value in assemblies.items()}
+
+def parse_pdb_transformations(lines):
+    """
+    Parses the biological assembly (REMARK 350 BIOMT) and crystallographic symmetry 
+    (REMARK 290 SMTRY) operators from the lines of a PDB file in a single pass.
+    
+    Only the header is read, parsing stops at the first coordinate record.
+    
+    Returns a tuple of a dictionary, indexed by the assembly id as a string, containing 
+    a (N, 3, 4) array of the N transformations that build that assembly, and a (N, 3, 4)
+    array of the symmetry operators.
+    """
+    assemblies = {}
+    symmetry = []
+    assembly_id = None
+    
+    for line in lines:
+        if line.startswith(('ATOM', 'HETATM', 'MODEL')):
+            break
+        if not line.startswith('REMARK'):
+            continue
+        
+        remark = line[7:10]
+        if remark == '350':
+            if 'BIOMOLECULE:' in line:
+                assembly_id = line.split(':')[1].strip()
+                assemblies[assembly_id] = []
+            elif line[13:18] == 'BIOMT' and assembly_id is not None:
+                # the columns are separated by whitespace, take the 4 values after the
+                # row name and operator number
+                assemblies[assembly_id].append(line[19:].split()[1:5])
+        elif remark == '290' and line[13:18] == 'SMTRY':
+            symmetry.append(line[19:].split()[1:5])
+    
+    def as_matrices(rows):
+        return np.array(rows, dtype = float).reshape((-1, 3, 4))
+    
+    assemblies = {key: as_matrices(rows) for key, rows in assemblies.items() if rows}
+    
+    return assemblies, as_matrices(symmetry)
+
+def kabsch(mobile, target):
+    """
+    Finds the rigid transformations that best superimpose the target coordinates onto
+    each set of mobile coordinates, for all sets at once.
+    
+    Args:
+        mobile: (N, n_atoms, 3) array of coordinates of N copies.
+        target: (n_atoms, 3) array of the coordinates to superimpose onto each copy.
+    
+    Returns:
+        tuple: A (N, 3, 4) array of the transformations from target to each copy, and a 
+        (N,) array of the RMSD after superposition.
+    """
+    mobile = np.asarray(mobile, dtype = float)
+    target = np.asarray(target, dtype = float)
+    
+    centroid_mobile = mobile.mean(axis = 1)
+    centroid_target = target.mean(axis = 0)
+    p = mobile - centroid_mobile[:, np.newaxis]
+    q = target - centroid_target
+    
+    # covariance matrices for each copy, and their SVDs computed together
+    u, _, vt = np.linalg.svd(np.einsum('ij,nik->njk', q, p))
+    # correct for reflections so that only proper rotations are returned
+    d = np.sign(np.linalg.det(np.einsum('nji,nkj->nik', vt, u)))
+    vt[:, 2, :] *= d[:, np.newaxis]
+    rotation = np.einsum('nji,nkj->nik', vt, u)
+    
+    transforms = np.zeros((len(mobile), 3, 4))
+    transforms[:, :, :3] = rotation
+    transforms[:, :, 3] = centroid_mobile - rotation @ centroid_target
+    
+    residual = np.einsum('nij,kj->nki', rotation, q) - p
+    rmsd = np.sqrt(np.mean(np.sum(residual ** 2, axis = 2), axis = 1))
+    return transforms, rmsd
+
+def find_chain_instances(mol_array, tolerance = 1.0):
+    """
+    Finds chains that are copies of each other, having identical sequence and atoms, and 
+    which can be superimposed within the tolerance.
+    
+    Args:
+        mol_array: A biotite AtomArray.
+        tolerance (float, optional): The maximum RMSD in Angstroms for a chain to be 
+        considered a copy of another chain. Defaults to 1.0.
+    
+    Returns:
+        tuple: A boolean array of the atoms to keep, a dictionary indexed by the chain id 
+        of each kept template chain that has copies, containing a (N, 3, 4) array of the 
+        transformations from the template to each copy (including itself), and a dictionary
+        with the same keys containing the N chain ids of the copies.
+    """
+    chain_names, inverse = np.unique(mol_array.chain_id, return_inverse = True)
+    order = np.argsort(inverse, kind = 'stable')
+    chain_atoms = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+    
+    # group the chains that have the same residues and atoms, in the same order
+    groups = {}
+    for name, atoms in zip(chain_names, chain_atoms):
+        key = (
+            mol_array.res_name[atoms].tobytes(), 
+            mol_array.atom_name[atoms].tobytes(), 
+            mol_array.element[atoms].tobytes()
+        )
+        groups.setdefault(key, []).append((name, atoms))
+    
+    keep = np.ones(len(mol_array), dtype = bool)
+    instances = {}
+    copies = {}
+    for chains in groups.values():
+        while len(chains) > 1:
+            template_name, template_atoms = chains[0]
+            coords = np.array([mol_array.coord[atoms] for _, atoms in chains])
+            transforms, rmsd = kabsch(coords, mol_array.coord[template_atoms])
+            is_copy = rmsd <= tolerance
+            
+            if is_copy[1:].any():
+                instances[template_name] = transforms[is_copy]
+                copies[template_name] = [name for (name, _), copy in zip(chains, is_copy) if copy]
+                for (_, atoms), copy in zip(chains[1:], is_copy[1:]):
+                    if copy:
+                        keep[atoms] = False
+            
+            # chains that didn't fit the template are compared against each other
+            chains = [chain for chain, copy in zip(chains[1:], is_copy[1:]) if not copy]
+    
+    return keep, instances, copies
@@ -5,8 +5,20 @@ from . import load
 from . import md
 from . import assembly
 from . import density
+from . import selection
+from . import tables
 import os
 
+def report_chain_instances(operator, mol_object):
+    n_atoms = mol_object.get('chain_instances_atoms_saved')
+    if n_atoms:
+        # 12 bytes for the position of each atom, plus 4 bytes for each of the attributes
+        n_bytes = n_atoms * (12 + 4 * len(mol_object.data.attributes))
+        operator.report(
+            {'INFO'}, 
+            message=f"Replaced {n_atoms} atoms of copied chains with instances, saving ~{n_bytes / 1e6:.1f} MB."
+            )
+
 # operator that calls the function to import the structure from the PDB
 class MOL_OT_Import_Protein_RCSB(bpy.types.Operator):
     bl_idname = "mol.import_protein_rcsb"
@@ -26,11 +38,13 @@ class MOL_OT_Import_Protein_RCSB(bpy.types.Operator):
             center_molecule=bpy.context.scene.mol_import_center, 
             del_solvent=bpy.context.scene.mol_import_del_solvent,
             include_bonds=bpy.context.scene.mol_import_include_bonds,
-            starting_style=bpy.context.scene.mol_import_default_style
+            starting_style=bpy.context.scene.mol_import_default_style, 
+            dedup_chains=bpy.context.scene.mol_import_dedup_chains
         )
         
         bpy.context.view_layer.objects.active = mol_object
         self.report({'INFO'}, message=f"Imported '{pdb_code}' as {mol_object.name}")
+        report_chain_instances(self, mol_object)
         
         return {"FINISHED"}
 
@@ -58,12 +72,14 @@ class MOL_OT_Import_Protein_Local(bpy.types.Operator):
             center_molecule=bpy.context.scene.mol_import_center, 
             del_solvent=bpy.context.scene.mol_import_del_solvent, 
             default_style=bpy.context.scene.mol_import_default_style, 
-            setup_nodes=True
+            setup_nodes=True, 
+            dedup_chains=bpy.context.scene.mol_import_dedup_chains
             )
         
         # return the good news!
         bpy.context.view_layer.objects.active = mol_object
         self.report({'INFO'}, message=f"Imported '{file_path}' as {mol_object.name}")
+        report_chain_instances(self, mol_object)
         return {"FINISHED"}
 
     def invoke(self, context, event):
@@ -102,14 +118,31 @@ class MOL_OT_Import_Protein_MD(bpy.types.Operator):
             selection   = selection,
             include_bonds=include_bonds,
             custom_selections = custom_selections,
+            unwrap      = bpy.context.scene.mol_import_md_unwrap, 
+            center      = bpy.context.scene.mol_import_md_center, 
+            fit         = bpy.context.scene.mol_import_md_fit, 
+            transform_selection = bpy.context.scene.mol_import_md_transform_selection, 
+            interpolation = bpy.context.scene.mol_import_md_interpolation, 
+            n_keyframes = bpy.context.scene.mol_import_md_keyframes, 
+            keyframe_selection = bpy.context.scene.mol_import_md_keyframe_selection, 
+            n_workers = bpy.context.scene.mol_import_md_workers, 
+            frame_storage = bpy.context.scene.mol_import_md_frame_storage, 
+            frame_channels = sorted(bpy.context.scene.mol_import_md_frame_channels), 
+            analyses = sorted(bpy.context.scene.mol_import_md_analyses)
         )
-        n_frames = len(coll_frames.objects)
+        store = md.frame_store(mol_object)
+        n_frames = len(store) if store else len(coll_frames.objects)
         
+        # interpolated and stored trajectories are animated by writing to the mesh on 
+        # frame change, instead of through the animation nodes
+        interpolated = bpy.context.scene.mol_import_md_interpolation != 'NONE' or store is not None
         nodes.create_starting_node_tree(
             obj = mol_object, 
-            coll_frames = coll_frames, 
+            coll_frames = None if interpolated else coll_frames, 
             starting_style = bpy.context.scene.mol_import_default_style
             )
+        if interpolated:
+            md.update_frame_interpolation(bpy.context.scene)
         bpy.context.view_layer.objects.active = mol_object
         self.report(
             {'INFO'}, 
@@ -167,10 +200,14 @@ class MOL_OT_Import_Map(bpy.types.Operator):
         map_file = bpy.context.scene.mol_import_map
         invert = bpy.context.scene.mol_import_map_invert
         setup_node_tree = bpy.context.scene.mol_import_map_nodes
+        precision = bpy.context.scene.mol_import_map_precision
+        bin_size = bpy.context.scene.mol_import_map_bin
         
         vol = density.load(
             file = map_file, 
-            invert = invert
+            invert = invert, 
+            precision = precision, 
+            bin_size = bin_size
             )
         if setup_node_tree:
             nodes.create_starting_nodes_density(vol)
@@ -195,12 +232,28 @@ def MOL_PT_panel_map(layout_function, scene):
              text = 'EM Map', 
              emboss = True
             )
+    row = col_main.row()
+    row.prop(bpy.context.scene, 'mol_import_map_precision', 
+             text = 'Precision', 
+             emboss = True
+            )
+    row.prop(bpy.context.scene, 'mol_import_map_bin', 
+             text = 'Bin', 
+             emboss = True
+            )
     col_main.label(text = "Intermediate file will be created:")
     box = col_main.box()
     box.alignment = "LEFT"
     box.scale_y = 0.4
+    options = density.vdb_options(
+        invert = bpy.context.scene.mol_import_map_invert, 
+        precision = bpy.context.scene.mol_import_map_precision, 
+        roi = None, 
+        roi_world = None, 
+        bin_size = bpy.context.scene.mol_import_map_bin
+    )
     box.label(
-        text = f"Intermediate file: {density.path_to_vdb(bpy.context.scene.mol_import_map)}."
+        text = f"Intermediate file: {density.path_to_vdb(bpy.context.scene.mol_import_map, options)}."
         )
     box.label(
         text = "Please do not delete this file or the volume will not render."
@@ -252,11 +305,50 @@ def MOL_PT_panel_md_traj(layout_function, scene):
         text = 'End',
         emboss = True
     )
+    row_keyframes = col_main.row(heading = "Keyframes", align = True)
+    row_keyframes.prop(
+        bpy.context.scene, 'mol_import_md_keyframes', 
+        text = 'Count',
+        emboss = True
+    )
+    row_keyframes.prop(
+        bpy.context.scene, 'mol_import_md_keyframe_selection', 
+        text = '',
+        emboss = True
+    )
+    col_main.prop(
+        bpy.context.scene, 'mol_import_md_workers', 
+        text = 'Workers',
+        emboss = True
+    )
+    col_main.prop(
+        bpy.context.scene, 'mol_import_md_frame_storage', 
+        text = 'Frame Storage',
+        emboss = True
+    )
+    row_channels = col_main.row(heading = "Per Frame", align = True)
+    row_channels.prop(bpy.context.scene, 'mol_import_md_frame_channels')
+    row_analyses = col_main.row(heading = "Analysis", align = True)
+    row_analyses.prop(bpy.context.scene, 'mol_import_md_analyses')
     col_main.prop(
         bpy.context.scene, 'mol_md_selection', 
         text = 'Import Filter', 
         emboss = True
     )
+    row_transform = col_main.row(heading = "Transform", align = True)
+    row_transform.prop(bpy.context.scene, 'mol_import_md_unwrap', text = 'Unwrap')
+    row_transform.prop(bpy.context.scene, 'mol_import_md_center', text = 'Center')
+    row_transform.prop(bpy.context.scene, 'mol_import_md_fit', text = 'Fit')
+    col_main.prop(
+        bpy.context.scene, 'mol_import_md_transform_selection', 
+        text = 'Center / Fit', 
+        emboss = True
+    )
+    col_main.prop(
+        bpy.context.scene, 'mol_import_md_interpolation', 
+        text = 'Interpolation', 
+        emboss = True
+    )
     col_main.separator()
     col_main.label(text="Custom Selections")
     row = col_main.row(align=True)
@@ -275,6 +367,7 @@ def MOL_PT_panel_md_traj(layout_function, scene):
         
         col.prop(item, "name")
         col.prop(item, "selection")
+        col.prop(item, "updating")
 
 def MOL_PT_panel_star_file(layout_function, scene):
     col_main = layout_function.column(heading = "", align = False)
@@ -395,6 +488,8 @@ def MOL_PT_panel_ui(layout_function, scene):
                 text = 'Delete Solvent', icon_value=0, emboss=True)
     grid.prop(bpy.context.scene, 'mol_import_include_bonds', 
                 text = 'Import Bonds', icon_value=0, emboss=True)
+    grid.prop(bpy.context.scene, 'mol_import_dedup_chains', 
+                text = 'Instance Chains', icon_value=0, emboss=True)
     grid.menu(
         'MOL_MT_Default_Style', 
         text = ['Atoms', 'Ribbon', 'Ball and Stick'][
@@ -567,15 +662,37 @@ class MOL_OT_Style_Surface_Custom(bpy.types.Operator):
         
         return {"FINISHED"}
 
+# references to the enum items have to be kept, otherwise Blender can display garbage
+_assembly_id_items = []
+
+def assembly_id_items(self, context):
+    """The ids of the biological assemblies stored on the active object, as enum items."""
+    global _assembly_id_items
+    obj = context.active_object
+    try:
+        assembly_ids = list(assembly.get_stored_assemblies(obj).keys())
+    except Exception:
+        assembly_ids = []
+    _assembly_id_items = [
+        (str(assembly_id), f"Assembly {assembly_id}", f"Build biological assembly '{assembly_id}' of the file") 
+        for assembly_id in assembly_ids
+    ]
+    return _assembly_id_items
+
 class MOL_OT_Assembly_Bio(bpy.types.Operator):
     bl_idname = "mol.assembly_bio"
     bl_label = "Build"
-    bl_description = "**PDB Downloaded Structures Only**\nAdds node to build \
-        biological assembly based on symmetry operations that are extraced from the \
-        structure file. Currently this is only supported for structures that were \
-        downloaded from the PDB"
+    bl_description = "Adds node to build biological assembly based on symmetry \
+        operations that are extraced from the structure file. All assemblies in the file \
+        are available, and can be switched between with the 'Assembly ID' input"
     bl_options = {"REGISTER", "UNDO"}
     
+    assembly_id: bpy.props.EnumProperty(
+        name = "Assembly", 
+        description = "Biological assembly of the file to build", 
+        items = assembly_id_items
+    )
+    
     @classmethod
     def poll(cls, context):
         return True
@@ -583,9 +700,10 @@ class MOL_OT_Assembly_Bio(bpy.types.Operator):
     def execute(self, context):
         obj = context.active_object
         try:
+            transform_dict = assembly.get_stored_assemblies(obj)
             node_bio_assembly = assembly.create_biological_assembly_node(
                 name = obj.name, 
-                transform_dict = assembly.get_transformations_mmtf(obj['bio_transform_dict'])
+                transform_dict = transform_dict
             )
         except:
             node_bio_assembly = None
@@ -596,8 +714,96 @@ class MOL_OT_Assembly_Bio(bpy.types.Operator):
         
         if node_bio_assembly:
             mol_add_node(node_bio_assembly.name)
+            # the node input is the index of the assembly, label the node with the file's id
+            assembly_ids = list(transform_dict.keys())
+            if self.assembly_id in assembly_ids:
+                node = bpy.context.active_node
+                node.inputs['Assembly ID'].default_value = assembly_ids.index(self.assembly_id) + 1
+                node.label = f"Assembly {self.assembly_id}"
         
         return {"FINISHED"}
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+class MOL_OT_Assembly_Lattice(bpy.types.Operator):
+    bl_idname = "mol.assembly_lattice"
+    bl_label = "Crystal Lattice"
+    bl_description = "Adds node to build a block of unit cells of the crystal lattice, \
+        based on the unit cell and symmetry operations that are extracted from the \
+        structure file. Copies of the structure are instanced"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    size: bpy.props.IntVectorProperty(
+        name = "Cells", 
+        description = "Number of unit cells along the a, b and c axes", 
+        size = 3, 
+        min = 1, 
+        default = (1, 1, 1)
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return True
+
+    def execute(self, context):
+        obj = context.active_object
+        size = tuple(self.size)
+        try:
+            node_lattice = assembly.create_biological_assembly_node(
+                name = obj.name + '_lattice_{}x{}x{}'.format(*size), 
+                transform_dict = assembly.get_stored_lattice(obj, size = size)
+            )
+        except:
+            node_lattice = None
+            self.report(
+                {'WARNING'}, 
+                message = 'Unable to detect unit cell and symmetry information.'
+                )
+        
+        if node_lattice:
+            mol_add_node(node_lattice.name)
+        
+        return {"FINISHED"}
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+class MOL_OT_Periodic_Images(bpy.types.Operator):
+    bl_idname = "mol.periodic_images"
+    bl_label = "Periodic Images"
+    bl_description = "Adds node to tile the trajectory across its periodic images, using \
+        the box of the current frame. Copies of the system are instanced"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    images: bpy.props.IntVectorProperty(
+        name = "Images", 
+        description = "Number of images either side of the box along each box vector", 
+        size = 3, 
+        min = 0, 
+        default = (1, 1, 0)
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def execute(self, context):
+        obj = context.active_object
+        if not obj.get('periodic_boxes'):
+            self.report(
+                {'WARNING'}, 
+                message = 'No periodic box information for this trajectory.'
+                )
+            return {"CANCELLED"}
+        
+        node_images = md.create_periodic_images_node(obj, images = tuple(self.images))
+        mol_add_node(node_images.name)
+        
+        return {"FINISHED"}
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
 
 def menu_residues_selection_custom(layout_function):
     obj = bpy.context.view_layer.objects.active
@@ -636,7 +842,7 @@ class MOL_OT_Color_Chain(bpy.types.Operator):
         obj = context.active_object
         try:
             node_color_chain = nodes.chain_color(
-                node_name = f"MOL_color_chains_{obj.name}", 
+                node_name = tables.chain_color_node_name(obj.name), 
                 input_list = obj['chain_id_unique']
             )
             mol_add_node(node_color_chain.name)
@@ -645,6 +851,70 @@ class MOL_OT_Color_Chain(bpy.types.Operator):
         
         return {"FINISHED"}
 
+def chain_palette(obj):
+    """Returns the palette object of the chain colour node of the object, if it exists."""
+    return bpy.data.objects.get(tables.palette_name(tables.chain_color_node_name(obj.name))) if obj else None
+
+# references to the enum items have to be kept, otherwise Blender can display garbage
+_chain_color_items = []
+
+def chain_color_items(self, context):
+    """The chains of the palette of the active object, as enum items."""
+    global _chain_color_items
+    palette = chain_palette(context.active_object)
+    names = list(palette['chain_names']) if palette else []
+    _chain_color_items = [(name, name, f"Set the colour of {name}") for name in names]
+    return _chain_color_items
+
+def chain_color_update(self, context):
+    # show the current colour of the chosen chain
+    palette = chain_palette(context.active_object)
+    if palette and self.chain:
+        self.color = nodes.get_chain_color(palette, self.chain)
+
+class MOL_OT_Edit_Chain_Color(bpy.types.Operator):
+    bl_idname = "mol.edit_chain_color"
+    bl_label = "Edit Chain Colors"
+    bl_description = "Change the colour of a chain in the palette used by the Color by \
+        Chains node of the active object"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    chain: bpy.props.EnumProperty(
+        name = "Chain", 
+        description = "Chain to change the colour of", 
+        items = chain_color_items, 
+        update = chain_color_update
+    )
+    color: bpy.props.FloatVectorProperty(
+        name = "Color", 
+        description = "Colour of the chain", 
+        subtype = 'COLOR', 
+        size = 4, 
+        min = 0, 
+        max = 1, 
+        default = (1, 1, 1, 1)
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return chain_palette(context.active_object) is not None
+
+    def execute(self, context):
+        palette = chain_palette(context.active_object)
+        if not self.chain:
+            self.report({'WARNING'}, message = 'The palette has no chains.')
+            return {"CANCELLED"}
+        
+        nodes.set_chain_color(palette, self.chain, self.color)
+        return {"FINISHED"}
+    
+    def invoke(self, context, event):
+        chain_color_update(self, context)
+        return context.window_manager.invoke_props_dialog(self)
+
+# maximum number of chains or ligands to create individual check boxes for
+max_selection_inputs = 32
+
 def menu_chain_selection_custom(layout_function):
     obj = bpy.context.view_layer.objects.active
     label = 'Chain ' + str(obj.name)
@@ -669,9 +939,20 @@ class MOL_OT_Chain_Selection_Custom(bpy.types.Operator):
     
     def execute(self, context):
         obj = bpy.context.view_layer.objects.active
-        node_chains = nodes.chain_selection(
-            node_name = 'MOL_sel_' + str(obj.name) + "_chains", 
-            input_list = obj['chain_id_unique'], 
+        input_list = obj['chain_id_unique']
+        # a check box for every item becomes unusable and slow for long lists, so 
+        # use the constant-size lookup table instead
+        if len(input_list) > max_selection_inputs:
+            chain_selection = nodes.chain_selection_table
+            self.report({'INFO'}, message = (
+                f"Selection of {len(input_list)} chains is stored in a table object, "
+                "change it with Edit Selection Table."
+            ))
+        else:
+            chain_selection = nodes.chain_selection
+        node_chains = chain_selection(
+            node_name = tables.selection_node_name(obj.name, 'chains'), 
+            input_list = input_list, 
             starting_value = 0,
             attribute = 'chain_id', 
             label_prefix = "Chain "
@@ -682,6 +963,80 @@ class MOL_OT_Chain_Selection_Custom(bpy.types.Operator):
         return {"FINISHED"}
 
 
+def selection_table(obj, kind):
+    """Returns the table object of the chain or ligand selection of the object, if it exists."""
+    return bpy.data.objects.get(tables.table_name(tables.selection_node_name(obj.name, kind))) if obj else None
+
+# references to the enum items have to be kept, otherwise Blender can display garbage
+_selection_table_items = []
+
+def selection_table_items(self, context):
+    """The items of the chosen selection table of the active object, as enum items."""
+    global _selection_table_items
+    table = selection_table(context.active_object, self.table)
+    names = list(table['item_names']) if table else []
+    _selection_table_items = [('ALL', "All", "Change every item of the table")] + [
+        (name, name, f"Change whether {name} is selected") for name in names
+    ]
+    return _selection_table_items
+
+def selection_table_update(self, context):
+    # show whether the chosen item is currently selected
+    table = selection_table(context.active_object, self.table)
+    item_names = list(table['item_names']) if table else []
+    if self.item in item_names:
+        self.selected = bool(nodes.get_selection_table(table)[item_names.index(self.item)])
+
+class MOL_OT_Edit_Selection_Table(bpy.types.Operator):
+    bl_idname = "mol.edit_selection_table"
+    bl_label = "Edit Selection Table"
+    bl_description = "Change which chains or ligands are selected by the selection node \
+        of the active object, for structures with too many chains or ligands for a check \
+        box each"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    table: bpy.props.EnumProperty(
+        name = "Table", 
+        description = "Selection table to edit", 
+        items = (
+            ('chains', "Chains", "The chain selection of the active object"), 
+            ('ligands', "Ligands", "The ligand selection of the active object")
+        ), 
+        update = selection_table_update
+    )
+    item: bpy.props.EnumProperty(
+        name = "Item", 
+        description = "Chain or ligand to change", 
+        items = selection_table_items, 
+        update = selection_table_update
+    )
+    selected: bpy.props.BoolProperty(
+        name = "Selected", 
+        description = "Whether the item is selected", 
+        default = True
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return any(selection_table(obj, kind) for kind in ('chains', 'ligands'))
+
+    def execute(self, context):
+        table = selection_table(context.active_object, self.table)
+        if not table:
+            self.report({'WARNING'}, message = f"No {self.table} selection table for the active object.")
+            return {"CANCELLED"}
+        
+        item_names = list(table['item_names']) if self.item == 'ALL' else [self.item]
+        nodes.set_selection_table(table, item_names, selected = self.selected)
+        return {"FINISHED"}
+    
+    def invoke(self, context, event):
+        if not selection_table(context.active_object, self.table):
+            self.table = 'ligands' if self.table == 'chains' else 'chains'
+        selection_table_update(self, context)
+        return context.window_manager.invoke_props_dialog(self)
+
 class MOL_OT_Residues_Selection_Custom(bpy.types.Operator):
     bl_idname = "mol.residues_selection_custom"
     bl_label = "Multiple Residue Selection"
@@ -695,6 +1050,19 @@ class MOL_OT_Residues_Selection_Custom(bpy.types.Operator):
         description="Enter a string value.",
         default="19,94,1-16"
     )
+    
+    as_attribute: bpy.props.BoolProperty(
+        name = "Store as Attribute", 
+        description = "Compile the selection once and store it as a boolean attribute on \
+            the molecule, instead of creating a node for each residue range", 
+        default = False
+    )
+    
+    attribute_name: bpy.props.StringProperty(
+        name = "Attribute Name", 
+        description = "Name of the attribute to store the selection in", 
+        default = "sel_res_id"
+    )
 
     @classmethod
     def poll(cls, context):
@@ -702,6 +1070,19 @@ class MOL_OT_Residues_Selection_Custom(bpy.types.Operator):
     
     def execute(self, context):
         obj = bpy.context.view_layer.objects.active
+        
+        if self.as_attribute:
+            selected = selection.resid_selection_attribute(
+                obj = obj, 
+                input_resid_string = self.input_resid_string, 
+                name = self.attribute_name
+            )
+            self.report(
+                {'INFO'}, 
+                message = f"Selected {selected.sum()} atoms in the attribute '{self.attribute_name}'."
+                )
+            return {"FINISHED"}
+        
         node_residues = nodes.resid_multiple_selection(
             node_name = 'MOL_sel_residues', 
             input_resid_string = self.input_resid_string, 
@@ -714,6 +1095,138 @@ class MOL_OT_Residues_Selection_Custom(bpy.types.Operator):
     def invoke(self, context, event):
         return context.window_manager.invoke_props_dialog(self)
 
+class MOL_OT_Query_Selection(bpy.types.Operator):
+    bl_idname = "mol.query_selection"
+    bl_label = "Query Selection"
+    bl_description = "Create a selection from a query over the attributes of the \
+        molecule, e.g. 'chain_id in (0, 3) and b_factor > 40 and not is_solvent'.\n\
+        The selection is stored as a boolean attribute on the molecule."
+    bl_options = {"REGISTER", "UNDO"}
+
+    query: bpy.props.StringProperty(
+        name = "Query", 
+        description = "Query over the attributes of the molecule", 
+        default = "chain_id in (0, 1) and not is_solvent"
+    )
+    
+    attribute_name: bpy.props.StringProperty(
+        name = "Attribute Name", 
+        description = "Name of the attribute to store the selection in", 
+        default = "sel_query"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return True
+    
+    def execute(self, context):
+        obj = bpy.context.view_layer.objects.active
+        
+        try:
+            selected = selection.query_selection(
+                obj = obj, 
+                query = self.query, 
+                name = self.attribute_name
+            )
+        except ValueError as error:
+            self.report({'ERROR'}, message = str(error))
+            return {"CANCELLED"}
+        
+        self.report(
+            {'INFO'}, 
+            message = f"Selected {selected.sum()} atoms in the attribute '{self.attribute_name}'."
+            )
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+class MOL_OT_Proximity_Selection(bpy.types.Operator):
+    bl_idname = "mol.proximity_selection"
+    bl_label = "Proximity Selection"
+    bl_description = "Select the atoms near to the target atoms, e.g. residues within 5 \
+        Angstroms of a ligand, using a spatial index of the molecule.\n\
+        The selection is stored as a boolean attribute on the molecule."
+    bl_options = {"REGISTER", "UNDO"}
+
+    target: bpy.props.StringProperty(
+        name = "Target", 
+        description = "Query over the attributes of the molecule for the target atoms", 
+        default = "not is_peptide and not is_nucleic and not is_solvent"
+    )
+    
+    mode: bpy.props.EnumProperty(
+        name = "Mode", 
+        items = (
+            ('RADIUS', "Radius", "Select the atoms within the radius of the target"), 
+            ('NEAREST', "Nearest", "Select the residues (or atoms) closest to the target")
+        ), 
+        default = 'RADIUS'
+    )
+    
+    radius: bpy.props.FloatProperty(
+        name = "Radius (A)", 
+        description = "Radius around the target atoms in Angstroms", 
+        default = 5, 
+        min = 0
+    )
+    
+    count: bpy.props.IntProperty(
+        name = "Count", 
+        description = "Number of residues (or atoms) to select for the nearest mode", 
+        default = 5, 
+        min = 1
+    )
+    
+    whole_residues: bpy.props.BoolProperty(
+        name = "Whole Residues", 
+        description = "Expand the selection to every atom of the selected residues", 
+        default = True
+    )
+    
+    attribute_name: bpy.props.StringProperty(
+        name = "Attribute Name", 
+        description = "Name of the attribute to store the selection in", 
+        default = "sel_proximity"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return True
+    
+    def execute(self, context):
+        obj = bpy.context.view_layer.objects.active
+        
+        try:
+            if self.mode == 'RADIUS':
+                selected = selection.proximity_selection(
+                    obj = obj, 
+                    target = self.target, 
+                    radius = self.radius, 
+                    whole_residues = self.whole_residues, 
+                    name = self.attribute_name
+                )
+            else:
+                selected = selection.nearest_selection(
+                    obj = obj, 
+                    target = self.target, 
+                    n = self.count, 
+                    whole_residues = self.whole_residues, 
+                    name = self.attribute_name
+                )
+        except ValueError as error:
+            self.report({'ERROR'}, message = str(error))
+            return {"CANCELLED"}
+        
+        self.report(
+            {'INFO'}, 
+            message = f"Selected {selected.sum()} atoms in the attribute '{self.attribute_name}'."
+            )
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
 def menu_ligand_selection_custom(layout_function):
     obj = bpy.context.view_layer.objects.active
     label = 'Ligands ' + str(obj.name)
@@ -738,9 +1251,18 @@ class MOL_OT_Ligand_Selection_Custom(bpy.types.Operator):
     
     def execute(self, context):
         obj = bpy.context.view_layer.objects.active
-        node_chains = nodes.chain_selection(
-            node_name = 'MOL_sel_' + str(obj.name) + "_ligands", 
-            input_list = obj['ligands'], 
+        input_list = obj['ligands']
+        if len(input_list) > max_selection_inputs:
+            chain_selection = nodes.chain_selection_table
+            self.report({'INFO'}, message = (
+                f"Selection of {len(input_list)} ligands is stored in a table object, "
+                "change it with Edit Selection Table."
+            ))
+        else:
+            chain_selection = nodes.chain_selection
+        node_chains = chain_selection(
+            node_name = tables.selection_node_name(obj.name, 'ligands'), 
+            input_list = input_list, 
             starting_value = 100, 
             attribute = 'res_name', 
             label_prefix = ""
@@ -788,6 +1310,7 @@ class MOL_MT_Add_Node_Menu_Color(bpy.types.Menu):
         menu_item_interface(layout, 'Color by Element', 'MOL_color_element', 
                             "Choose a color for each of the first 20 elements")
         menu_item_color_chains(layout, 'Color by Chains')
+        layout.operator('mol.edit_chain_color', text = 'Edit Chain Colors')
         menu_item_interface(layout, 'Color Atomic', 'MOL_style_color', 
                             "Choose a color for the most common elements in PDB \
                             structures")
@@ -872,6 +1395,7 @@ class MOL_MT_Add_Node_Menu_Selections(bpy.types.Menu):
         layout.separator()
         menu_chain_selection_custom(layout)
         menu_ligand_selection_custom(layout)
+        layout.operator('mol.edit_selection_table', text = 'Edit Selection Table')
         layout.separator()
         menu_item_interface(layout, 'Atom Properties', 'MOL_sel_atom_propeties', 
                             "Create a selection based on the properties of the atom.\n\
@@ -893,6 +1417,8 @@ class MOL_MT_Add_Node_Menu_Selections(bpy.types.Menu):
                             axes, based on the position of an object.")
         layout.separator()
         menu_residues_selection_custom(layout)                        
+        layout.operator('mol.query_selection', text = 'Query', emboss = True, depress = True)
+        layout.operator('mol.proximity_selection', text = 'Proximity', emboss = True, depress = True)
         menu_item_interface(layout, 'Res ID Single', 'MOL_sel_res_id', 
                             "Create a selection if res_id matches input field")
         menu_item_interface(layout, 'Res ID Range', 'MOL_sel_res_id_range', 
@@ -926,6 +1452,16 @@ class MOL_MT_Add_Node_Menu_Assembly(bpy.types.Menu):
                         emboss = True, 
                         depress=True
                         )
+        layout.operator("mol.assembly_lattice", 
+                        text = "Crystal Lattice", 
+                        emboss = True, 
+                        depress=True
+                        )
+        layout.operator("mol.periodic_images", 
+                        text = "Periodic Images", 
+                        emboss = True, 
+                        depress=True
+                        )
         menu_item_interface(layout, 'Center Assembly', 'MOL_assembly_center', 
                             "Center the structure on the world origin based on \
                             bounding box")
@@ -0,0 +1,172 @@
+"""
+Workers for reading and evaluating chunks of trajectory frames in separate processes.
+
+This module is imported by the worker processes as a top-level module, so it must not
+import bpy or anything from the MolecularNodes package.
+
+The atom groups passed to the workers are unpickled into their own universe, reopening
+the topology and trajectory files along with any on-the-fly transformations, so workers 
+never share a reader or a transformation.
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+# per-frame channels which can be read from the timestep, see `read_channel()`
+built_in_channels = ('occupancy', 'tempfactors', 'velocities', 'forces')
+
+def read_channel(name, ts, atoms):
+    """
+    Reads the values of the atoms for the built-in per-frame channel from the timestep.
+    """
+    if name == 'velocities':
+        return atoms.velocities
+    if name == 'forces':
+        return atoms.forces
+    
+    values = np.asarray(ts.data[{'occupancy': 'occupancy', 'tempfactors': 'tempfactor'}[name]])
+    # timestep data is for every atom of the universe, not only the selection
+    return values[atoms.ix] if len(values) == atoms.universe.atoms.n_atoms else values
+
+def read_frames(atoms, frames, shm_name, shape, start, channels = ()):
+    """
+    Reads the positions of the atoms for each of the frames into rows `start` onwards of
+    the float32 array of the given shape in the shared memory block, along with the
+    values of the built-in per-frame channels.
+
+    The atom group is unpickled into the worker as its own universe, reopening the
+    topology and trajectory files along with any on-the-fly transformations.
+
+    Returns the (n_frames, 6) box dimensions of the frames, NaN where there is no box,
+    and a dictionary of each channel's list of float32 values for each frame, None 
+    where the channel can't be read.
+    """
+    dimensions = np.full((len(frames), 6), np.nan)
+    values = {name: [] for name in channels}
+    shm = shared_memory.SharedMemory(name = shm_name)
+    try:
+        positions = np.ndarray(shape, dtype = np.float32, buffer = shm.buf)
+        for i, ts in enumerate(atoms.universe.trajectory[frames]):
+            positions[start + i] = atoms.positions
+            if ts.dimensions is not None:
+                dimensions[i] = ts.dimensions
+            for name in channels:
+                try:
+                    values[name].append(np.asarray(read_channel(name, ts, atoms), dtype = np.float32))
+                except Exception:
+                    values[name].append(None)
+        del positions
+    finally:
+        shm.close()
+    return dimensions, values
+
+def coordinates_chunk(atoms, frames):
+    """
+    Reads the positions of the atoms for each of the frames, centered on their mean.
+
+    Returns the (n_frames, n_atoms, 3) float32 centered positions.
+    """
+    coordinates = np.zeros((len(frames), atoms.n_atoms, 3), dtype = np.float32)
+    for i, ts in enumerate(atoms.universe.trajectory[frames]):
+        coordinates[i] = atoms.positions
+    coordinates -= coordinates.mean(axis = 1, keepdims = True)
+    return coordinates
+
+def dynamic_selection_chunk(atoms, frames, selection):
+    """
+    Evaluates the selection with `updating=True` for each of the frames.
+
+    Returns the (n_frames, n_bytes) masks over the atom group, packed with `np.packbits()`.
+    """
+    universe = atoms.universe
+    
+    # position of each atom of the universe in the atom group, to convert the selected
+    # atoms into a mask over the atom group
+    position = np.full(universe.atoms.n_atoms, -1)
+    position[atoms.ix] = np.arange(atoms.n_atoms)
+    
+    group = atoms.select_atoms(selection, updating = True)
+    masks = np.zeros((len(frames), (atoms.n_atoms + 7) // 8), dtype = np.uint8)
+    mask = np.zeros(atoms.n_atoms, dtype = bool)
+    for i, frame in enumerate(frames):
+        universe.trajectory[frame]
+        mask[:] = False
+        mask[position[group.ix]] = True
+        masks[i] = np.packbits(mask)
+    
+    return masks
+
+def inter_group_contacts(positions, groups, cutoff):
+    """
+    Returns a boolean mask of the atoms within the cutoff of an atom of another group.
+
+    A tree is built for each group and only the trees of different groups whose bounding
+    boxes are within the cutoff are queried against each other, so the many pairs of 
+    atoms within the same chain are never enumerated.
+    """
+    from scipy.spatial import cKDTree
+
+    order = np.argsort(groups, kind = 'stable')
+    bounds = np.flatnonzero(np.diff(groups[order])) + 1
+    members = np.split(order, bounds)
+    trees = [cKDTree(positions[atoms]) for atoms in members]
+    lower = np.array([positions[atoms].min(axis = 0) for atoms in members])
+    upper = np.array([positions[atoms].max(axis = 0) for atoms in members])
+
+    in_contact = np.zeros(len(positions), dtype = bool)
+    for i in range(len(members)):
+        for j in range(i + 1, len(members)):
+            if np.any(lower[j] - upper[i] > cutoff) or np.any(lower[i] - upper[j] > cutoff):
+                continue
+            pairs = trees[i].sparse_distance_matrix(trees[j], max_distance = cutoff, output_type = 'ndarray')
+            in_contact[members[i][pairs['i']]] = True
+            in_contact[members[j][pairs['j']]] = True
+    return in_contact
+
+def analysis_chunk(atoms, frames, analyses, residues, groups, contact_cutoff, elements = None):
+    """
+    Accumulates the per-atom and per-residue sums of the analyses over the frames, which
+    are combined across chunks by `analysis.trajectory_analysis()`. The elements of the 
+    atoms are needed for 'sasa'.
+
+    Returns a dictionary of the sums and the number of frames.
+    """
+    universe = atoms.universe
+
+    n_atoms = atoms.n_atoms
+    n_residues = residues.max() + 1 if len(residues) else 0
+    sums = {
+        'n_frames': 0,
+        'position': np.zeros((n_atoms, 3)),
+        'position_squared': np.zeros((n_atoms, 3)),
+        'sasa': np.zeros(n_residues),
+        'contacts': np.zeros(n_residues)
+    }
+
+    if 'sasa' in analyses:
+        import biotite.structure as struc
+        array = struc.AtomArray(n_atoms)
+        array.element = np.char.upper(np.array(elements, dtype = str))
+        array.res_id = atoms.resnums
+        array.res_name = atoms.resnames
+        array.atom_name = atoms.names
+
+    for ts in universe.trajectory[frames]:
+        positions = atoms.positions.astype(np.float64)
+        sums['n_frames'] += 1
+
+        if 'rmsf' in analyses:
+            sums['position'] += positions
+            sums['position_squared'] += positions ** 2
+
+        if 'sasa' in analyses:
+            array.coord = positions.astype(np.float32)
+            sasa = struc.sasa(array, vdw_radii = 'Single')
+            sums['sasa'] += np.bincount(residues, weights = np.nan_to_num(sasa), minlength = n_residues)
+
+        if 'contacts' in analyses:
+            # residues with any atom within the cutoff of an atom of another chain
+            in_contact = inter_group_contacts(positions, groups, contact_cutoff)
+            sums['contacts'][np.unique(residues[in_contact])] += 1
+
+    return sums
@@ -0,0 +1,71 @@
+"""
+Times reading the positions of a trajectory with `md.parallel_frame_positions()` at 1, 4
+and 16 worker processes, against reading the frames serially in a single process.
+
+Run it with Blender's Python, which has MDAnalysis installed by the add-on:
+
+    blender -b --python benchmarks/bench_frame_reader.py -- TOPOLOGY TRAJECTORY [--repeats 3]
+
+Without files the PSF / DCD test trajectory of MDAnalysisTests is used when installed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+WORKERS = (1, 4, 16)
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument('topology', nargs = '?', default = None)
+    parser.add_argument('trajectory', nargs = '?', default = None)
+    parser.add_argument('--selection', default = 'all')
+    parser.add_argument('--repeats', type = int, default = 3)
+    return parser.parse_args(argv)
+
+def best_of(func, repeats):
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    # imported here, as spawned worker processes import this script as their main module
+    import numpy as np
+    import MDAnalysis as mda
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from MolecularNodes import md
+
+    args = parse_args()
+    if args.topology is None:
+        from MDAnalysisTests.datafiles import PSF, DCD
+        args.topology, args.trajectory = PSF, DCD
+
+    univ = mda.Universe(args.topology, args.trajectory)
+    atoms = univ.select_atoms(args.selection)
+    frames = np.arange(univ.trajectory.n_frames)
+    print(f"{atoms.n_atoms} atoms, {len(frames)} frames, best of {args.repeats}")
+
+    def read_serial():
+        positions = np.zeros((len(frames), atoms.n_atoms, 3), dtype = np.float32)
+        for i, ts in enumerate(univ.trajectory[frames]):
+            positions[i] = atoms.positions
+
+    serial = best_of(read_serial, args.repeats)
+    print(f"{'serial':>10}: {serial:8.3f} s")
+
+    for n_workers in WORKERS:
+        def read_parallel():
+            with md.parallel_frame_positions(atoms, frames, n_workers = n_workers) as result:
+                pass
+
+        timing = best_of(read_parallel, args.repeats)
+        print(f"{n_workers:>3} workers: {timing:8.3f} s ({serial / timing:.2f}x)")
+
+if __name__ == '__main__':
+    main()
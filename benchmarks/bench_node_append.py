@@ -0,0 +1,68 @@
+"""
+Times appending node groups from the MolecularNodes asset file, comparing one
+`bpy.ops.wm.append()` call per node group (the previous `mol_append_node()`) against the
+single `bpy.data.libraries.load()` pass of `nodes.mol_append_nodes()`.
+
+Run it with Blender:
+
+    blender -b --factory-startup --python benchmarks/bench_node_append.py -- [--repeats 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MolecularNodes import nodes
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument('--repeats', type = int, default = 3)
+    return parser.parse_args(argv)
+
+def append_with_operator(node_names):
+    for node_name in node_names:
+        if not bpy.data.node_groups.get(node_name):
+            bpy.ops.wm.append(
+                directory = os.path.join(nodes.node_append_file(), 'NodeTree'),
+                filename = node_name,
+                link = False
+            )
+
+def clear_node_groups():
+    for group in list(bpy.data.node_groups):
+        bpy.data.node_groups.remove(group)
+
+def best_of(func, node_names, repeats):
+    timings = []
+    for i in range(repeats):
+        clear_node_groups()
+        start = time.perf_counter()
+        func(node_names)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    args = parse_args()
+    with bpy.data.libraries.load(nodes.node_append_file(), link = False) as (data_from, data_to):
+        available = set(data_from.node_groups)
+
+    # the node groups of the default starting node tree, and every node group of the file
+    cases = {
+        'starting tree': [name for name in ('MOL_style_color', 'MOL_style_atoms_cycles',
+            'MOL_animate_frames', 'MOL_animate_value') if name in available],
+        'all groups': sorted(available)
+    }
+
+    for case, node_names in cases.items():
+        before = best_of(append_with_operator, node_names, args.repeats)
+        after = best_of(nodes.mol_append_nodes, node_names, args.repeats)
+        print(f"{case} ({len(node_names)} groups): operator {before:.3f} s, "
+              f"libraries.load {after:.3f} s ({before / after:.1f}x)")
+
+if __name__ == '__main__':
+    main()
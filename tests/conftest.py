@@ -0,0 +1,42 @@
+import importlib.util
+import os
+
+import pytest
+
+PACKAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'MolecularNodes')
+
+def load_module(name):
+    """
+    Loads a module of the add-on that doesn't depend on Blender directly from its file, 
+    as importing the package itself requires `bpy`.
+    """
+    spec = importlib.util.spec_from_file_location(
+        f"mn_{name.replace('/', '_')}", os.path.join(PACKAGE, *name.split('/')) + '.py'
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope = 'session')
+def transforms():
+    return load_module('transforms')
+
+@pytest.fixture(scope = 'session')
+def frames():
+    return load_module('frames')
+
+@pytest.fixture(scope = 'session')
+def frame_reader():
+    return load_module('workers/mn_frame_reader')
+
+@pytest.fixture(scope = 'session')
+def queries():
+    return load_module('queries')
+
+@pytest.fixture(scope = 'session')
+def proximity():
+    return load_module('proximity')
+
+@pytest.fixture(scope = 'session')
+def tables():
+    return load_module('tables')
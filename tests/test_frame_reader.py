@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+@pytest.mark.parametrize('cutoff', [1.0, 4.5])
+def test_inter_group_contacts(frame_reader, cutoff):
+    rng = np.random.default_rng(4)
+    positions = rng.uniform(0, 30, (600, 3))
+    # chains as slabs along x, plus a chain far away from all of the others
+    groups = (positions[:, 0] // 10).astype(int)
+    positions[groups == 2] += [100, 0, 0]
+    
+    distances = cdist(positions, positions)
+    other = groups[:, np.newaxis] != groups[np.newaxis, :]
+    expected = np.any((distances <= cutoff) & other, axis = 1)
+    
+    in_contact = frame_reader.inter_group_contacts(positions, groups, cutoff)
+    
+    assert np.array_equal(in_contact, expected)
+    assert not in_contact[groups == 2].any()
+
+def test_inter_group_contacts_single_group(frame_reader):
+    positions = np.random.default_rng(5).uniform(0, 5, (50, 3))
+    assert not frame_reader.inter_group_contacts(positions, np.zeros(50, dtype = int), 4.5).any()
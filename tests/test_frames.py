@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+def random_trajectory(n_frames = 25, n_atoms = 500, extent = 100.0, offset = 0.0, step = 0.5, seed = 0):
+    # a random walk of the atoms, so consecutive frames are similar as in a trajectory
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, extent, (n_atoms, 3)) + offset
+    steps = rng.normal(0, step, (n_frames, n_atoms, 3))
+    steps[0] = 0
+    return start + np.cumsum(steps, axis = 0)
+
+def frame_store(frames, trajectory, **kwargs):
+    store = frames.FrameStore(trajectory.shape[1], **kwargs)
+    for positions in trajectory:
+        store.append(positions)
+    return store
+
+@pytest.mark.parametrize('delta, tolerance', [(False, None), (True, None), (True, 0.01)])
+@pytest.mark.parametrize('world_scale, offset', [(1.0, 0.0), (0.01, 0.0), (1.0, 5000.0), (0.01, -300.0)])
+def test_frame_store_error_bound(frames, delta, tolerance, world_scale, offset):
+    trajectory = random_trajectory(offset = offset, step = 0.05) * world_scale
+    if tolerance is not None:
+        tolerance *= world_scale
+    store = frame_store(frames, trajectory, delta = delta, keyframe_interval = 10, tolerance = tolerance)
+    
+    errors = []
+    for i, positions in enumerate(trajectory):
+        decoded = store.decode(i)
+        assert decoded.dtype == np.float32
+        error = np.abs(decoded.astype(np.float64) - positions).max(axis = 0)
+        assert np.all(error <= store.error_bound(i))
+        if tolerance is not None and not store.is_keyframe(i):
+            assert np.all(store.scales[i] / 2 <= tolerance)
+        errors.append(error)
+    
+    assert np.all(np.max(errors, axis = 0) <= store.error_bound())
+
+def test_frame_store_delta_keyframes(frames):
+    trajectory = random_trajectory(n_frames = 12, step = 0.01)
+    store = frame_store(frames, trajectory, delta = True, keyframe_interval = 5, tolerance = 0.01)
+    
+    assert [store.is_keyframe(i) for i in range(12)] == [i % 5 == 0 for i in range(12)]
+    # the differences between frames are stored as int8, half the memory of keyframes
+    assert store.codes[0].dtype == np.int16
+    assert all(store.codes[i].dtype == np.int8 for i in range(12) if not store.is_keyframe(i))
+    keyframes_only = frame_store(frames, trajectory)
+    assert store.nbytes < 0.7 * keyframes_only.nbytes
+
+def test_frame_store_delta_escape(frames):
+    # a jump that can't be stored as int8 differences within the tolerance starts a 
+    # new keyframe, and the following frames are differences to it again
+    trajectory = random_trajectory(n_frames = 8, step = 0.01)
+    trajectory[4:] += np.random.default_rng(3).normal(0, 5, trajectory.shape[1:])
+    store = frame_store(frames, trajectory, delta = True, keyframe_interval = 10, tolerance = 0.01)
+    
+    assert store.keyframes == [0, 4]
+    for i, positions in enumerate(trajectory):
+        assert np.all(np.abs(store.decode(i) - positions).max(axis = 0) <= store.error_bound(i))
+
+def test_frame_store_delta_default_tolerance(frames):
+    # without a tolerance the delta frames are as precise as the keyframes, so frames
+    # far apart are all stored as keyframes
+    trajectory = random_trajectory(n_frames = 6, step = 0.5)
+    store = frame_store(frames, trajectory, delta = True)
+    
+    assert store.keyframes == list(range(6))
+
+@pytest.mark.parametrize('delta', [False, True])
+def test_frame_store_save_load(frames, tmp_path, delta):
+    trajectory = random_trajectory(n_frames = 13, step = 0.01)
+    # a jump which starts a new keyframe
+    trajectory[6:] += np.random.default_rng(3).normal(0, 5, trajectory.shape[1:])
+    store = frame_store(frames, trajectory, delta = delta, keyframe_interval = 4, tolerance = 0.01)
+    
+    path = str(tmp_path / 'frames.npz')
+    store.save(path)
+    loaded = frames.FrameStore.load(path)
+    
+    assert len(loaded) == len(store)
+    assert loaded.delta == delta and loaded.keyframe_interval == 4
+    assert loaded.keyframes == store.keyframes and loaded.tolerance == store.tolerance
+    for i in range(len(store)):
+        assert np.array_equal(loaded.decode(i), store.decode(i))
+    assert np.allclose(loaded.error_bound(), store.error_bound())
+
+@pytest.mark.parametrize('delta', [False, True])
+def test_frame_store_decode_range(frames, delta):
+    trajectory = random_trajectory(n_frames = 23, step = 0.01)
+    # a jump which starts a new keyframe
+    trajectory[13:] += np.random.default_rng(3).normal(0, 5, trajectory.shape[1:])
+    store = frame_store(frames, trajectory, delta = delta, keyframe_interval = 10, tolerance = 0.01)
+    # each frame accumulated from its keyframe
+    values = [
+        (codes - float(np.iinfo(codes.dtype).min)) * scale + offset 
+        for codes, scale, offset in zip(store.codes, store.scales, store.offsets)
+    ]
+    expected = []
+    for i in range(len(store)):
+        start = max(key for key in store.keyframes if key <= i)
+        expected.append(np.sum(values[start:i + 1], axis = 0).astype(np.float32))
+    
+    # sliding windows as during playback, forwards and backwards, reuse decoded frames
+    for start in list(range(0, 20)) + list(range(19, -1, -3)):
+        decoded = store.decode_range(start, start + 4)
+        assert decoded.shape == (4, trajectory.shape[1], 3)
+        for i, positions in enumerate(decoded):
+            assert np.array_equal(positions, expected[start + i])
+
+def test_frame_masks_save_load(frames, tmp_path):
+    # a trajectory imported into a frame store has no frame objects, so its dynamic 
+    # selections are reloaded from the saved masks along with the store
+    trajectory = random_trajectory(n_frames = 9, n_atoms = 37, step = 0.01)
+    store = frame_store(frames, trajectory, delta = True, keyframe_interval = 4, tolerance = 0.01)
+    selected = trajectory[:, :, 0] < 50
+    masks = frames.FrameMasks(37)
+    masks.add('near_ligand', np.packbits(selected, axis = 1))
+    
+    store.save(str(tmp_path / 'frames.npz'))
+    masks.save(str(tmp_path / 'selections.npz'))
+    loaded_store = frames.FrameStore.load(str(tmp_path / 'frames.npz'))
+    loaded_masks = frames.FrameMasks.load(str(tmp_path / 'selections.npz'))
+    
+    assert loaded_masks.names() == ['near_ligand']
+    assert loaded_masks.n_atoms == 37
+    for i in range(len(trajectory)):
+        assert np.array_equal(loaded_masks.frame('near_ligand', i), selected[i])
+        assert np.array_equal(loaded_store.decode(i), store.decode(i))
+    
+    with pytest.raises(ValueError):
+        masks.add('wrong', np.zeros((9, 4), dtype = np.uint8))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+def molecule(seed, n_atoms = 400, n_target = 12):
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(0, 1, (n_atoms, 3)).astype(np.float32)
+    residues = np.sort(rng.integers(0, n_atoms // 4, n_atoms))
+    residues = np.unique(residues, return_inverse = True)[1]
+    target = np.zeros(n_atoms, dtype = bool)
+    target[rng.choice(n_atoms, n_target, replace = False)] = True
+    return positions, residues, target
+
+def distances(positions, target):
+    # brute force distance of every atom to its closest target atom
+    difference = positions[:, None, :].astype(float) - positions[target][None, :, :]
+    return np.sqrt((difference ** 2).sum(axis = -1)).min(axis = 1)
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('whole_residues', [False, True])
+@pytest.mark.parametrize('include_target', [False, True])
+def test_within_radius(proximity, seed, whole_residues, include_target):
+    positions, residues, target = molecule(seed)
+    radius = 0.12
+    
+    expected = distances(positions, target) <= radius
+    if whole_residues:
+        expected = np.isin(residues, residues[expected])
+    if not include_target:
+        expected &= ~target
+    
+    selection = proximity.within_radius(
+        cKDTree(positions), positions, target, radius, 
+        residues = residues if whole_residues else None, 
+        include_target = include_target
+    )
+    assert np.array_equal(selection, expected)
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('n', [1, 3, 25, 10000])
+def test_nearest_atoms(proximity, seed, n):
+    positions, residues, target = molecule(seed)
+    distance = distances(positions, target)
+    distance[target] = np.inf
+    
+    expected = np.zeros(len(positions), dtype = bool)
+    expected[np.argsort(distance)[:min(n, (~target).sum())]] = True
+    
+    selection = proximity.nearest_to_target(cKDTree(positions), positions, target, n)
+    assert np.array_equal(selection, expected)
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('n', [1, 3, 25, 10000])
+def test_nearest_residues(proximity, seed, n):
+    positions, residues, target = molecule(seed)
+    distance = distances(positions, target)
+    
+    closest = {}
+    for residue, value, is_target in zip(residues, distance, target):
+        if not is_target:
+            closest[residue] = min(value, closest.get(residue, np.inf))
+    chosen = sorted(closest, key = closest.get)[:n]
+    expected = np.isin(residues, chosen) & ~target
+    
+    selection = proximity.nearest_to_target(cKDTree(positions), positions, target, n, residues = residues)
+    assert np.array_equal(selection, expected)
+
+def test_nearest_without_candidates(proximity):
+    positions, residues, target = molecule(0)
+    tree = cKDTree(positions)
+    
+    assert not proximity.nearest_to_target(tree, positions, np.zeros_like(target), 3).any()
+    assert not proximity.nearest_to_target(tree, positions, np.ones_like(target), 3).any()
+
+def test_nearest_coincident_target(proximity):
+    # atoms on top of the target give a starting radius of zero
+    positions = np.zeros((20, 3), dtype = np.float32)
+    positions[10:, 0] = np.arange(1, 11)
+    target = np.zeros(20, dtype = bool)
+    target[0] = True
+    
+    selection = proximity.nearest_to_target(cKDTree(positions), positions, target, 12)
+    assert selection.sum() == 12
+    assert selection[1:10].all() and selection[10:12].all()
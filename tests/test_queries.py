@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+ATTRIBUTES = {
+    'res_id': np.array([1, 2, 3, 10, 11, 12]), 
+    'chain_id': np.array([0, 0, 1, 1, 3, 3]), 
+    'b_factor': np.array([10., 50., 30., 60., 45., 20.]), 
+    'is_solvent': np.array([False, False, False, True, False, False])
+}
+
+def evaluate(queries, query):
+    return queries.compile_query(query)(ATTRIBUTES.__getitem__)
+
+@pytest.mark.parametrize('string, expected', [
+    ('1-50,80,120-300', ['1-50', '80', '120-300']), 
+    ('1:50 80;120_300', ['1-50', '80', '120-300']), 
+    ('1=5/7+9', ['1-5', '7', '9']), 
+    (',,3,,', ['3']), 
+    ('', [])
+])
+def test_clean_resid_string(queries, string, expected):
+    assert queries.clean_resid_string(string) == expected
+
+@pytest.mark.parametrize('string, expected', [
+    ('5', [[5, 5]]), 
+    ('1-50,80,120-300', [[1, 50], [80, 80], [120, 300]]), 
+    ('120-300,1-50', [[1, 50], [120, 300]]), 
+    ('50-1', [[1, 50]]), 
+    ('1-10,5-20', [[1, 20]]), 
+    ('1-3,4-6', [[1, 6]]), 
+    ('1-3,5-6', [[1, 3], [5, 6]]), 
+    ('2-8,3-4', [[2, 8]]), 
+    ('7,7,7', [[7, 7]])
+])
+def test_parse_resid_ranges(queries, string, expected):
+    intervals = queries.parse_resid_ranges(string)
+    assert intervals.shape == (len(expected), 2)
+    assert intervals.tolist() == expected
+
+def test_parse_resid_ranges_empty(queries):
+    assert queries.parse_resid_ranges('').shape == (0, 2)
+    assert queries.parse_resid_ranges(' , ').shape == (0, 2)
+    assert not queries.resid_in_ranges(np.arange(5), queries.parse_resid_ranges('')).any()
+
+@pytest.mark.parametrize('string', ['a', '1-b', '-5'])
+def test_parse_resid_ranges_invalid(queries, string):
+    with pytest.raises(ValueError):
+        queries.parse_resid_ranges(string)
+
+def test_resid_in_ranges(queries):
+    res_id = np.arange(-2, 320)
+    string = '1-50,80,120-300,45-60'
+    
+    expected = np.zeros(len(res_id), dtype = bool)
+    for term in queries.clean_resid_string(string):
+        start, end = (term.split('-') + [term])[:2]
+        expected |= (res_id >= int(start)) & (res_id <= int(end))
+    
+    assert np.array_equal(queries.resid_in_ranges(res_id, queries.parse_resid_ranges(string)), expected)
+
+@pytest.mark.parametrize('query, expected', [
+    ('chain_id in (0, 3) and b_factor > 40 and not is_solvent', [0, 1, 0, 0, 1, 0]), 
+    ('chain_id not in [0, 3]', [0, 0, 1, 1, 0, 0]), 
+    ('10 < res_id <= 12', [0, 0, 0, 0, 1, 1]), 
+    ('res_id == 1 or res_id == 12', [1, 0, 0, 0, 0, 1]), 
+    ('b_factor / 10 + 1 >= 5', [0, 1, 0, 1, 1, 0]), 
+    ('res_id % 2 == 0', [0, 1, 0, 1, 0, 1]), 
+    ('-b_factor < -40', [0, 1, 0, 1, 1, 0]), 
+    ('is_solvent', [0, 0, 0, 1, 0, 0]), 
+    ('not (is_solvent or chain_id != 1)', [0, 0, 1, 0, 0, 0]), 
+    ('True', [1, 1, 1, 1, 1, 1])
+])
+def test_compile_query(queries, query, expected):
+    selection = np.broadcast_to(evaluate(queries, query), len(expected))
+    assert selection.dtype == bool
+    assert selection.tolist() == [bool(value) for value in expected]
+
+def test_compile_query_requests_attributes_once(queries):
+    requested = []
+    def get_values(name):
+        requested.append(name)
+        return ATTRIBUTES[name]
+    
+    queries.compile_query('res_id > 1 and res_id < 12 and (res_id != 3 or is_solvent)')(get_values)
+    assert sorted(requested) == ['is_solvent', 'res_id']
+
+@pytest.mark.parametrize('query', [
+    "__import__('os').system('ls')", 
+    "res_id.__class__", 
+    "res_id.sum() > 0", 
+    "abs(res_id) > 1", 
+    "__builtins__", 
+    "res_id > __name__", 
+    "res_id[0] == 1", 
+    "(lambda: 1)()", 
+    "[x for x in res_id]", 
+    "res_id ** 2 > 1", 
+    "res_id == 'ALA'", 
+    "res_id is 1", 
+    "res_id >", 
+    ""
+])
+def test_compile_query_rejects(queries, query):
+    with pytest.raises(ValueError):
+        queries.compile_query(query)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+def size(name):
+    return len(name.encode('utf-8'))
+
+def test_short_names_unchanged(tables):
+    assert tables.selection_node_name('1cd3', 'chains') == 'MOL_sel_1cd3_chains'
+    assert tables.table_name(tables.selection_node_name('1cd3', 'ligands')) == 'MOL_sel_1cd3_ligands_table'
+    assert tables.chain_color_node_name('1cd3') == 'MOL_color_chains_1cd3'
+    assert tables.palette_name(tables.chain_color_node_name('1cd3')) == 'MOL_color_chains_1cd3_palette'
+
+@pytest.mark.parametrize('obj_name', [
+    'a' * 63, 
+    'trajectory_of_a_membrane_protein_embedded_in_a_lipid_bilayer.001', 
+    'ü' * 40, 
+    'x' * 40 + '🧬' * 10
+])
+def test_long_names_fit(tables, obj_name):
+    for kind in ('chains', 'ligands'):
+        node_name = tables.selection_node_name(obj_name, kind)
+        assert node_name.startswith('MOL_sel_') and node_name.endswith(f"_{kind}")
+        assert size(tables.table_name(node_name)) <= tables.MAX_NAME_LENGTH
+    
+    node_name = tables.chain_color_node_name(obj_name)
+    assert node_name.startswith('MOL_color_chains_')
+    assert size(tables.palette_name(node_name)) <= tables.MAX_NAME_LENGTH
+
+def test_long_names_distinct_and_stable(tables):
+    first = 'structure_' * 6 + '.001'
+    second = 'structure_' * 6 + '.002'
+    
+    assert tables.selection_node_name(first, 'chains') != tables.selection_node_name(second, 'chains')
+    assert tables.chain_color_node_name(first) != tables.chain_color_node_name(second)
+    assert tables.selection_node_name(first, 'chains') == tables.selection_node_name(first, 'chains')
+
+def test_data_name_exact_limit(tables):
+    name = 'a' * (tables.MAX_NAME_LENGTH - len('MOL_'))
+    assert tables.data_name('MOL_', name) == 'MOL_' + name
+    assert tables.data_name('MOL_', name + 'a') != 'MOL_' + name + 'a'
+    assert size(tables.data_name('MOL_', name + 'a')) == tables.MAX_NAME_LENGTH
+
+def test_set_selected(tables):
+    item_names = ['Chain A', 'Chain B', 'Chain C', 'Chain D']
+    values = np.array([True, True, False, False])
+    
+    result = tables.set_selected(values, item_names, ['Chain B', 'Chain C'], False)
+    assert result.tolist() == [True, False, False, False]
+    assert values.tolist() == [True, True, False, False]
+    
+    assert tables.set_selected(values, item_names, ['Chain D', 'Chain E']).tolist() == [True, True, False, True]
+    assert tables.set_selected(values, item_names, []).tolist() == values.tolist()
+    assert tables.set_selected(values, item_names, item_names, False).tolist() == [False] * 4
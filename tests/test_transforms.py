@@ -0,0 +1,204 @@
+import numpy as np
+import pytest
+
+def rotation_z(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+def transformation(rotation, translation):
+    mat = np.zeros((3, 4))
+    mat[:, :3] = rotation
+    mat[:, 3] = translation
+    return mat
+
+def apply(mat, point):
+    return mat[:, :3] @ point + mat[:, 3]
+
+class FakePDBx:
+    """Minimal stand-in for a biotite PDBxFile, returning categories as dictionaries."""
+    def __init__(self, categories):
+        self.categories = categories
+    
+    def get_category(self, name):
+        return self.categories[name]
+
+def oper_list(matrices):
+    category = {'id': np.array([str(i + 1) for i in range(len(matrices))])}
+    for i in range(3):
+        for j in range(3):
+            category[f'matrix[{i + 1}][{j + 1}]'] = np.array([str(mat[i, j]) for mat in matrices])
+        category[f'vector[{i + 1}]'] = np.array([str(mat[i, 3]) for mat in matrices])
+    return category
+
+@pytest.mark.parametrize('expression, expected', [
+    ('1', [['1']]), 
+    ('1,2,5-6', [['1', '2', '5', '6']]), 
+    (' 1 , 3 ', [['1', '3']]), 
+    ('(1-3)(X0)', [['1', '2', '3'], ['X0']]), 
+    ('(1,4)(7-8)(P)', [['1', '4'], ['7', '8'], ['P']])
+])
+def test_parse_oper_expression(transforms, expression, expected):
+    assert transforms.parse_oper_expression(expression) == expected
+
+def test_parse_oper_expression_product_sizes(transforms):
+    groups = transforms.parse_oper_expression('(1-60)(61-88)')
+    assert [len(group) for group in groups] == [60, 28]
+    assert groups[0][0] == '1' and groups[1][-1] == '88'
+
+def test_as_homogeneous(transforms):
+    mats = np.array([transformation(rotation_z(0.3), (1, 2, 3))])
+    homogeneous = transforms.as_homogeneous(mats)
+    assert homogeneous.shape == (1, 4, 4)
+    assert np.allclose(homogeneous[0, :3], mats[0])
+    assert np.allclose(homogeneous[0, 3], (0, 0, 0, 1))
+
+def test_combine_transformations_single_group(transforms):
+    group = np.array([transformation(rotation_z(a), (a, 0, 0)) for a in (0.1, 0.2)])
+    assert np.allclose(transforms.combine_transformations([group]), group)
+
+def test_combine_transformations_applies_last_group_first(transforms):
+    outer = np.array([transformation(rotation_z(a), (a, 1, 0)) for a in (0.0, 0.5, 1.5)])
+    inner = np.array([transformation(rotation_z(a), (0, 0, a)) for a in (0.25, 2.0)])
+    combined = transforms.combine_transformations([outer, inner])
+    assert combined.shape == (6, 3, 4)
+    
+    point = np.array([1.0, -2.0, 0.5])
+    for a, mat_outer in enumerate(outer):
+        for b, mat_inner in enumerate(inner):
+            expected = apply(mat_outer, apply(mat_inner, point))
+            assert np.allclose(apply(combined[a * len(inner) + b], point), expected)
+
+def test_combine_transformations_three_groups(transforms):
+    groups = [
+        np.array([transformation(rotation_z(a), (a, a, 0)) for a in values]) 
+        for values in ((0.1, 0.2), (0.3,), (0.4, 0.5, 0.6))
+    ]
+    combined = transforms.combine_transformations(groups)
+    assert combined.shape == (6, 3, 4)
+    
+    point = np.array([0.5, 0.25, -1.0])
+    expected = apply(groups[0][1], apply(groups[1][0], apply(groups[2][2], point)))
+    assert np.allclose(apply(combined[5], point), expected)
+
+def test_get_assemblies_pdbx(transforms):
+    identity = transformation(np.eye(3), (0, 0, 0))
+    rotated = transformation(rotation_z(np.pi), (10, -5, 0))
+    shifted = transformation(np.eye(3), (0, 0, 30))
+    file = FakePDBx({
+        'pdbx_struct_oper_list': oper_list([identity, rotated, shifted]), 
+        'pdbx_struct_assembly_gen': {
+            'assembly_id': np.array(['1', '2', '2']), 
+            'oper_expression': np.array(['1,2', '(1-2)(3)', '3'])
+        }
+    })
+    assemblies = transforms.get_assemblies_pdbx(file)
+    
+    assert sorted(assemblies) == ['1', '2']
+    assert np.allclose(assemblies['1'], [identity, rotated])
+    # rows of the same assembly are concatenated, in order
+    assert assemblies['2'].shape == (3, 3, 4)
+    point = np.array([1.0, 2.0, 3.0])
+    assert np.allclose(apply(assemblies['2'][1], point), apply(rotated, apply(shifted, point)))
+    assert np.allclose(assemblies['2'][2], shifted)
+
+def test_get_assemblies_pdbx_single_rows(transforms):
+    # categories with a single row contain strings instead of arrays
+    rotated = transformation(rotation_z(np.pi / 2), (1, 2, 3))
+    operators = {key: value[0] for key, value in oper_list([rotated]).items()}
+    file = FakePDBx({
+        'pdbx_struct_oper_list': operators, 
+        'pdbx_struct_assembly_gen': {'assembly_id': '1', 'oper_expression': '1'}
+    })
+    assemblies = transforms.get_assemblies_pdbx(file)
+    assert list(assemblies) == ['1']
+    assert np.allclose(assemblies['1'], [rotated])
+
+def test_parse_pdb_transformations(transforms):
+    lines = [
+        "HEADER    TEST", 
+        "REMARK 290   SMTRY1   1  1.000000  0.000000  0.000000        0.00000", 
+        "REMARK 290   SMTRY2   1  0.000000  1.000000  0.000000        0.00000", 
+        "REMARK 290   SMTRY3   1  0.000000  0.000000  1.000000        0.00000", 
+        "REMARK 290   SMTRY1   2 -1.000000  0.000000  0.000000       12.50000", 
+        "REMARK 290   SMTRY2   2  0.000000 -1.000000  0.000000        0.00000", 
+        "REMARK 290   SMTRY3   2  0.000000  0.000000  1.000000      -25", 
+        "REMARK 350 BIOMOLECULE: 1", 
+        "REMARK 350   BIOMT1   1  1.000000  0.000000  0.000000        0.00000", 
+        "REMARK 350   BIOMT2   1  0.000000  1.000000  0.000000        0.00000", 
+        "REMARK 350   BIOMT3   1  0.000000  0.000000  1.000000        0.00000", 
+        "REMARK 350 BIOMOLECULE: 2", 
+        "REMARK 350   BIOMT1   1  0.000000 -1.000000  0.000000       -3.00000", 
+        "REMARK 350   BIOMT2   1  1.000000  0.000000  0.000000        4", 
+        "REMARK 350   BIOMT3   1  0.000000  0.000000  1.000000        0.00000", 
+        "ATOM      1  N   ALA A   1       0.000   0.000   0.000  1.00  0.00           N", 
+        "REMARK 350   BIOMT1   2  1.000000  0.000000  0.000000        0.00000", 
+    ]
+    assemblies, symmetry = transforms.parse_pdb_transformations(lines)
+    
+    assert sorted(assemblies) == ['1', '2']
+    assert np.allclose(assemblies['1'], [transformation(np.eye(3), (0, 0, 0))])
+    # negative and integer formatted values are kept, records after the atoms are ignored
+    assert np.allclose(assemblies['2'], [transformation(rotation_z(np.pi / 2), (-3, 4, 0))])
+    assert symmetry.shape == (2, 3, 4)
+    assert np.allclose(symmetry[1], transformation(np.diag([-1, -1, 1]), (12.5, 0, -25)))
+
+def test_parse_pdb_transformations_without_operators(transforms):
+    assemblies, symmetry = transforms.parse_pdb_transformations(["HEADER    TEST", "ATOM  "])
+    assert assemblies == {}
+    assert symmetry.shape == (0, 3, 4)
+
+class FakeAtomArray:
+    """Minimal stand-in for a biotite AtomArray with the annotations used to find copies."""
+    def __init__(self, chain_id, res_name, atom_name, element, coord):
+        self.chain_id = np.array(chain_id)
+        self.res_name = np.array(res_name)
+        self.atom_name = np.array(atom_name)
+        self.element = np.array(element)
+        self.coord = np.asarray(coord, dtype = float)
+    
+    def __len__(self):
+        return len(self.coord)
+
+def test_find_chain_instances(transforms):
+    rng = np.random.default_rng(1)
+    chain = rng.uniform(-10, 10, (12, 3))
+    mat = transformation(rotation_z(1.1), [20, -5, 3])
+    copy = np.array([apply(mat, point) for point in chain])
+    other = rng.uniform(-10, 10, (12, 3))
+    
+    res_name = ['ALA'] * 6 + ['GLY'] * 6
+    atom_name = ['N', 'CA', 'C', 'O', 'CB', 'H'] * 2
+    element = ['N', 'C', 'C', 'O', 'C', 'H'] * 2
+    # chains A and B are the same chain related by a rigid transformation, while C has 
+    # the same atoms in a different conformation
+    mol_array = FakeAtomArray(
+        chain_id = [0] * 12 + [1] * 12 + [2] * 12, 
+        res_name = res_name * 3, 
+        atom_name = atom_name * 3, 
+        element = element * 3, 
+        coord = np.concatenate([chain, copy, other])
+    )
+    
+    keep, instances, copies = transforms.find_chain_instances(mol_array, tolerance = 0.5)
+    
+    assert np.array_equal(keep, [True] * 12 + [False] * 12 + [True] * 12)
+    assert list(instances.keys()) == [0]
+    assert copies[0] == [0, 1]
+    assert instances[0].shape == (2, 3, 4)
+    assert np.allclose(instances[0][0], transformation(np.eye(3), [0, 0, 0]), atol = 1e-6)
+    assert np.allclose(instances[0][1], mat, atol = 1e-6)
+
+def test_find_chain_instances_without_copies(transforms):
+    rng = np.random.default_rng(2)
+    mol_array = FakeAtomArray(
+        chain_id = [0] * 4 + [1] * 4, 
+        res_name = ['ALA'] * 4 + ['GLY'] * 4, 
+        atom_name = ['N', 'CA', 'C', 'O'] * 2, 
+        element = ['N', 'C', 'C', 'O'] * 2, 
+        coord = rng.uniform(-10, 10, (8, 3))
+    )
+    
+    keep, instances, copies = transforms.find_chain_instances(mol_array)
+    
+    assert keep.all()
+    assert instances == {} and copies == {}